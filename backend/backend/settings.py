@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 import os
 import socket
+from importlib.util import find_spec
 from pathlib import Path, PurePath
 
 from core.keygen import get_key
@@ -120,6 +121,96 @@ POSTGRES = {
 DATABASES = SQLITE if LOCAL_DEV else POSTGRES
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# Для нескольких воркеров используйте общий кэш, например
+# django.core.cache.backends.filebased.FileBasedCache.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', default='foodgram'),
+    }
+}
+
+RECIPES_CACHE_TIMEOUT = int(
+    os.environ.get('RECIPES_CACHE_TIMEOUT', default=300)
+)
+
+RECIPES_CACHE_REPRESENTATION = int(
+    os.environ.get('RECIPES_CACHE_REPRESENTATION', default=1)
+)
+
+# Скомпилированные сериализаторы для чтения (core.compiled).
+COMPILED_SERIALIZERS = int(
+    os.environ.get('COMPILED_SERIALIZERS', default=1)
+)
+
+# Сколько ингредиентов возвращает поиск по названию.
+INGREDIENTS_SEARCH_LIMIT = int(
+    os.environ.get('INGREDIENTS_SEARCH_LIMIT', default=20)
+)
+
+# Полные списки тегов и ингредиентов отдаются готовыми байтами
+# (при CATALOG_GZIP - и сжатыми) с Cache-Control: max-age.
+CATALOG_PRECOMPUTED = int(os.environ.get('CATALOG_PRECOMPUTED', default=1))
+CATALOG_GZIP = int(os.environ.get('CATALOG_GZIP', default=1))
+CATALOG_MAX_AGE = int(os.environ.get('CATALOG_MAX_AGE', default=86400))
+
+# Поиск ингредиентов по индексу в памяти процесса (recipes.autocomplete)
+# и его наибольший возраст в секундах.
+INGREDIENTS_AUTOCOMPLETE = int(
+    os.environ.get('INGREDIENTS_AUTOCOMPLETE', default=1)
+)
+INGREDIENTS_INDEX_MAX_AGE = int(
+    os.environ.get('INGREDIENTS_INDEX_MAX_AGE', default=3600)
+)
+
+# JSON рецептов строится запросом в PostgreSQL (recipes.database_json),
+# на других СУБД настройка не действует. По умолчанию включено,
+# если БД - PostgreSQL; RECIPES_DATABASE_JSON=0 оставляет построение
+# JSON CompiledRecipeSerializer и кэшу представлений.
+RECIPES_DATABASE_JSON = int(os.environ.get(
+    'RECIPES_DATABASE_JSON',
+    default='postgresql' in (DATABASES['default']['ENGINE'] or '')
+))
+
+# Массовое создание рецептов (POST /api/recipes/bulk/): наибольшее
+# число рецептов в запросе и размер пачки, вставляемой одной транзакцией.
+RECIPES_BULK_MAX_ITEMS = int(
+    os.environ.get('RECIPES_BULK_MAX_ITEMS', default=1000)
+)
+RECIPES_BULK_CHUNK_SIZE = int(
+    os.environ.get('RECIPES_BULK_CHUNK_SIZE', default=100)
+)
+
+# Наибольший размер изображения рецепта в байтах и в пикселях.
+RECIPES_IMAGE_MAX_SIZE = int(
+    os.environ.get('RECIPES_IMAGE_MAX_SIZE', default=10 * 1024 * 1024)
+)
+RECIPES_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPES_IMAGE_MAX_PIXELS', default=40_000_000)
+)
+
+# Уменьшенные копии картинок рецептов (WebP и JPEG) делаются
+# при сохранении картинки; ширины копий через запятую.
+RECIPES_IMAGE_RENDITIONS = int(
+    os.environ.get('RECIPES_IMAGE_RENDITIONS', default=1)
+)
+RECIPES_IMAGE_WIDTHS = [
+    int(width) for width in
+    os.environ.get('RECIPES_IMAGE_WIDTHS', default='320,640,1280').split(',')
+]
+# Заглушки картинок рецептов (blurhash, миниатюра, цвет и размеры)
+# считаются при сохранении картинки.
+RECIPES_IMAGE_PLACEHOLDERS = int(
+    os.environ.get('RECIPES_IMAGE_PLACEHOLDERS', default=1)
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -196,6 +287,14 @@ if DEBUG:
                     + ["127.0.0.1", "10.0.2.2"])
 
 # rest_framework settings
+# Рендереры API: JSON на orjson, MessagePack (если установлен msgpack),
+# Browsable API только в режиме DEBUG.
+RENDERER_CLASSES = ['core.renderers.ORJSONRenderer']
+if find_spec('msgpack'):
+    RENDERER_CLASSES.append('core.renderers.MessagePackRenderer')
+if DEBUG:
+    RENDERER_CLASSES.append('rest_framework.renderers.BrowsableAPIRenderer')
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -205,10 +304,7 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.BasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
-    'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ],
+    'DEFAULT_RENDERER_CLASSES': RENDERER_CLASSES,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
@@ -0,0 +1,5 @@
+"""
+Бенчмарки API: сценарии прогоняются через настоящие URL проекта
+тестовым клиентом Django на заполненной базе данных
+(см. команды `seed_synthetic` и `benchmark`).
+"""
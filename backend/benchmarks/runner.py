@@ -0,0 +1,120 @@
+import json
+import tempfile
+import tracemalloc
+from statistics import median, quantiles
+from time import perf_counter
+from typing import Dict, Iterable, List
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from .scenarios import SCENARIOS, Fixture
+
+METRICS = ('p50_ms', 'p95_ms', 'queries', 'peak_memory_kb', 'errors')
+# Счётчики: регрессией считается любой рост, без порога.
+COUNTS = ('queries', 'errors')
+
+
+def percentile(values: List[float], percent: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return quantiles(values, n=100, method='inclusive')[percent - 1]
+
+
+def measure(name: str,
+            client: APIClient,
+            fixture: Fixture,
+            iterations: int,
+            warmup: int) -> Dict[str, float]:
+    """
+    Выполняет сценарий и возвращает p50/p95 времени ответа,
+    медиану количества запросов к БД и пик памяти за один запрос.
+    Пик памяти измеряется отдельным прогоном, чтобы tracemalloc
+    не искажал время.
+    """
+    func = SCENARIOS[name]
+    for i in range(warmup):
+        func(client, fixture, i)
+    timings, queries, errors = [], [], 0
+    for i in range(warmup, warmup + iterations):
+        with CaptureQueriesContext(connection) as context:
+            start = perf_counter()
+            response = func(client, fixture, i)
+            timings.append((perf_counter() - start) * 1000)
+        queries.append(len(context))
+        errors += response.status_code >= 400
+    tracemalloc.start()
+    func(client, fixture, warmup + iterations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'queries': median(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'errors': errors,
+    }
+
+
+def run(names: Iterable[str],
+        iterations: int = 50,
+        warmup: int = 5) -> Dict[str, Dict[str, float]]:
+    """
+    Прогоняет сценарии и откатывает все изменения в БД.
+    Загруженные при создании рецептов картинки пишутся во временный
+    каталог.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as media_root:
+        with override_settings(MEDIA_ROOT=media_root,
+                               ALLOWED_HOSTS=['testserver']):
+            with transaction.atomic():
+                fixture = Fixture()
+                client = APIClient()
+                client.force_authenticate(user=fixture.user)
+                for name in names:
+                    with transaction.atomic():
+                        results[name] = measure(
+                            name, client, fixture, iterations, warmup
+                        )
+                        transaction.set_rollback(True)
+                transaction.set_rollback(True)
+    return results
+
+
+def save(results: Dict[str, dict], path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2, ensure_ascii=False, sort_keys=True)
+
+
+def load(path: str) -> Dict[str, dict]:
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def compare(baseline: Dict[str, dict],
+            results: Dict[str, dict],
+            threshold: float) -> List[str]:
+    """
+    Сравнивает результаты с базовыми. Регрессией считается рост времени
+    или памяти больше чем на threshold и любой рост числа запросов
+    или ошибочных ответов (в базовых без `errors` ошибок нет).
+    """
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in METRICS:
+            old, new = base.get(metric), metrics.get(metric)
+            if metric == 'errors':
+                old, new = old or 0, new or 0
+            if old is None or new is None:
+                continue
+            limit = old if metric in COUNTS else old * (1 + threshold)
+            if new > limit:
+                regressions.append(
+                    f'{name}.{metric}: {old} -> {new}'
+                )
+    return regressions
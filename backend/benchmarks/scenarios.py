@@ -0,0 +1,200 @@
+from typing import Callable, Dict
+
+from core.renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from recipes.models import FavoritesList, Ingredient, Recipe, ShoppingList, Tag
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMA'
+    'AABieywaAAAACVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxA'
+    'GVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAABJRU5ErkJggg=='
+)
+
+Scenario = Callable[[APIClient, 'Fixture', int], HttpResponse]
+
+SCENARIOS: Dict[str, Scenario] = {}
+
+
+def scenario(name: str) -> Callable[[Scenario], Scenario]:
+    """Регистрирует функцию сценария под именем name."""
+    def decorator(func: Scenario) -> Scenario:
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+class Fixture:
+    """
+    Данные из заполненной БД, на которых выполняются сценарии:
+    самый активный автор, его рецепт, чужой рецепт, теги и ингредиенты.
+    Изменения в БД откатываются после прогона.
+    """
+
+    def __init__(self):
+        self.user = User.objects.order_by('-recipes_count', 'id').first()
+        if self.user is None or not self.user.recipes_count:
+            raise ValueError(
+                'В базе нет рецептов. Заполните её командой seed_synthetic.'
+            )
+        self.own_recipe = self.user.recipes.order_by('id').first()
+        self.recipe = Recipe.objects.exclude(author=self.user).order_by(
+            'id').first() or self.own_recipe
+        self.tags = list(Tag.objects.order_by('id')[:2])
+        self.ingredients = list(Ingredient.objects.order_by('id')[:5])
+        self.search = self.ingredients[0].name[:3]
+        self.search_inner = self.ingredients[-1].name[3:]
+        FavoritesList.objects.filter(
+            user=self.user, recipe=self.recipe
+        ).delete()
+        ShoppingList.objects.filter(
+            user=self.user, recipe=self.own_recipe
+        ).delete()
+        ShoppingList.objects.get_or_create(user=self.user, recipe=self.recipe)
+
+    def recipe_page(self, client: APIClient) -> dict:
+        """Данные страницы из 100 рецептов (загружаются один раз)."""
+        if not hasattr(self, '_recipe_page'):
+            self._recipe_page = client.get(
+                '/api/recipes/', {'page': 1, 'limit': 100}
+            ).data
+        return self._recipe_page
+
+    def recipe_data(self, name: str) -> dict:
+        return {
+            'name': name,
+            'image': IMAGE,
+            'text': 'Рецепт для бенчмарка',
+            'cooking_time': 15,
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 10}
+                for ingredient in self.ingredients
+            ],
+            'tags': [tag.id for tag in self.tags],
+        }
+
+
+@scenario('recipe_list')
+def recipe_list(client: APIClient, fixture: Fixture, i: int):
+    return client.get('/api/recipes/', {'page': 1, 'limit': 6})
+
+
+@scenario('recipe_list_100')
+def recipe_list_100(client: APIClient, fixture: Fixture, i: int):
+    return client.get('/api/recipes/', {'page': 1, 'limit': 100})
+
+
+@scenario('render_recipe_page_json')
+def render_recipe_page_json(client: APIClient, fixture: Fixture, i: int):
+    """Рендеринг страницы из 100 рецептов JSONRenderer DRF (stdlib json)."""
+    return HttpResponse(JSONRenderer().render(fixture.recipe_page(client)))
+
+
+@scenario('render_recipe_page_orjson')
+def render_recipe_page_orjson(client: APIClient, fixture: Fixture, i: int):
+    return HttpResponse(ORJSONRenderer().render(fixture.recipe_page(client)))
+
+
+if msgpack is not None:
+    @scenario('render_recipe_page_msgpack')
+    def render_recipe_page_msgpack(client: APIClient,
+                                   fixture: Fixture,
+                                   i: int):
+        return HttpResponse(
+            MessagePackRenderer().render(fixture.recipe_page(client))
+        )
+
+
+@scenario('recipe_list_filtered')
+def recipe_list_filtered(client: APIClient, fixture: Fixture, i: int):
+    return client.get(
+        '/api/recipes/',
+        {
+            'tags': [tag.slug for tag in fixture.tags],
+            'is_favorited': 0,
+            'is_in_shopping_cart': 0,
+            'limit': 6,
+        }
+    )
+
+
+@scenario('recipe_list_favorited')
+def recipe_list_favorited(client: APIClient, fixture: Fixture, i: int):
+    return client.get('/api/recipes/', {'is_favorited': 1, 'limit': 6})
+
+
+@scenario('recipe_list_author')
+def recipe_list_author(client: APIClient, fixture: Fixture, i: int):
+    return client.get(
+        '/api/recipes/', {'author': fixture.user.id, 'limit': 6}
+    )
+
+
+@scenario('recipe_detail')
+def recipe_detail(client: APIClient, fixture: Fixture, i: int):
+    return client.get(f'/api/recipes/{fixture.recipe.id}/')
+
+
+@scenario('recipe_create')
+def recipe_create(client: APIClient, fixture: Fixture, i: int):
+    return client.post(
+        '/api/recipes/',
+        fixture.recipe_data(f'benchmark create {i}'),
+        format='json'
+    )
+
+
+@scenario('recipe_update')
+def recipe_update(client: APIClient, fixture: Fixture, i: int):
+    return client.patch(
+        f'/api/recipes/{fixture.own_recipe.id}/',
+        fixture.recipe_data(f'benchmark update {i}'),
+        format='json'
+    )
+
+
+@scenario('favorite_toggle')
+def favorite_toggle(client: APIClient, fixture: Fixture, i: int):
+    url = f'/api/recipes/{fixture.recipe.id}/favorite/'
+    if i % 2:
+        return client.delete(url)
+    return client.post(url)
+
+
+@scenario('shopping_cart_toggle')
+def shopping_cart_toggle(client: APIClient, fixture: Fixture, i: int):
+    url = f'/api/recipes/{fixture.own_recipe.id}/shopping_cart/'
+    if i % 2:
+        return client.delete(url)
+    return client.post(url)
+
+
+@scenario('subscriptions')
+def subscriptions(client: APIClient, fixture: Fixture, i: int):
+    return client.get(
+        '/api/users/subscriptions/', {'limit': 6, 'recipes_limit': 3}
+    )
+
+
+@scenario('ingredient_list')
+def ingredient_list(client: APIClient, fixture: Fixture, i: int):
+    return client.get('/api/ingredients/')
+
+
+@scenario('ingredient_search')
+def ingredient_search(client: APIClient, fixture: Fixture, i: int):
+    return client.get('/api/ingredients/', {'name': fixture.search})
+
+
+@scenario('ingredient_search_inner')
+def ingredient_search_inner(client: APIClient, fixture: Fixture, i: int):
+    return client.get('/api/ingredients/', {'name': fixture.search_inner})
+
+
+@scenario('download_shopping_cart')
+def download_shopping_cart(client: APIClient, fixture: Fixture, i: int):
+    return client.get('/api/recipes/download_shopping_cart/')
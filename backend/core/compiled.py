@@ -0,0 +1,116 @@
+from operator import attrgetter
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from django.db.models import Manager
+from rest_framework.serializers import BaseSerializer
+
+Getter = Callable[[Any, Dict], Any]
+
+
+class Nested:
+    """Вложенный скомпилированный сериализатор (или список при many)."""
+
+    def __init__(self,
+                 serializer: Type['CompiledSerializer'],
+                 source: str = None,
+                 many: bool = False):
+        self.serializer = serializer
+        self.source = source
+        self.many = many
+
+    def compile(self, name: str) -> Getter:
+        get = attrgetter(self.source or name)
+        represent = self.serializer.represent
+        if self.many:
+            def getter(obj, context):
+                items = get(obj)
+                if isinstance(items, Manager):
+                    items = items.all()
+                return [represent(item, context) for item in items]
+        else:
+            def getter(obj, context):
+                value = get(obj)
+                return None if value is None else represent(value, context)
+        return getter
+
+
+class Method:
+    """
+    Значение возвращает метод `get_<name>(obj, context)` сериализатора,
+    аналог SerializerMethodField.
+    """
+
+    def __init__(self, method_name: str = None):
+        self.method_name = method_name
+
+    def bind(self, serializer: Type['CompiledSerializer'],
+             name: str) -> Getter:
+        return getattr(serializer, self.method_name or f'get_{name}')
+
+
+class FileURL:
+    """
+    Ссылка на файл, как у FileField/ImageField DRF: абсолютная,
+    если в контексте есть request.
+    """
+
+    def __init__(self, source: str = None):
+        self.source = source
+
+    def compile(self, name: str) -> Getter:
+        get = attrgetter(self.source or name)
+
+        def getter(obj, context):
+            value = get(obj)
+            if not value:
+                return None
+            try:
+                url = value.url
+            except AttributeError:
+                return None
+            request = context.get('request')
+            if request is not None:
+                return request.build_absolute_uri(url)
+            return url
+        return getter
+
+
+class CompiledSerializer(BaseSerializer):
+    """
+    Сериализатор только для чтения, собирающий словари напрямую
+    из объектов (с уже загруженными связями).
+
+    Поля задаются словарём `compiled_fields` в порядке вывода:
+    имя -> путь к атрибуту (строка, через точку), Nested, Method
+    или FileURL. Способ получения каждого поля вычисляется один раз
+    при создании класса, поэтому при сериализации нет обхода полей DRF.
+    Значения выводятся как есть, без to_representation полей DRF.
+    """
+    compiled_fields: Dict[str, Any] = {}
+    getters: Tuple[Tuple[str, Getter], ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.getters = tuple(
+            (name, cls.compile_field(name, spec))
+            for name, spec in cls.compiled_fields.items()
+        )
+
+    @classmethod
+    def compile_field(cls, name: str, spec) -> Getter:
+        if isinstance(spec, str):
+            get = attrgetter(spec)
+            return lambda obj, context: get(obj)
+        if isinstance(spec, Method):
+            return spec.bind(cls, name)
+        return spec.compile(name)
+
+    @classmethod
+    def represent(cls, instance, context: Dict) -> Dict[str, Any]:
+        return {name: get(instance, context) for name, get in cls.getters}
+
+    def to_representation(self, instance) -> Dict[str, Any]:
+        return self.represent(instance, self.context)
+
+    def get_initial(self) -> Optional[Dict]:
+        return {}
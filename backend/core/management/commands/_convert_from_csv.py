@@ -1,21 +1,198 @@
-import os
-from csv import reader
-from pathlib import PurePath
-
-from django.conf import settings
-from recipes.models import Ingredient
-
-PROJECT_DIR = settings.BASE_DIR
-
-
-def cvs_to_dj_model():
-    """Функция конвертора данных cvs в БД средствами Django"""
-    data_dir = os.fspath(PurePath(settings.BASE_DIR.resolve().parent, 'data'))
-    file = f'{data_dir}/ingredients.csv'
-    with open(file, newline='', encoding='utf-8') as f:
-        for row in reader(f):
-            if len(row) == 2:
-                Ingredient.objects.get_or_create(
-                    name=row[0],
-                    measurement_unit=row[1]
-                )
+import csv
+import json
+import re
+from io import StringIO
+from pathlib import Path
+from typing import IO, Any, Callable, Iterator, List, Optional, Tuple
+
+from django.db import connection, transaction
+from recipes.models import Ingredient, fold_name
+from recipes.signals import catalog_changed
+
+from ._process_pool import batched
+
+Row = Tuple[str, str]
+
+NAME_LENGTH = Ingredient._meta.get_field('name').max_length
+UNIT_LENGTH = Ingredient._meta.get_field('measurement_unit').max_length
+CSV_HEADER = ['name', 'measurement_unit']
+NDJSON_FORMATS = ('ndjson', 'jsonl')
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def read_csv(file: IO[str]) -> Iterator[Tuple[int, Any]]:
+    """Строки CSV `название,единица`; строка заголовка пропускается."""
+    for number, row in enumerate(csv.reader(file), 1):
+        if number == 1 and row == CSV_HEADER:
+            continue
+        yield number, row
+
+
+def read_ndjson(file: IO[str]) -> Iterator[Tuple[int, Any]]:
+    for number, line in enumerate(file, 1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+
+
+def read_json(file: IO[str],
+              chunk_size: int = 1 << 16) -> Iterator[Tuple[int, Any]]:
+    """
+    Элементы JSON-массива верхнего уровня, прочитанные по частям,
+    без загрузки всего файла в память.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Ожидается JSON-массив')
+    position, number = 1, 0
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise ValueError(f'Неверный JSON после элемента {number}')
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        number += 1
+        yield number, item
+        position = end
+
+
+def parse(item: Any) -> Optional[Row]:
+    """
+    Название и единица измерения из строки CSV, словаря
+    {name, measurement_unit} или списка [название, единица];
+    None, если данные неверны.
+    """
+    if isinstance(item, dict):
+        item = [item.get('name'), item.get('measurement_unit')]
+    if not isinstance(item, (list, tuple)) or len(item) != 2:
+        return None
+    if not all(isinstance(value, str) for value in item):
+        return None
+    name, unit = (value.strip() for value in item)
+    if not (0 < len(name) <= NAME_LENGTH and 0 < len(unit) <= UNIT_LENGTH):
+        return None
+    return name, unit
+
+
+class IngredientImporter:
+    """
+    Потоковая загрузка ингредиентов из CSV, JSON или NDJSON пачками.
+
+    Для каждой пачки одним запросом находятся уже существующие
+    ингредиенты, новые вставляются bulk_create(ignore_conflicts=True),
+    а в PostgreSQL - через COPY во временную таблицу и
+    INSERT ... ON CONFLICT DO NOTHING. Каждая пачка - в своей
+    транзакции. В режиме dry_run данные только проверяются.
+    """
+
+    def __init__(self,
+                 path: Path,
+                 file_format: str = None,
+                 batch_size: int = 5000,
+                 dry_run: bool = False,
+                 log: Callable[[str], None] = print):
+        self.path = Path(path)
+        self.format = (file_format or self.path.suffix.lstrip('.')).lower()
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.log = log
+        self.inserted = self.skipped = self.invalid = 0
+        self.use_copy = connection.vendor == 'postgresql'
+        # В режиме dry_run - ингредиенты, которые были бы добавлены.
+        self.planned = set()
+
+    def rows(self, file: IO[str]) -> Iterator[Optional[Row]]:
+        if self.format == 'csv':
+            items = read_csv(file)
+        elif self.format == 'json':
+            items = read_json(file)
+        elif self.format in NDJSON_FORMATS:
+            items = read_ndjson(file)
+        else:
+            raise ValueError(f'Неизвестный формат файла: {self.format}')
+        for number, item in items:
+            row = parse(item)
+            if row is None:
+                self.log(f'Запись {number}: неверные данные')
+            yield row
+
+    def run(self) -> None:
+        with open(self.path, newline='', encoding='utf-8') as file:
+            for batch in batched(self.rows(file), self.batch_size):
+                rows = [row for row in batch if row is not None]
+                self.invalid += len(batch) - len(rows)
+                self.load(rows)
+                self.log(
+                    f'Обработано {self.processed}: добавлено {self.inserted}, '
+                    f'пропущено {self.skipped}, с ошибками {self.invalid}'
+                )
+        if self.inserted and not self.dry_run:
+            catalog_changed(sender=Ingredient)
+
+    @property
+    def processed(self) -> int:
+        return self.inserted + self.skipped + self.invalid
+
+    def load(self, rows: List[Row]) -> None:
+        unique = list(dict.fromkeys(rows))
+        with transaction.atomic():
+            existing = set(
+                Ingredient.objects
+                .filter(name__in={name for name, _ in unique})
+                .values_list('name', 'measurement_unit')
+            )
+            new = [
+                row for row in unique
+                if row not in existing and row not in self.planned
+            ]
+            if self.dry_run:
+                self.planned.update(new)
+                inserted = len(new)
+            elif self.use_copy:
+                inserted = self.copy(new)
+            else:
+                Ingredient.objects.bulk_create(
+                    (Ingredient(name=name, measurement_unit=unit)
+                     for name, unit in new),
+                    ignore_conflicts=True
+                )
+                inserted = len(new)
+        self.inserted += inserted
+        self.skipped += len(rows) - inserted
+
+    def copy(self, rows: List[Row]) -> int:
+        """Вставка через COPY (PostgreSQL), возвращает число новых строк."""
+        if not rows:
+            return 0
+        buffer = StringIO()
+        csv.writer(buffer).writerows(
+            (name, unit, fold_name(name)) for name, unit in rows
+        )
+        buffer.seek(0)
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE IF NOT EXISTS ingredient_import '
+                '(name text, measurement_unit text, search_name text)'
+            )
+            cursor.execute('TRUNCATE ingredient_import')
+            cursor.copy_expert(
+                'COPY ingredient_import FROM STDIN WITH (FORMAT csv)', buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {table} '
+                '(name, measurement_unit, search_name, creation_date) '
+                'SELECT name, measurement_unit, search_name, now() '
+                'FROM ingredient_import '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            return cursor.rowcount
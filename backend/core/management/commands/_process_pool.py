@@ -0,0 +1,91 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from django.core.files.storage import Storage
+from django.core.management.base import BaseCommand, CommandError
+from recipes.cache import save_recipes
+from recipes.models import Recipe
+
+Refresh = Callable[[Storage, str, Dict, bool], Optional[Dict]]
+Task = Tuple[int, str, Dict, bool]
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """Разбивает поток объектов на пачки по size штук."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def process(refresh: Refresh, task: Task) -> Tuple[int, Optional[Dict]]:
+    """Одна картинка; выполняется в дочернем процессе, без БД."""
+    pk, image_name, value, force = task
+    storage = Recipe._meta.get_field('image').storage
+    return pk, refresh(storage, image_name, value, force)
+
+
+class RecipeImagesCommand(BaseCommand):
+    """
+    Пересчитывает JSON-поле `field` рецептов с картинками функцией
+    `refresh` (см. recipes.renditions.refresh_renditions) в пуле
+    процессов и записывает изменения пачками через save_recipes.
+    Без `--force` обрабатываются рецепты, где поле описывает
+    не текущую картинку.
+    """
+    field: str
+    refresh: Refresh
+    chunksize = 8
+    force_help: str
+    done_message: str
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true', help=self.force_help
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число процессов (по умолчанию - число ядер).'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        force = options['force']
+        recipes = (
+            Recipe.objects
+            .exclude(image='')
+            .order_by('id')
+            .values_list('id', 'image', self.field)
+        )
+        tasks = [
+            (pk, image, value or {}, force)
+            for pk, image, value in recipes.iterator()
+            if force or (value or {}).get('image') != image
+        ]
+        self.stdout.write(f'Рецептов с картинками для обработки: {len(tasks)}')
+        # Дочерние процессы работают только с хранилищем: соединение
+        # с БД, унаследованное при fork, в них не используется.
+        worker = partial(process, self.refresh)
+        updated = 0
+        try:
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                results = pool.map(worker, tasks, chunksize=self.chunksize)
+                for batch in batched(results, options['batch_size']):
+                    changed = [
+                        Recipe(pk=pk, **{self.field: value})
+                        for pk, value in batch if value is not None
+                    ]
+                    save_recipes(changed, (self.field,))
+                    updated += len(changed)
+                    self.stdout.write(f'Обновлено рецептов: {updated}')
+        except Exception as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            self.done_message.format(updated=updated)
+        ))
@@ -0,0 +1,281 @@
+import json
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Prefetch
+from recipes.cache import ALL, bump
+from recipes.counters import RECIPES_COUNT
+from recipes.models import Ingredient, IngredientsInRecipe, Recipe, Tag
+from recipes.signals import catalog_changed
+
+from ._process_pool import batched
+
+User = get_user_model()
+
+
+class RecipeExporter:
+    """
+    Выгрузка рецептов в NDJSON: одна строка на рецепт с тегами,
+    ингредиентами и автором. Связанные объекты указываются
+    естественными ключами (username автора, slug тега, название
+    и единица ингредиента), чтобы файл можно было загрузить в другую БД.
+    Рецепты читаются итератором по `chunk_size` (в PostgreSQL -
+    серверным курсором), поэтому память не зависит от размера таблицы.
+    """
+
+    def __init__(self,
+                 output: IO[str],
+                 chunk_size: int = 2000,
+                 log: Callable[[str], None] = print):
+        self.output = output
+        self.chunk_size = chunk_size
+        self.log = log
+        self.exported = 0
+
+    @staticmethod
+    def queryset():
+        return (
+            Recipe.objects
+            .order_by('id')
+            .select_related('author')
+            .prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.order_by('id')),
+                Prefetch(
+                    'qt_ingredients',
+                    queryset=(
+                        IngredientsInRecipe.objects
+                        .select_related('ingredient')
+                        .order_by('id')
+                    )
+                ),
+            )
+        )
+
+    @staticmethod
+    def serialize(recipe: Recipe) -> Dict[str, Any]:
+        return {
+            'id': recipe.id,
+            'name': recipe.name,
+            'author': recipe.author.username if recipe.author else None,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'image': recipe.image.name,
+            'creation_date': recipe.creation_date.isoformat(),
+            'tags': [tag.slug for tag in recipe.tags.all()],
+            'ingredients': [
+                {
+                    'name': item.ingredient.name,
+                    'measurement_unit': item.ingredient.measurement_unit,
+                    'amount': item.amount,
+                }
+                for item in recipe.qt_ingredients.all()
+            ],
+        }
+
+    def run(self) -> None:
+        recipes = self.queryset().iterator(chunk_size=self.chunk_size)
+        for recipe in recipes:
+            self.output.write(
+                json.dumps(self.serialize(recipe), ensure_ascii=False) + '\n'
+            )
+            self.exported += 1
+            if not self.exported % self.chunk_size:
+                self.log(f'Выгружено рецептов: {self.exported}')
+
+
+class RecipeImporter:
+    """
+    Загрузка рецептов из NDJSON, выгруженного RecipeExporter.
+
+    Строки обрабатываются пачками по `batch_size`, каждая пачка -
+    в своей транзакции: авторы, теги, ингредиенты и уже загруженные
+    рецепты находятся несколькими запросами на пачку, рецепты, их теги
+    и ингредиенты вставляются bulk_create. Недостающие ингредиенты
+    создаются, рецепты с неизвестным автором или тегом и рецепты,
+    которые уже есть у автора, пропускаются.
+
+    После каждой пачки номер последней загруженной строки сохраняется
+    в `state_path`; с `resume` загрузка продолжается после него.
+    Повторная загрузка тех же строк безопасна: существующие рецепты
+    пропускаются.
+    """
+
+    def __init__(self,
+                 path: Path,
+                 batch_size: int = 500,
+                 resume: bool = False,
+                 state_path: Path = None,
+                 log: Callable[[str], None] = print):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.resume = resume
+        self.state_path = Path(state_path or f'{self.path}.progress')
+        self.log = log
+        self.imported = self.skipped = self.invalid = 0
+        self.new_ingredients = 0
+
+    def read_state(self) -> int:
+        if not (self.resume and self.state_path.exists()):
+            return 0
+        return int(self.state_path.read_text().strip() or 0)
+
+    def lines(self, start: int) -> Iterable[Tuple[int, str]]:
+        with open(self.path, encoding='utf-8') as file:
+            for number, line in enumerate(file, 1):
+                if number > start and line.strip():
+                    yield number, line
+
+    def run(self) -> None:
+        start = self.read_state()
+        if start:
+            self.log(f'Продолжение после строки {start}')
+        try:
+            for batch in batched(self.lines(start), self.batch_size):
+                with transaction.atomic():
+                    self.load(batch)
+                self.state_path.write_text(str(batch[-1][0]))
+                self.log(
+                    f'Строка {batch[-1][0]}: загружено {self.imported}, '
+                    f'пропущено {self.skipped}, с ошибками {self.invalid}'
+                )
+        finally:
+            if self.new_ingredients:
+                catalog_changed(sender=Ingredient)
+            if self.imported:
+                bump((ALL,))
+        self.state_path.unlink(missing_ok=True)
+
+    def parse(self, number: int, line: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(line)
+            recipe = {
+                'name': item['name'].strip(),
+                'author': item.get('author'),
+                'text': item['text'],
+                'cooking_time': int(item['cooking_time']),
+                'image': item.get('image') or '',
+                'creation_date': item.get('creation_date'),
+                'tags': list(dict.fromkeys(item.get('tags', ()))),
+                'ingredients': {
+                    (ingredient['name'], ingredient['measurement_unit']):
+                    int(ingredient['amount'])
+                    for ingredient in item.get('ingredients', ())
+                },
+            }
+            if recipe['creation_date']:
+                recipe['creation_date'] = datetime.fromisoformat(
+                    recipe['creation_date']
+                )
+        except (ValueError, TypeError, KeyError, AttributeError):
+            recipe = None
+        if recipe is None or not recipe['name'] or recipe['cooking_time'] < 1:
+            self.log(f'Строка {number}: неверные данные')
+            return None
+        return recipe
+
+    def get_ingredients(self,
+                        keys: Iterable[Tuple[str, str]]
+                        ) -> Dict[Tuple[str, str], int]:
+        """id ингредиентов по названию и единице, недостающие создаются."""
+        keys = set(keys)
+
+        def find() -> Dict[Tuple[str, str], int]:
+            found = (
+                Ingredient.objects
+                .filter(name__in={name for name, _ in keys})
+                .values_list('name', 'measurement_unit', 'id')
+            )
+            return {
+                (name, unit): pk for name, unit, pk in found
+                if (name, unit) in keys
+            }
+
+        ingredients = find()
+        missing = keys - ingredients.keys()
+        if not missing:
+            return ingredients
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit=unit)
+             for name, unit in missing),
+            ignore_conflicts=True
+        )
+        self.new_ingredients += len(missing)
+        return find()
+
+    def load(self, batch: List[Tuple[int, str]]) -> None:
+        items = [self.parse(number, line) for number, line in batch]
+        items = [item for item in items if item is not None]
+        self.invalid += len(batch) - len(items)
+        authors = dict(
+            User.objects
+            .filter(username__in={item['author'] for item in items})
+            .values_list('username', 'id')
+        )
+        tags = dict(
+            Tag.objects
+            .filter(slug__in={slug for item in items for slug in item['tags']})
+            .values_list('slug', 'id')
+        )
+        existing = set(
+            Recipe.objects
+            .filter(name__in={item['name'] for item in items},
+                    author__isnull=False)
+            .values_list('name', 'author_id')
+        )
+        new = []
+        for item in items:
+            author_id = authors.get(item['author'])
+            known = (
+                (item['author'] is None or author_id)
+                and all(slug in tags for slug in item['tags'])
+            )
+            key = (item['name'], author_id)
+            if not known or (author_id and key in existing):
+                self.skipped += 1
+                continue
+            existing.add(key)
+            new.append((item, author_id))
+        if not new:
+            return
+        ingredients = self.get_ingredients(
+            key for item, _ in new for key in item['ingredients']
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                name=item['name'],
+                author_id=author_id,
+                text=item['text'],
+                cooking_time=item['cooking_time'],
+                image=item['image'],
+            )
+            for item, author_id in new
+        )
+        dated = []
+        for recipe, (item, _) in zip(recipes, new):
+            if item['creation_date']:
+                recipe.creation_date = item['creation_date']
+                dated.append(recipe)
+        Recipe.objects.bulk_update(dated, ('creation_date',))
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tags[slug])
+            for recipe, (item, _) in zip(recipes, new)
+            for slug in item['tags']
+        )
+        IngredientsInRecipe.objects.bulk_create(
+            IngredientsInRecipe(
+                recipe_id=recipe.pk,
+                ingredient_id=ingredients[key],
+                amount=amount,
+            )
+            for recipe, (item, _) in zip(recipes, new)
+            for key, amount in item['ingredients'].items()
+        )
+        for author_id, count in Counter(
+            author_id for _, author_id in new
+        ).items():
+            RECIPES_COUNT.change(author_id, count)
+        self.imported += len(recipes)
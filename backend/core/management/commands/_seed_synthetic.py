@@ -0,0 +1,274 @@
+import random
+from bisect import bisect
+from itertools import accumulate
+from typing import Callable, Iterable, List, Sequence
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import models, transaction
+from recipes.counters import COUNTERS
+from recipes.models import (FavoritesList, Ingredient, IngredientsInRecipe,
+                            Recipe, ShoppingList, Tag)
+from users.models import AuthorSubscription
+
+from ._process_pool import batched
+
+User = get_user_model()
+
+UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'по вкусу')
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+class ZipfSampler:
+    """
+    Выборка элементов с распределением Ципфа:
+    элемент с рангом k выбирается с вероятностью ~ 1 / k ** exponent.
+    """
+
+    def __init__(self,
+                 items: Sequence[int],
+                 exponent: float,
+                 rng: random.Random):
+        self.items = items
+        self.rng = rng
+        self.cum_weights = list(
+            accumulate(1 / rank ** exponent
+                       for rank in range(1, len(items) + 1))
+        )
+        self.total = self.cum_weights[-1] if self.cum_weights else 0
+
+    def choice(self) -> int:
+        index = bisect(self.cum_weights, self.rng.random() * self.total)
+        return self.items[min(index, len(self.items) - 1)]
+
+    def sample(self, k: int, exclude: int = None) -> List[int]:
+        """Возвращает до k уникальных элементов."""
+        k = min(k, len(self.items) - (exclude is not None))
+        result = set()
+        attempts = 0
+        while len(result) < k and attempts < k * 20:
+            item = self.choice()
+            if item != exclude:
+                result.add(item)
+            attempts += 1
+        return sorted(result)
+
+
+class SyntheticDataGenerator:
+    """
+    Генератор синтетических данных для нагрузочного тестирования.
+    Результат полностью определяется параметром seed.
+    """
+
+    def __init__(self,
+                 users: int,
+                 recipes: int,
+                 ingredients: int,
+                 ingredients_per_recipe: int,
+                 favorites_per_user: int,
+                 carts_per_user: int,
+                 subscriptions_per_user: int,
+                 exponent: float = 1.1,
+                 seed: int = 0,
+                 batch_size: int = 5000,
+                 prefix: str = 'synthetic',
+                 log: Callable[[str], None] = print):
+        self.users = users
+        self.recipes = recipes
+        self.ingredients = ingredients
+        self.ingredients_per_recipe = ingredients_per_recipe
+        self.favorites_per_user = favorites_per_user
+        self.carts_per_user = carts_per_user
+        self.subscriptions_per_user = subscriptions_per_user
+        self.exponent = exponent
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.log = log
+
+    def run(self) -> None:
+        self.check_prefix()
+        user_ids = self.create_users()
+        tag_ids = self.create_tags()
+        ingredient_ids = self.create_ingredients()
+        recipe_ids = self.create_recipes(user_ids)
+        self.create_recipe_relations(recipe_ids, ingredient_ids, tag_ids)
+        self.create_user_lists(FavoritesList, user_ids, recipe_ids,
+                               self.favorites_per_user)
+        self.create_user_lists(ShoppingList, user_ids, recipe_ids,
+                               self.carts_per_user)
+        self.create_subscriptions(user_ids)
+        self.rebuild_counters()
+
+    def check_prefix(self) -> None:
+        """
+        Повторный запуск с тем же префиксом упал бы на уникальных
+        именах пользователей посреди вставки, поэтому проверяется заранее.
+        """
+        if (
+            User.objects
+            .filter(username__startswith=f'{self.prefix}_user_')
+            .exists()
+        ):
+            raise ValueError(
+                f'Данные с префиксом {self.prefix!r} уже созданы. '
+                'Укажите другой --prefix.'
+            )
+
+    def popularity(self, ids: List[int]) -> ZipfSampler:
+        """Случайно распределяет ранги популярности между объектами."""
+        ranked = list(ids)
+        self.rng.shuffle(ranked)
+        return ZipfSampler(ranked, self.exponent, self.rng)
+
+    def insert(self,
+               model: models.Model,
+               objs: Iterable[models.Model],
+               total: int) -> None:
+        """Вставляет объекты пачками, каждая пачка в своей транзакции."""
+        done = 0
+        for batch in batched(objs, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+            done += len(batch)
+            self.log(f'{model._meta.verbose_name_plural}: {done}/{total}')
+
+    def list_size(self, mean: int) -> int:
+        """Длина списка пользователя: экспоненциальная со средним mean."""
+        if not mean:
+            return 0
+        return int(self.rng.expovariate(1 / mean))
+
+    def create_users(self) -> List[int]:
+        password = make_password(self.prefix)
+        objs = (
+            User(
+                username=f'{self.prefix}_user_{i}',
+                email=f'{self.prefix}_user_{i}@example.com',
+                first_name=f'Имя {i}',
+                last_name=f'Фамилия {i}',
+                password=password,
+            )
+            for i in range(self.users)
+        )
+        self.insert(User, objs, self.users)
+        return list(
+            User.objects
+            .filter(username__startswith=f'{self.prefix}_user_')
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+    def create_tags(self) -> List[int]:
+        for name, color, slug in TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color}
+            )
+        return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+    def create_ingredients(self) -> List[int]:
+        existing = Ingredient.objects.count()
+        missing = max(self.ingredients - existing, 0)
+        objs = (
+            Ingredient(
+                name=f'{self.prefix} ингредиент {i}',
+                measurement_unit=self.rng.choice(UNITS),
+            )
+            for i in range(missing)
+        )
+        self.insert(Ingredient, objs, missing)
+        return list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+
+    def create_recipes(self, user_ids: List[int]) -> List[int]:
+        authors = self.popularity(user_ids)
+        objs = (
+            Recipe(
+                name=f'{self.prefix} рецепт {i}',
+                author_id=authors.choice(),
+                image=f'recipe_images/{self.prefix}.png',
+                text=f'Описание рецепта {i}',
+                cooking_time=self.rng.randint(1, 180),
+            )
+            for i in range(self.recipes)
+        )
+        self.insert(Recipe, objs, self.recipes)
+        return list(
+            Recipe.objects
+            .filter(name__startswith=f'{self.prefix} рецепт ')
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+    def create_recipe_relations(self,
+                                recipe_ids: List[int],
+                                ingredient_ids: List[int],
+                                tag_ids: List[int]) -> None:
+        ingredients = self.popularity(ingredient_ids)
+        tags = self.popularity(tag_ids)
+        low = max(self.ingredients_per_recipe // 2, 1)
+        high = self.ingredients_per_recipe * 3 // 2
+
+        def amounts():
+            for recipe_id in recipe_ids:
+                size = self.rng.randint(low, max(high, low))
+                for ingredient_id in ingredients.sample(size):
+                    yield IngredientsInRecipe(
+                        recipe_id=recipe_id,
+                        ingredient_id=ingredient_id,
+                        amount=self.rng.randint(1, 1000),
+                    )
+
+        def recipe_tags():
+            through = Recipe.tags.through
+            for recipe_id in recipe_ids:
+                for tag_id in tags.sample(self.rng.randint(1, 3)):
+                    yield through(recipe_id=recipe_id, tag_id=tag_id)
+
+        self.insert(
+            IngredientsInRecipe, amounts(),
+            len(recipe_ids) * self.ingredients_per_recipe
+        )
+        self.insert(Recipe.tags.through, recipe_tags(), len(recipe_ids) * 2)
+
+    def create_user_lists(self,
+                          model: models.Model,
+                          user_ids: List[int],
+                          recipe_ids: List[int],
+                          per_user: int) -> None:
+        """Заполняет избранное или список покупок пользователей."""
+        recipes = self.popularity(recipe_ids)
+
+        def objs():
+            for user_id in user_ids:
+                size = self.list_size(per_user)
+                for recipe_id in recipes.sample(size):
+                    yield model(user_id=user_id, recipe_id=recipe_id)
+
+        self.insert(model, objs(), len(user_ids) * per_user)
+
+    def rebuild_counters(self) -> None:
+        """bulk_create не вызывает сигналы: пересчитывает счётчики."""
+        for counter in COUNTERS:
+            with transaction.atomic():
+                counter.rebuild()
+            self.log(f'{counter.name}: пересчитан')
+
+    def create_subscriptions(self, user_ids: List[int]) -> None:
+        authors = self.popularity(user_ids)
+        per_user = self.subscriptions_per_user
+
+        def objs():
+            for user_id in user_ids:
+                size = self.list_size(per_user)
+                for author_id in authors.sample(size, exclude=user_id):
+                    yield AuthorSubscription(
+                        user_id=user_id, author_id=author_id
+                    )
+
+        self.insert(AuthorSubscription, objs(), len(user_ids) * per_user)
@@ -0,0 +1,15 @@
+from recipes.placeholders import refresh_placeholder
+
+from ._process_pool import RecipeImagesCommand
+
+
+class Command(RecipeImagesCommand):
+    help = (
+        'Считает заглушки картинок рецептов (blurhash, миниатюра, цвет '
+        'и размеры) в пуле процессов'
+    )
+    field = 'placeholder'
+    refresh = staticmethod(refresh_placeholder)
+    chunksize = 32
+    force_help = 'Пересчитать заглушки и у рецептов, где они уже есть.'
+    done_message = 'Заглушки картинок обновлены у {updated} рецептов'
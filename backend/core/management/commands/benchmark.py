@@ -0,0 +1,59 @@
+from benchmarks import runner
+from benchmarks.scenarios import SCENARIOS
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк API на заполненной БД: p50/p95 времени ответа, '
+        'запросы к БД и пик памяти для каждого сценария'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario', action='append', choices=sorted(SCENARIOS),
+            help='Сценарий (можно указать несколько). По умолчанию все.'
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--save', metavar='PATH',
+            help='Сохранить результаты в JSON как базовые.'
+        )
+        parser.add_argument(
+            '--compare', metavar='PATH',
+            help='Сравнить результаты с базовыми из JSON.'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост времени и памяти (0.2 = 20%%).'
+        )
+
+    def handle(self, *args, **options):
+        names = options['scenario'] or list(SCENARIOS)
+        try:
+            results = runner.run(
+                names, options['iterations'], options['warmup']
+            )
+        except ValueError as error:
+            raise CommandError(error)
+
+        for name, metrics in results.items():
+            self.stdout.write(
+                f'{name:<28}'
+                + '  '.join(f'{key}={value}' for key, value in metrics.items())
+            )
+        if options['save']:
+            runner.save(results, options['save'])
+            self.stdout.write(f'Результаты сохранены в {options["save"]}')
+        if options['compare']:
+            regressions = runner.compare(
+                runner.load(options['compare']),
+                results,
+                options['threshold']
+            )
+            if regressions:
+                raise CommandError(
+                    'Регрессии производительности:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий не обнаружено'))
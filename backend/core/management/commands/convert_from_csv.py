@@ -1,16 +1,47 @@
-from django.core.management.base import BaseCommand, CommandError
-
-from ._convert_from_csv import cvs_to_dj_model
-
-
-class Command(BaseCommand):
-    help = 'Конвертор данных cvs to db.sqlite3'
-
-    def handle(self, *args, **options):
-        try:
-            cvs_to_dj_model()
-        except Exception as error:
-            raise CommandError(error)
-        self.stdout.write(self.style.SUCCESS(
-            'Операция конвертирования завершена успешно'
-        ))
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ._convert_from_csv import IngredientImporter
+
+DEFAULT_PATH = settings.BASE_DIR.resolve().parent / 'data' / 'ingredients.csv'
+
+
+class Command(BaseCommand):
+    help = (
+        'Загрузка ингредиентов из CSV, JSON или NDJSON пачками: '
+        'существующие пропускаются, неверные записи считаются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=DEFAULT_PATH,
+            help='Файл с ингредиентами (по умолчанию data/ingredients.csv).'
+        )
+        parser.add_argument(
+            '--format', choices=('csv', 'json', 'ndjson', 'jsonl'),
+            help='Формат файла. По умолчанию - по расширению.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только проверить файл, ничего не записывая.'
+        )
+
+    def handle(self, *args, **options):
+        importer = IngredientImporter(
+            path=options['path'],
+            file_format=options['format'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            log=self.stdout.write,
+        )
+        try:
+            importer.run()
+        except Exception as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Операция конвертирования завершена успешно: '
+            f'добавлено {importer.inserted}, пропущено {importer.skipped}, '
+            f'с ошибками {importer.invalid}'
+            + (' (без записи в БД)' if options['dry_run'] else '')
+        ))
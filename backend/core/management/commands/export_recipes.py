@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ._recipes_ndjson import RecipeExporter
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгрузка рецептов с тегами, ингредиентами и авторами в NDJSON '
+        'потоком, без загрузки всей таблицы в память'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл для выгрузки (по умолчанию - stdout).'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        to_stdout = options['output'] == '-'
+        output = (
+            self.stdout if to_stdout
+            else open(options['output'], 'w', encoding='utf-8')
+        )
+        exporter = RecipeExporter(
+            output=output,
+            chunk_size=options['chunk_size'],
+            # При выгрузке в stdout ход работы пишется в stderr.
+            log=self.stderr.write if to_stdout else self.stdout.write,
+        )
+        try:
+            exporter.run()
+        except Exception as error:
+            raise CommandError(error)
+        finally:
+            if not to_stdout:
+                output.close()
+        (self.stderr if to_stdout else self.stdout).write(self.style.SUCCESS(
+            f'Выгружено рецептов: {exporter.exported}'
+        ))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ._recipes_ndjson import RecipeImporter
+
+
+class Command(BaseCommand):
+    help = (
+        'Загрузка рецептов из NDJSON, выгруженного export_recipes, пачками '
+        'в отдельных транзакциях с возможностью продолжить после сбоя'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл NDJSON с рецептами.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с места, на котором прервалась загрузка.'
+        )
+        parser.add_argument(
+            '--state',
+            help='Файл с номером последней загруженной строки '
+                 '(по умолчанию <path>.progress).'
+        )
+
+    def handle(self, *args, **options):
+        importer = RecipeImporter(
+            path=options['path'],
+            batch_size=options['batch_size'],
+            resume=options['resume'],
+            state_path=options['state'],
+            log=self.stdout.write,
+        )
+        try:
+            importer.run()
+        except Exception as error:
+            raise CommandError(
+                f'{error}. Загрузку можно продолжить с параметром --resume'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Загрузка завершена: загружено {importer.imported}, '
+            f'пропущено {importer.skipped}, с ошибками {importer.invalid}'
+        ))
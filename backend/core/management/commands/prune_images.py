@@ -0,0 +1,121 @@
+import posixpath
+import re
+from datetime import timedelta
+from typing import Iterator, Set
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from recipes.models import Recipe
+from recipes.storage import ContentAddressedStorage
+
+# Папки первых байтов хеша: `recipe_images/ab/cd/`.
+SHARD = re.compile(r'^[0-9a-f]{2}$')
+
+
+def shards(storage: ContentAddressedStorage, directory: str) -> Iterator[str]:
+    """Папки `<directory>/ab/cd` с картинками по содержимому."""
+    if not storage.exists(directory):
+        return
+    for first in storage.listdir(directory)[0]:
+        if not SHARD.match(first):
+            continue
+        for second in storage.listdir(posixpath.join(directory, first))[0]:
+            if SHARD.match(second):
+                yield posixpath.join(directory, first, second)
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки рецептов в хранилище по содержимому '
+        '(recipes.storage.ContentAddressedStorage), на которые не ссылается '
+        'ни один рецепт, и уменьшенные копии таких картинок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=24 * 3600,
+            help=(
+                'Не удалять файлы моложе стольких секунд (по умолчанию - '
+                'сутки): картинка могла быть сохранена, а рецепт с ней '
+                'ещё не записан.'
+            )
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать файлы, ничего не удаляя.'
+        )
+
+    def handle(self, *args, **options):
+        storage = Recipe._meta.get_field('image').storage
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError(
+                'Картинки рецептов хранятся не в ContentAddressedStorage.'
+            )
+        # Время отсечки берётся до чтения ссылок: картинка, сохранённая
+        # после этого, не удаляется, даже если рецепт ещё не записан.
+        deadline = timezone.now() - timedelta(seconds=options['min_age'])
+        referenced = {
+            posixpath.splitext(name)[0]
+            for name in Recipe.objects
+            .exclude(image='')
+            .values_list('image', flat=True)
+            .distinct()
+            .iterator()
+        }
+        self.dry_run = options['dry_run']
+        images = renditions = 0
+        for directory in sorted(storage.directories):
+            for shard in shards(storage, directory):
+                images += self.prune_images(
+                    storage, shard, referenced, deadline
+                )
+                renditions += self.prune_renditions(
+                    storage, shard, referenced, deadline
+                )
+        verb = 'Можно удалить' if self.dry_run else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} картинок: {images}, папок с копиями: {renditions}'
+        ))
+
+    def delete(self, storage: ContentAddressedStorage, name: str) -> None:
+        if not self.dry_run:
+            storage.delete(name)
+
+    def prune_images(self, storage: ContentAddressedStorage, shard: str,
+                     referenced: Set[str], deadline) -> int:
+        """Картинки папки `shard` без рецептов, старше `deadline`."""
+        deleted = 0
+        for filename in storage.listdir(shard)[1]:
+            name = posixpath.join(shard, filename)
+            if (
+                not storage.is_hashed(name)
+                or posixpath.splitext(name)[0] in referenced
+                or storage.get_modified_time(name) > deadline
+            ):
+                continue
+            self.delete(storage, name)
+            deleted += 1
+        return deleted
+
+    def prune_renditions(self, storage: ContentAddressedStorage, shard: str,
+                         referenced: Set[str], deadline) -> int:
+        """
+        Копии картинок папки `shard`, на которые не ссылаются рецепты
+        (см. recipes.renditions.rendition_name), старше `deadline`.
+        """
+        root = posixpath.join(shard, 'renditions')
+        if not storage.exists(root):
+            return 0
+        deleted = 0
+        for stem in storage.listdir(root)[0]:
+            directory = posixpath.join(root, stem)
+            if (
+                posixpath.join(shard, stem) in referenced
+                or storage.get_modified_time(directory) > deadline
+            ):
+                continue
+            for filename in storage.listdir(directory)[1]:
+                self.delete(storage, posixpath.join(directory, filename))
+            self.delete(storage, directory)
+            deleted += 1
+        return deleted
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.cache import recipes_changed
+from recipes.counters import COUNTERS
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет денормализованные счётчики пользователей и рецептов '
+        'по настоящему количеству и пересчитывает расхождения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только проверить; при расхождениях завершиться с ошибкой.'
+        )
+        parser.add_argument(
+            '--show', type=int, default=10,
+            help='Сколько расхождений выводить для каждого счётчика.'
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for counter in COUNTERS:
+            with transaction.atomic():
+                mismatches = counter.mismatches()
+                count = mismatches.count()
+                total += count
+                self.stdout.write(f'{counter.name}: расхождений {count}')
+                for obj in mismatches[:options['show']]:
+                    self.stdout.write(
+                        f'  {obj.pk}: {getattr(obj, counter.field)} '
+                        f'вместо {obj.real_count}'
+                    )
+                if count and not options['verify']:
+                    ids = list(mismatches.values_list('pk', flat=True))
+                    counter.rebuild()
+                    if counter.model is Recipe:
+                        # Счётчики рецептов входят в их представление.
+                        recipes_changed(Recipe.objects.filter(pk__in=ids))
+        if options['verify'] and total:
+            raise CommandError(f'Счётчики расходятся: {total}')
+        if total:
+            self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Счётчики верны'))
@@ -0,0 +1,15 @@
+from recipes.renditions import refresh_renditions
+
+from ._process_pool import RecipeImagesCommand
+
+
+class Command(RecipeImagesCommand):
+    help = (
+        'Создаёт уменьшенные копии картинок рецептов (WebP и JPEG) '
+        'в пуле процессов. Копии прежних картинок в общем хранилище '
+        'не удаляются: после смены картинок запустите prune_images'
+    )
+    field = 'renditions'
+    refresh = staticmethod(refresh_renditions)
+    force_help = 'Пересоздать копии и у рецептов, где они уже есть.'
+    done_message = 'Копии картинок обновлены у {updated} рецептов'
@@ -0,0 +1,109 @@
+import os
+import posixpath
+import shutil
+from typing import Dict
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes.cache import save_recipes
+from recipes.models import Recipe
+from recipes.renditions import find_renditions, rendition_name
+from recipes.storage import ContentAddressedStorage
+
+from ._process_pool import batched
+
+
+def renditions_path(storage: ContentAddressedStorage, image_name: str) -> str:
+    return storage.path(
+        posixpath.dirname(rendition_name(image_name, 0, 'webp'))
+    )
+
+
+def move_renditions(storage: ContentAddressedStorage, old_name: str,
+                    new_name: str) -> None:
+    """
+    Переносит копии картинки к её новому имени; если у файла с новым
+    именем копии уже есть, копии прежнего имени удаляются.
+    """
+    old_path = renditions_path(storage, old_name)
+    if not os.path.isdir(old_path):
+        return
+    if find_renditions(storage, new_name):
+        shutil.rmtree(old_path)
+        return
+    new_path = renditions_path(storage, new_name)
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    os.replace(old_path, new_path)
+
+
+class Command(BaseCommand):
+    help = (
+        'Переименовывает картинки рецептов по содержимому '
+        '(recipes.storage.ContentAddressedStorage): одинаковые файлы '
+        'заменяются одним'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        storage = Recipe._meta.get_field('image').storage
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError(
+                'Картинки рецептов хранятся не в ContentAddressedStorage.'
+            )
+        names = (
+            Recipe.objects
+            .exclude(image='')
+            .order_by('image')
+            .values_list('image', flat=True)
+            .distinct()
+        )
+        old_names = [
+            name for name in names.iterator()
+            if not storage.is_hashed(name)
+            and posixpath.dirname(name) in storage.directories
+        ]
+        self.stdout.write(f'Картинок для переименования: {len(old_names)}')
+        renamed = missing = 0
+        for batch in batched(old_names, options['batch_size']):
+            new_names: Dict[str, str] = {}
+            for old_name in batch:
+                if not storage.exists(old_name):
+                    missing += 1
+                    continue
+                with storage.open(old_name) as file:
+                    new_names[old_name] = storage.save(old_name, file)
+                move_renditions(storage, old_name, new_names[old_name])
+            self.update_recipes(storage, new_names)
+            for old_name in new_names:
+                storage.delete(old_name)
+            renamed += len(new_names)
+            self.stdout.write(f'Переименовано картинок: {renamed}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Переименовано картинок: {renamed}, '
+            f'файлов не найдено: {missing}'
+        ))
+
+    @staticmethod
+    def update_recipes(storage: ContentAddressedStorage,
+                       new_names: Dict[str, str]) -> None:
+        """
+        Новые имена картинок у рецептов, одним запросом на пачку;
+        кэш сбрасывается только для этих рецептов.
+        """
+        recipes = list(
+            Recipe.objects
+            .filter(image__in=new_names)
+            .only('id', 'image', 'renditions', 'placeholder')
+        )
+        for recipe in recipes:
+            old_name = recipe.image.name
+            recipe.image.name = new_names[old_name]
+            if (recipe.renditions or {}).get('image') == old_name:
+                recipe.renditions = find_renditions(
+                    storage, recipe.image.name
+                )
+            if (recipe.placeholder or {}).get('image') == old_name:
+                # Заглушка зависит только от содержимого файла.
+                recipe.placeholder['image'] = recipe.image.name
+        save_recipes(recipes, ('image', 'renditions', 'placeholder'))
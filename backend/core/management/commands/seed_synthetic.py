@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ._seed_synthetic import SyntheticDataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерация синтетических пользователей, рецептов, избранного, '
+        'списков покупок и подписок для нагрузочного тестирования'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients', type=int, default=2000,
+            help='Минимальный размер каталога ингредиентов.'
+        )
+        parser.add_argument('--ingredients-per-recipe', type=int, default=10)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--carts-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения популярности.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='synthetic',
+            help='Префикс имён создаваемых объектов.'
+        )
+
+    def handle(self, *args, **options):
+        generator = SyntheticDataGenerator(
+            users=options['users'],
+            recipes=options['recipes'],
+            ingredients=options['ingredients'],
+            ingredients_per_recipe=options['ingredients_per_recipe'],
+            favorites_per_user=options['favorites_per_user'],
+            carts_per_user=options['carts_per_user'],
+            subscriptions_per_user=options['subscriptions_per_user'],
+            exponent=options['zipf'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            prefix=options['prefix'],
+            log=self.stdout.write,
+        )
+        try:
+            generator.run()
+        except Exception as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            'Генерация синтетических данных завершена успешно'
+        ))
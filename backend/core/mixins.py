@@ -0,0 +1,120 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from hashlib import md5
+from typing import Any, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Model
+from django.http import HttpResponseBase
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+Version = Tuple[Any, Optional[datetime]]
+
+
+class CompiledSerializerMixin:
+    """
+    Для чтения (`compiled_actions` методами GET и HEAD) использует
+    `compiled_serializer_class` (см. core.compiled), если включено
+    `compiled_serializers`. Для записи остаются обычные сериализаторы.
+    """
+    compiled_serializer_class = None
+    compiled_serializers = settings.COMPILED_SERIALIZERS
+    compiled_actions = ('list', 'retrieve')
+
+    def use_compiled_serializer(self) -> bool:
+        return bool(
+            self.compiled_serializers
+            and self.compiled_serializer_class
+            and self.action in self.compiled_actions
+            and self.request.method in ('GET', 'HEAD')
+        )
+
+    def get_serializer_class(self):
+        if self.use_compiled_serializer():
+            return self.compiled_serializer_class
+        return super().get_serializer_class()
+
+
+class ConditionalGetMixin(ABC):
+    """
+    Условные GET-запросы для `list` и `retrieve`.
+
+    Ответы получают сильный ETag и Last-Modified. Если клиент прислал
+    совпадающий If-None-Match (или не устаревший If-Modified-Since),
+    возвращается 304 без сериализации.
+
+    Представление определяет `get_list_version` и `get_object_version`:
+    они возвращают значение, от которого зависит ответ, и время
+    последнего изменения (или None). ETag строится из этого значения,
+    адреса запроса, формата ответа и данных пагинации.
+    """
+
+    @abstractmethod
+    def get_list_version(self, objects) -> Version:
+        """Версия и время изменения страницы списка `objects`."""
+
+    @abstractmethod
+    def get_object_version(self, obj: Model) -> Version:
+        """Версия и время изменения объекта `obj`."""
+
+    def make_etag(self, request: Request, *parts) -> str:
+        raw = repr((
+            request.get_full_path(), request.accepted_media_type, parts
+        ))
+        return quote_etag(md5(raw.encode()).hexdigest())
+
+    def get_not_modified(self,
+                         request: Request,
+                         etag: str,
+                         last_modified: Optional[datetime]
+                         ) -> Optional[HttpResponseBase]:
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=(
+                int(last_modified.timestamp()) if last_modified else None
+            ),
+        )
+
+    @staticmethod
+    def set_validators(response: Response,
+                       etag: str,
+                       last_modified: Optional[datetime]) -> Response:
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+    def list(self, request: Request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = queryset if page is None else page
+        pagination = None
+        if page is not None:
+            pagination = self.get_paginated_response([]).data
+        version, last_modified = self.get_list_version(objects)
+        etag = self.make_etag(request, version, pagination)
+        not_modified = self.get_not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        serializer = self.get_serializer(objects, many=True)
+        if page is None:
+            response = Response(serializer.data)
+        else:
+            response = self.get_paginated_response(serializer.data)
+        return self.set_validators(response, etag, last_modified)
+
+    def retrieve(self, request: Request, *args, **kwargs):
+        instance = self.get_object()
+        version, last_modified = self.get_object_version(instance)
+        etag = self.make_etag(request, version)
+        not_modified = self.get_not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        serializer = self.get_serializer(instance)
+        return self.set_validators(
+            Response(serializer.data), etag, last_modified
+        )
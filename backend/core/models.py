@@ -27,3 +27,22 @@ class CommonFieldsModel(CreationDate):
     class Meta:
         ordering = ('name',)
         abstract = True
+
+
+class CountersMixin:
+    """
+    Примесь для моделей с денормализованными счётчиками `counter_fields`.
+    Счётчики меняются только UPDATE с F(), поэтому save() загруженного
+    объекта не перезаписывает их устаревшими значениями.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not args
+                and kwargs.get('update_fields') is None):
+            skip = {*self.counter_fields, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skip
+            ]
+        super().save(*args, **kwargs)
@@ -1,5 +1,325 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from hashlib import md5
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Model, Q
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import View
+
+MAX_PAGE_SIZE = 100
+
+
+def estimate_count(queryset: QuerySet) -> Optional[int]:
+    """
+    Оценка количества строк планировщиком PostgreSQL: `reltuples` для
+    таблицы без фильтров, иначе число строк плана EXPLAIN.
+    Для остальных СУБД возвращает None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                (queryset.model._meta.db_table,)
+            )
+            row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return int(row[0])
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class ProbedPage(Page):
+    """Страница, у которой наличие следующей известно по самим строкам."""
+
+    def __init__(self, object_list, number, paginator, has_more: bool):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self) -> bool:
+        return self.has_more
+
+    def end_index(self) -> int:
+        return self.start_index() + len(self.object_list) - 1
+
+
+class ApproximateCountDjangoPaginator(Paginator):
+    """
+    Paginator с дешёвым подсчётом количества объектов.
+
+    Результаты не больше `exact_count_limit` считаются точно.
+    Для больших результатов на PostgreSQL используется оценка
+    планировщика, а посчитанное количество кэшируется на
+    `cache_timeout` секунд для каждой комбинации фильтров (по SQL)
+    вместе с признаком точности. Атрибут `count_exact` показывает,
+    точное ли количество.
+
+    Если количество не посчитано только что (оценка или кэш), границы
+    страниц по нему не проверяются: страница читается с одной лишней
+    строкой, и следующая страница есть, если эта строка нашлась.
+    """
+    exact_count_limit = 1000
+    cache_timeout = 60
+
+    @cached_property
+    def counted(self) -> Tuple[int, bool, bool]:
+        """
+        Количество, признак точности и признак того, что количество
+        посчитано точно в этом запросе.
+        """
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count, True, True
+        sql, params = queryset.order_by().query.sql_with_params()
+        key = 'paginator-count:' + md5(
+            repr((queryset.db, sql, params)).encode()
+        ).hexdigest()
+        cached = cache.get(key)
+        if cached is not None:
+            return (*cached, False)
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate > self.exact_count_limit:
+            counted = estimate, False, False
+        else:
+            counted = queryset.count(), True, True
+        if counted[0] > self.exact_count_limit:
+            cache.set(key, counted[:2], self.cache_timeout)
+        return counted
+
+    @property
+    def count(self) -> int:
+        return self.counted[0]
+
+    @property
+    def count_exact(self) -> bool:
+        return self.counted[1]
+
+    @property
+    def count_fresh(self) -> bool:
+        return self.counted[2]
+
+    def validate_number(self, number) -> int:
+        """
+        При количестве не из этого запроса не отклоняет номера страниц
+        за его пределами.
+        """
+        if self.count_fresh:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы не целое число.')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1.')
+        return number
+
+    def page(self, number) -> Page:
+        number = self.validate_number(number)
+        if self.count_fresh:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('На этой странице нет результатов.')
+        return ProbedPage(
+            rows[:self.per_page], number, self, len(rows) > self.per_page
+        )
 
 
 class CustomPaginator(PageNumberPagination):
     page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class KeysetPaginator(BasePagination):
+    """
+    Keyset (cursor) пагинация по стабильным индексированным ключам.
+
+    Порядок задаётся атрибутом `cursor_ordering` представления,
+    по умолчанию (`-creation_date`, `-id`). Последний ключ должен быть
+    уникальным. Курсор - непрозрачная строка с ключами крайней записи
+    страницы и направлением. Не выполняет COUNT и OFFSET.
+    """
+    cursor_query_param = 'cursor'
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE')
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    ordering = ('-creation_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self,
+                          queryset: QuerySet,
+                          request: Request,
+                          view: View = None) -> Optional[List[Model]]:
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        self.page_size = self.get_page_size(request)
+        self.fields = [
+            queryset.model._meta.get_field(key.lstrip('-'))
+            for key in self.ordering
+        ]
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[1])
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self.invert(key) for key in self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self.after(ordering, cursor[0]))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    @staticmethod
+    def invert(key: str) -> str:
+        return key[1:] if key.startswith('-') else f'-{key}'
+
+    def after(self, ordering: Tuple[str], values: list) -> Q:
+        """
+        Условие "строго после позиции values" при заданном порядке:
+        (a, b) > (x, y) == a > x OR (a == x AND b > y).
+        """
+        condition = Q()
+        for index in reversed(range(len(ordering))):
+            key = ordering[index]
+            name = key.lstrip('-')
+            lookup = 'lt' if key.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            if condition:
+                step |= Q(**{name: values[index]}) & condition
+            condition = step
+        return condition
+
+    def encode_cursor(self, instance: Model, reverse: bool) -> str:
+        position = {
+            'p': [field.value_to_string(instance) for field in self.fields],
+            'r': int(reverse),
+        }
+        token = urlsafe_b64encode(
+            json.dumps(position, separators=(',', ':')).encode()
+        ).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, token
+        )
+
+    def decode_cursor(self, request: Request) -> Optional[Tuple[list, bool]]:
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(token.encode()))
+            if len(position['p']) != len(self.fields):
+                raise ValueError
+            values = [
+                field.to_python(value)
+                for field, value in zip(self.fields, position['p'])
+            ]
+            return values, bool(position['r'])
+        except (BinasciiError, ValueError, KeyError, TypeError,
+                ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return replace_query_param(
+                self.base_url, self.cursor_query_param, ''
+            )
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data: list) -> Response:
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class CursorOrPageNumberPaginator(CustomPaginator):
+    """
+    Номерная пагинация; если в запросе есть параметр `cursor`
+    (в том числе пустой для первой страницы) - keyset пагинация.
+    """
+    cursor_paginator_class = KeysetPaginator
+
+    def paginate_queryset(self,
+                          queryset: QuerySet,
+                          request: Request,
+                          view: View = None) -> Optional[List[Model]]:
+        self.cursor_paginator = None
+        cursor_param = self.cursor_paginator_class.cursor_query_param
+        if cursor_param in request.query_params:
+            self.cursor_paginator = self.cursor_paginator_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data: list) -> Response:
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class ApproximateCountPaginator(CursorOrPageNumberPaginator):
+    """
+    Как CursorOrPageNumberPaginator, но количество в номерной пагинации
+    считается ApproximateCountDjangoPaginator, а в ответ добавляется
+    `count_exact`.
+    """
+    django_paginator_class = ApproximateCountDjangoPaginator
+
+    def get_paginated_response(self, data: list) -> Response:
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return Response({
+            'count': self.page.paginator.count,
+            'count_exact': self.page.paginator.count_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
@@ -0,0 +1,48 @@
+import orjson
+from rest_framework.parsers import BaseParser, FileUploadParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Парсер NDJSON (`application/x-ndjson`): список значений, по одному
+    на строку. Поток читается построчно; строка с неверным JSON
+    становится None, чтобы ошибка в одной записи не отменяла разбор
+    остальных.
+    Если у представления есть метод `check_items_count(count)`, он
+    вызывается после каждой записи: его исключение прерывает разбор,
+    и остаток тела не читается.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return []
+        check_items_count = getattr(
+            (parser_context or {}).get('view'), 'check_items_count', None
+        )
+        items = []
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                items.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                items.append(None)
+            if check_items_count is not None:
+                check_items_count(len(items))
+        return items
+
+
+class ImageUploadParser(FileUploadParser):
+    """
+    Изображение в теле запроса (`Content-Type: image/*`). В отличие
+    от FileUploadParser не требует Content-Disposition с именем файла:
+    имя всё равно заменяется при сохранении.
+    """
+    media_type = 'image/*'
+
+    def get_filename(self, stream, media_type, parser_context):
+        return (
+            super().get_filename(stream, media_type, parser_context)
+            or 'upload'
+        )
@@ -0,0 +1,66 @@
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer на orjson. Даты и остальные типы, которые orjson
+    не сериализует сам, обрабатывает encoder_class; ключи словарей
+    не строки (int, ErrorDetail) приводятся к строкам, как в json.
+    Данные, которые orjson не сериализует (например, целые шире
+    64 бит), выводит JSONRenderer; он же используется для
+    форматированного вывода (`indent`) и нестандартных настроек
+    UNICODE_JSON/COMPACT_JSON.
+
+    Отличия от JSONRenderer только в записи float: другая запись
+    тех же чисел (`0.00001` вместо `1e-05`), а NaN и бесконечности
+    выводятся как null, а не вызывают ошибку.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=self.options
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for char, escaped in LINE_SEPARATORS:
+            if char in ret:
+                ret = ret.replace(char, escaped)
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack renderer, выбирается заголовком
+    `Accept: application/msgpack`. Доступен, если установлен msgpack.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder_class = JSONRenderer.encoder_class
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(
+            data, default=self.encoder_class().default, use_bin_type=True
+        )
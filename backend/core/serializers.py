@@ -1,11 +1,28 @@
+from typing import Dict, Optional
+
 from recipes.models import Recipe
-from rest_framework.serializers import ModelSerializer
+from recipes.placeholders import get_placeholder
+from recipes.renditions import get_srcset
+from rest_framework.serializers import ModelSerializer, SerializerMethodField
 
 
 class CroppedRecipeSerializer(ModelSerializer):
     """Сериализатор для вывода определённого набора полей."""
+    srcset = SerializerMethodField()
+    placeholder = SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'srcset', 'placeholder',
+                  'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
+
+    def get_srcset(self, obj: Recipe) -> Dict[str, str]:
+        """Уменьшенные копии картинки по форматам."""
+        return get_srcset(
+            obj.image.name, obj.renditions, self.context.get('request')
+        )
+
+    def get_placeholder(self, obj: Recipe) -> Optional[Dict]:
+        """Заглушка картинки, пока она не загрузилась."""
+        return get_placeholder(obj.image.name, obj.placeholder)
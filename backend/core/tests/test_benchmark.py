@@ -0,0 +1,98 @@
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from benchmarks import runner
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+BASELINE = {
+    'recipe_detail': {
+        'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 5,
+        'peak_memory_kb': 100.0, 'errors': 0,
+    },
+}
+
+
+def results(**changes) -> dict:
+    return {'recipe_detail': dict(BASELINE['recipe_detail'], **changes)}
+
+
+class CompareTestCase(SimpleTestCase):
+    """Сравнение результатов бенчмарка с базовыми."""
+
+    def test_regression(self):
+        self.assertEqual(
+            runner.compare(BASELINE, results(p95_ms=30.0), 0.2),
+            ['recipe_detail.p95_ms: 20.0 -> 30.0']
+        )
+        self.assertEqual(
+            runner.compare(BASELINE, results(queries=6), 0.2),
+            ['recipe_detail.queries: 5 -> 6']
+        )
+        # Рост в пределах порога - не регрессия.
+        self.assertEqual(
+            runner.compare(BASELINE, results(p50_ms=11.0), 0.2), []
+        )
+
+    def test_improvement(self):
+        self.assertEqual(
+            runner.compare(
+                BASELINE,
+                results(p50_ms=5.0, p95_ms=8.0, queries=2,
+                        peak_memory_kb=50.0),
+                0.2
+            ),
+            []
+        )
+
+    def test_errors(self):
+        """Любой рост числа ошибок - регрессия, даже при пороге."""
+        self.assertEqual(
+            runner.compare(BASELINE, results(errors=1), 10),
+            ['recipe_detail.errors: 0 -> 1']
+        )
+        old_baseline = {
+            name: {key: value for key, value in metrics.items()
+                   if key != 'errors'}
+            for name, metrics in BASELINE.items()
+        }
+        self.assertEqual(
+            runner.compare(old_baseline, results(errors=2), 0.2),
+            ['recipe_detail.errors: 0 -> 2']
+        )
+        self.assertEqual(
+            runner.compare(results(errors=3), results(errors=1), 0.2), []
+        )
+
+
+class BenchmarkCommandTestCase(SimpleTestCase):
+    """Код завершения команды benchmark с `--compare`."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = os.path.join(directory.name, 'baseline.json')
+        runner.save(BASELINE, self.baseline)
+
+    def benchmark(self, measured: dict) -> str:
+        stdout = StringIO()
+        with patch.object(runner, 'run', return_value=measured):
+            call_command(
+                'benchmark', '--scenario', 'recipe_detail',
+                '--compare', self.baseline, stdout=stdout
+            )
+        return stdout.getvalue()
+
+    def test_no_regressions(self):
+        self.assertIn('Регрессий не обнаружено', self.benchmark(results()))
+
+    def test_regressions(self):
+        with self.assertRaises(CommandError) as context:
+            self.benchmark(results(errors=1, queries=7))
+        self.assertEqual(context.exception.returncode, 1)
+        message = str(context.exception)
+        self.assertIn('recipe_detail.errors: 0 -> 1', message)
+        self.assertIn('recipe_detail.queries: 5 -> 7', message)
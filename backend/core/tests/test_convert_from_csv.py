@@ -0,0 +1,82 @@
+import json
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.core.management import call_command
+from django.test import TestCase
+from recipes.models import Ingredient
+
+from ..management.commands._convert_from_csv import read_json
+
+CSV = '''name,measurement_unit
+Мука,г
+Сахар,г
+Мука,г
+Соль,
+Молоко,мл,лишнее
+Яйца,шт.
+'''
+INGREDIENTS = [
+    {'name': 'Мука', 'measurement_unit': 'г'},
+    {'name': 'Масло', 'measurement_unit': 'г'},
+    ['Вода', 'мл'],
+    {'name': ''},
+    42,
+]
+
+
+class ConvertFromCSVTestCase(TestCase):
+    """Загрузка ингредиентов командой convert_from_csv."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.create(name='Яйца', measurement_unit='шт.')
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def convert(self, name: str, content: str, *args) -> str:
+        path = self.directory / name
+        path.write_text(content, encoding='utf-8')
+        out = StringIO()
+        call_command(
+            'convert_from_csv', '--path', str(path), '--batch-size', '2',
+            *args, stdout=out
+        )
+        return out.getvalue()
+
+    def names(self):
+        return set(Ingredient.objects.values_list('name', flat=True))
+
+    def test_csv(self):
+        out = self.convert('ingredients.csv', CSV)
+        self.assertIn('добавлено 2, пропущено 2, с ошибками 2', out)
+        self.assertEqual(self.names(), {'Мука', 'Сахар', 'Яйца'})
+        self.assertEqual(
+            Ingredient.objects.get(name='Мука').search_name, 'мука'
+        )
+
+    def test_json(self):
+        out = self.convert('ingredients.json', json.dumps(INGREDIENTS))
+        self.assertIn('добавлено 3, пропущено 0, с ошибками 2', out)
+        self.assertEqual(self.names(), {'Мука', 'Масло', 'Вода', 'Яйца'})
+        out = self.convert(
+            'ingredients.ndjson',
+            '\n'.join(json.dumps(item) for item in INGREDIENTS)
+        )
+        self.assertIn('добавлено 0, пропущено 3, с ошибками 2', out)
+
+    def test_dry_run(self):
+        out = self.convert('ingredients.csv', CSV, '--dry-run')
+        self.assertIn('добавлено 2, пропущено 2, с ошибками 2', out)
+        self.assertEqual(self.names(), {'Яйца'})
+
+    def test_read_json_in_chunks(self):
+        items = [{'name': f'ингредиент {i}'} for i in range(100)]
+        self.assertEqual(
+            [item for _, item in read_json(StringIO(json.dumps(items)), 7)],
+            items
+        )
@@ -0,0 +1,125 @@
+import json
+from datetime import datetime, timezone
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from recipes.counters import RECIPES_COUNT
+from recipes.models import Ingredient, IngredientsInRecipe, Recipe, Tag
+
+User = get_user_model()
+CREATED = datetime(2023, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+class RecipesNDJSONTestCase(TestCase):
+    """Выгрузка и загрузка рецептов командами export/import_recipes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'тег {i}', color=f'#E26C2{i}', slug=f'tag{i}')
+            for i in range(2)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {i}', measurement_unit='г')
+            for i in range(3)
+        )
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                name=f'рецепт {i}', author=cls.author, text='текст',
+                cooking_time=i + 1, image=f'recipes/{i}.png'
+            )
+            recipe.tags.set(tags[:i % 3])
+            IngredientsInRecipe.objects.bulk_create(
+                IngredientsInRecipe(
+                    recipe=recipe, ingredient=ingredient, amount=i + 10
+                )
+                for ingredient in ingredients[:i % 4]
+            )
+        Recipe.objects.update(creation_date=CREATED)
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'recipes.ndjson'
+
+    def export(self):
+        call_command('export_recipes', '--output', str(self.path),
+                     '--chunk-size', '2', stdout=StringIO())
+        return [
+            json.loads(line)
+            for line in self.path.read_text(encoding='utf-8').splitlines()
+        ]
+
+    def import_(self, *args) -> str:
+        out = StringIO()
+        call_command('import_recipes', str(self.path), '--batch-size', '2',
+                     *args, stdout=out)
+        return out.getvalue()
+
+    def snapshot(self):
+        return [
+            {key: value for key, value in item.items() if key != 'id'}
+            for item in self.export()
+        ]
+
+    def test_export(self):
+        recipes = self.export()
+        self.assertEqual(len(recipes), 5)
+        self.assertEqual(recipes[3], {
+            'id': Recipe.objects.get(name='рецепт 3').id,
+            'name': 'рецепт 3',
+            'author': 'author',
+            'text': 'текст',
+            'cooking_time': 4,
+            'image': 'recipes/3.png',
+            'creation_date': CREATED.isoformat(),
+            'tags': [],
+            'ingredients': [
+                {'name': f'ингредиент {i}', 'measurement_unit': 'г',
+                 'amount': 13}
+                for i in range(3)
+            ],
+        })
+
+    def test_round_trip(self):
+        """
+        После загрузки в пустую таблицу рецепты совпадают с исходными,
+        недостающие ингредиенты создаются, счётчик рецептов автора
+        обновляется.
+        """
+        expected = self.snapshot()
+        Recipe.objects.all().delete()
+        Ingredient.objects.filter(name='ингредиент 2').delete()
+        self.assertIn('загружено 5, пропущено 0', self.import_())
+        self.assertEqual(self.snapshot(), expected)
+        self.assertFalse(RECIPES_COUNT.mismatches().exists())
+        self.assertFalse(self.path.with_name('recipes.ndjson.progress')
+                         .exists())
+
+    def test_skip_existing_and_invalid(self):
+        self.export()
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write('{"name": "без времени"}\n')
+            file.write(json.dumps({
+                'name': 'чужой', 'author': 'nobody', 'text': 'текст',
+                'cooking_time': 1,
+            }) + '\n')
+        out = self.import_()
+        self.assertIn('загружено 0, пропущено 6, с ошибками 1', out)
+        self.assertEqual(Recipe.objects.count(), 5)
+
+    def test_resume(self):
+        """С --resume загрузка продолжается после сохранённой строки."""
+        self.export()
+        Recipe.objects.all().delete()
+        self.path.with_name('recipes.ndjson.progress').write_text('2')
+        self.assertIn('загружено 3', self.import_('--resume'))
+        self.assertEqual(
+            set(Recipe.objects.values_list('name', flat=True)),
+            {'рецепт 2', 'рецепт 3', 'рецепт 4'}
+        )
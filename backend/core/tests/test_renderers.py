@@ -0,0 +1,95 @@
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from ..renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+
+User = get_user_model()
+
+DATA = ReturnDict({
+    'id': 1,
+    'name': 'Борщ "домашний"\n\tс переносом и \x01',
+    'flag': True,
+    'empty': None,
+    'float': 1.5,
+    'decimal': Decimal('10.50'),
+    'uuid': uuid.UUID(int=1),
+    'date': date(2023, 1, 2),
+    'datetime': datetime(2023, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+    'naive': datetime(2023, 1, 2, 3, 4, 5),
+    'timedelta': timedelta(minutes=5),
+    'lazy': _('Название'),
+    'items': ReturnList([{'id': i, 'tags': ['a', 'б']} for i in range(3)],
+                        serializer=None),
+}, serializer=None)
+
+
+class RenderersTestCase(APITestCase):
+
+    def test_orjson_matches_json_renderer(self):
+        """
+        Тест совпадения вывода ORJSONRenderer с JSONRenderer.
+        """
+        self.assertEqual(
+            ORJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+        )
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_orjson_fallback(self):
+        """
+        Тест ключей не строк, целых шире 64 бит (через JSONRenderer)
+        и записи float.
+        """
+        for data in (
+            {1: 'a', None: 'b'},
+            {ErrorDetail('name'): [ErrorDetail('Ошибка.', code='invalid')]},
+            {'big': 2 ** 70, 'negative': -2 ** 70},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(
+                    ORJSONRenderer().render(data),
+                    JSONRenderer().render(data)
+                )
+        data = [1e16, 1e-5, 0.1, -2.5e-300]
+        self.assertEqual(
+            json.loads(ORJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data))
+        )
+
+    def test_orjson_indent(self):
+        """
+        Тест форматированного вывода через параметр indent.
+        """
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            ORJSONRenderer().render(DATA, media_type),
+            JSONRenderer().render(DATA, media_type),
+        )
+
+    @skipUnless(msgpack, 'msgpack не установлен')
+    def test_msgpack(self):
+        """
+        Тест MessagePack renderer и выбора по заголовку Accept.
+        """
+        data = msgpack.unpackb(MessagePackRenderer().render(DATA))
+        self.assertEqual(data['name'], DATA['name'])
+        self.assertEqual(data['datetime'], '2023-01-02T03:04:05.678901Z')
+        self.assertEqual(len(data['items']), 3)
+
+        response = self.client.get(
+            reverse('recipes:tags-list'), HTTP_ACCEPT='application/msgpack'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), [])
@@ -0,0 +1,35 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class SeedSyntheticTestCase(TestCase):
+    """Команда seed_synthetic."""
+
+    def seed(self, prefix: str = 'seed'):
+        call_command(
+            'seed_synthetic', '--users', '3', '--recipes', '5',
+            '--ingredients', '4', '--prefix', prefix, stdout=StringIO()
+        )
+
+    def test_seed(self):
+        self.seed()
+        self.assertEqual(
+            User.objects.filter(username__startswith='seed_user_').count(), 3
+        )
+        self.assertEqual(Recipe.objects.count(), 5)
+
+    def test_same_prefix(self):
+        """Повторный запуск с тем же префиксом ничего не создаёт."""
+        self.seed()
+        with self.assertRaisesMessage(CommandError, "'seed'"):
+            self.seed()
+        self.assertEqual(Recipe.objects.count(), 5)
+        self.seed('other')
+        self.assertEqual(Recipe.objects.count(), 10)
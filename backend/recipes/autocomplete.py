@@ -0,0 +1,202 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+from heapq import nsmallest
+from itertools import islice
+from math import ceil
+from threading import Lock
+from time import monotonic, time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db.models import Count
+
+from .cache import CATALOG, get_versions
+from .models import Ingredient, fold_name
+
+
+class Entry(NamedTuple):
+    key: str
+    usage: int
+    data: Dict
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Названия приводятся к виду fold_name. Начало названия ищется
+    двоичным поиском по отсортированному массиву названий, подстрока -
+    пересечением списков триграмм. Если точных совпадений нет, ищутся
+    похожие названия по доле общих триграмм (опечатки).
+    Результаты: сначала начинающиеся с запроса, затем содержащие его,
+    внутри групп - по числу рецептов с ингредиентом и по названию.
+    Элементы результата совпадают с выводом IngredientSerializer.
+    Ранжирование зависит от частоты на момент построения `built_at`.
+    """
+    similarity = 0.4
+
+    def __init__(self, entries: Iterable[Entry]):
+        self.built_at = time()
+        self.entries = sorted(entries, key=lambda entry: entry.key)
+        self.keys = [entry.key for entry in self.entries]
+        self.used = array('I', (
+            position for position, entry in enumerate(self.entries)
+            if entry.usage
+        ))
+        self.postings: Dict[str, array] = {}
+        for position, entry in enumerate(self.entries):
+            for trigram in trigrams(f' {entry.key} '):
+                self.postings.setdefault(trigram, array('I')).append(
+                    position
+                )
+        self.search = lru_cache(maxsize=4096)(self.search)
+
+    @classmethod
+    def build(cls) -> 'IngredientIndex':
+        """Строит индекс одним запросом ингредиентов с их частотой."""
+        ingredients = (
+            Ingredient.objects
+            .order_by()
+            .annotate(usage=Count('qt_recipes'))
+            .values_list('id', 'name', 'measurement_unit', 'usage')
+        )
+        return cls(
+            Entry(
+                fold_name(name),
+                usage,
+                {'id': pk, 'name': name, 'measurement_unit': unit},
+            )
+            for pk, name, unit, usage in ingredients
+        )
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def rank(self, positions: Iterable[int], limit: int) -> List[int]:
+        entries = self.entries
+        return nsmallest(
+            limit, positions,
+            key=lambda position: (-entries[position].usage, position)
+        )
+
+    def prefix(self, query: str, limit: int) -> Tuple[range, List[int]]:
+        """
+        Диапазон названий, начинающихся с `query`, и первые `limit`
+        из них. Неиспользуемые ингредиенты идут в порядке названий,
+        поэтому ранжируются только используемые.
+        """
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + chr(0x10FFFF), start)
+        used = self.used[
+            bisect_left(self.used, start):bisect_left(self.used, end)
+        ]
+        found = self.rank(used, limit)
+        if len(found) < limit:
+            used = set(used)
+            found += islice(
+                (position for position in range(start, end)
+                 if position not in used),
+                limit - len(found)
+            )
+        return range(start, end), found
+
+    def substring(self, query: str, exclude: range) -> List[int]:
+        if len(query) < 3:
+            candidates = range(len(self.keys))
+        else:
+            candidates = min(
+                (self.postings.get(trigram, ())
+                 for trigram in trigrams(query)),
+                key=len
+            )
+        return [
+            position for position in candidates
+            if position not in exclude and query in self.keys[position]
+        ]
+
+    def fuzzy(self, query: str, limit: int) -> List[int]:
+        """
+        Названия, с которыми у запроса не меньше доли `similarity`
+        общих триграмм. Такое название содержит хотя бы одну
+        из len(query_trigrams) - need + 1 самых редких триграмм запроса,
+        поэтому кандидаты берутся только из их списков.
+        """
+        query_trigrams = sorted(
+            trigrams(f' {query}'),
+            key=lambda trigram: len(self.postings.get(trigram, ()))
+        )
+        need = max(ceil(self.similarity * len(query_trigrams)), 1)
+        split = len(query_trigrams) - need + 1
+        rare, common = query_trigrams[:split], query_trigrams[split:]
+        shared = Counter()
+        for trigram in rare:
+            shared.update(self.postings.get(trigram, ()))
+        for position, count in shared.items():
+            key = f' {self.keys[position]} '
+            shared[position] = count + sum(
+                trigram in key for trigram in common
+            )
+        shared = {
+            position: count for position, count in shared.items()
+            if count >= need
+        }
+        entries = self.entries
+        return nsmallest(
+            limit, shared,
+            key=lambda position: (
+                -shared[position], -entries[position].usage, position
+            )
+        )
+
+    def search(self, query: str, limit: int) -> List[Dict]:
+        """Первые `limit` ингредиентов по запросу `query`."""
+        query = fold_name(query)
+        if not query or limit <= 0:
+            return []
+        prefix, found = self.prefix(query, limit)
+        if len(found) < limit:
+            found += self.rank(
+                self.substring(query, prefix), limit - len(found)
+            )
+        if not found:
+            found = self.fuzzy(query, limit)
+        return [self.entries[position].data for position in found]
+
+
+class ProcessIndex:
+    """
+    Индекс ингредиентов процесса. Перестраивается при изменении
+    версии справочников и не реже INGREDIENTS_INDEX_MAX_AGE секунд,
+    чтобы учитывать частоту использования ингредиентов.
+    """
+
+    def __init__(self):
+        self.index: Optional[IngredientIndex] = None
+        self.version: Optional[float] = None
+        self.built = 0.0
+        self.lock = Lock()
+
+    def is_outdated(self, version: float) -> bool:
+        return (
+            self.index is None
+            or self.version != version
+            or monotonic() - self.built > settings.INGREDIENTS_INDEX_MAX_AGE
+        )
+
+    def get(self) -> IngredientIndex:
+        version = get_versions((CATALOG,))[CATALOG]
+        if self.is_outdated(version):
+            with self.lock:
+                if self.is_outdated(version):
+                    self.index = IngredientIndex.build()
+                    self.version, self.built = version, monotonic()
+        return self.index
+
+
+ingredient_index = ProcessIndex()
@@ -0,0 +1,168 @@
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from django.db import DatabaseError, transaction
+from rest_framework import status
+
+from .cache import LIST, author_generation, bump, tag_generation
+from .counters import RECIPES_COUNT
+from .models import Ingredient, IngredientsInRecipe, Recipe, Tag
+from .serializers import RecipeCreateSerializer
+
+NOT_AN_OBJECT = 'Ожидается объект рецепта.'
+NAME_TAKEN = 'У автора уже есть рецепт с таким названием.'
+NOT_SAVED = 'Не удалось сохранить рецепт.'
+
+Item = Tuple[int, Dict[str, Any]]
+
+
+def collect_ids(values: Iterable[Any]) -> Set[int]:
+    """Целые id из `values`, значения другого вида пропускаются."""
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+class RecipeBulkCreator:
+    """
+    Массовое создание рецептов текущего пользователя.
+
+    Рецепты проверяются RecipeCreateSerializer; теги и ингредиенты
+    для всех рецептов загружаются одним запросом каждые, занятые
+    у автора названия - ещё одним. Прошедшие проверку рецепты
+    вставляются пачками по `chunk_size`, каждая - в своей транзакции:
+    рецепты, связи с тегами и IngredientsInRecipe через bulk_create.
+    Если пачка не записалась, её рецепты сохраняются по одному,
+    чтобы ошибка одного рецепта не отменяла остальные.
+
+    Уменьшенные копии и заглушки картинок в запросе не делаются
+    (сигналы сохранения при bulk_create не вызываются): до запуска
+    команд regenerate_renditions и backfill_placeholders рецепты
+    отдаются без них.
+
+    Результат - по элементу на рецепт в порядке запроса:
+    `{'index', 'status': 201, 'id'}` или `{'index', 'status': 400,
+    'errors'}`.
+    """
+
+    def __init__(self, items: List[Any], context: Dict,
+                 chunk_size: int = 100):
+        self.items = items
+        self.context = context
+        self.author = context['request'].user
+        self.chunk_size = chunk_size
+        self.results: List[Dict] = [{} for _ in items]
+        self.created: List[Tuple[Recipe, List[Tag]]] = []
+
+    def run(self) -> List[Dict]:
+        valid = self.validate()
+        for start in range(0, len(valid), self.chunk_size):
+            self.save(valid[start:start + self.chunk_size])
+        if self.created:
+            RECIPES_COUNT.change(self.author.pk, len(self.created))
+            bump({
+                LIST,
+                author_generation(self.author.pk),
+                *(tag_generation(tag.slug)
+                  for _, tags in self.created for tag in tags),
+            })
+        return self.results
+
+    def fail(self, index: int, errors: Dict) -> None:
+        self.results[index] = {
+            'index': index,
+            'status': status.HTTP_400_BAD_REQUEST,
+            'errors': errors,
+        }
+
+    def preload(self) -> Dict:
+        """Теги и ингредиенты всех рецептов, по запросу на модель."""
+        tag_ids, ingredient_ids = set(), set()
+        for item in self.items:
+            if not isinstance(item, dict):
+                continue
+            if isinstance(item.get('tags'), list):
+                tag_ids |= collect_ids(item['tags'])
+            if isinstance(item.get('ingredients'), list):
+                ingredient_ids |= collect_ids(
+                    ingredient.get('id') for ingredient in item['ingredients']
+                    if isinstance(ingredient, dict)
+                )
+        return {
+            Tag: Tag.objects.in_bulk(tag_ids),
+            Ingredient: Ingredient.objects.in_bulk(ingredient_ids),
+        }
+
+    def validate(self) -> List[Item]:
+        context = dict(self.context, preloaded=self.preload())
+        names = {
+            item['name'].strip() for item in self.items
+            if isinstance(item, dict) and isinstance(item.get('name'), str)
+        }
+        taken = set(
+            Recipe.objects
+            .filter(author=self.author, name__in=names)
+            .values_list('name', flat=True)
+        )
+        valid = []
+        for index, item in enumerate(self.items):
+            if not isinstance(item, dict):
+                self.fail(index, {'non_field_errors': [NOT_AN_OBJECT]})
+                continue
+            serializer = RecipeCreateSerializer(data=item, context=context)
+            if not serializer.is_valid():
+                self.fail(index, serializer.errors)
+                continue
+            name = serializer.validated_data['name']
+            if name in taken:
+                self.fail(index, {'name': [NAME_TAKEN]})
+                continue
+            taken.add(name)
+            valid.append((index, serializer.validated_data))
+        return valid
+
+    def save(self, chunk: List[Item]) -> None:
+        try:
+            with transaction.atomic():
+                recipes = self.write(chunk)
+        except DatabaseError:
+            if len(chunk) == 1:
+                self.fail(chunk[0][0], {'non_field_errors': [NOT_SAVED]})
+                return
+            for item in chunk:
+                self.save([item])
+            return
+        for recipe, (index, data) in zip(recipes, chunk):
+            self.results[index] = {
+                'index': index,
+                'status': status.HTTP_201_CREATED,
+                'id': recipe.pk,
+            }
+            self.created.append((recipe, data['tags']))
+
+    @staticmethod
+    def write(chunk: List[Item]) -> List[Recipe]:
+        recipes = Recipe.objects.bulk_create(
+            Recipe(**{
+                field: value for field, value in data.items()
+                if field not in ('tags', 'ingredients')
+            })
+            for _, data in chunk
+        )
+        tags_in_recipe = Recipe.tags.through
+        tags_in_recipe.objects.bulk_create(
+            tags_in_recipe(recipe=recipe, tag=tag)
+            for recipe, (_, data) in zip(recipes, chunk)
+            for tag in data['tags']
+        )
+        IngredientsInRecipe.objects.bulk_create(
+            IngredientsInRecipe(
+                recipe=recipe, ingredient=ingredient, amount=amount
+            )
+            for recipe, (_, data) in zip(recipes, chunk)
+            for ingredient, amount in data['ingredients']
+        )
+        return recipes
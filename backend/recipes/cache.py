@@ -0,0 +1,277 @@
+from functools import wraps
+from hashlib import md5
+from time import time
+from typing import Callable, Dict, Iterable, List, Optional
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .models import Recipe
+
+CACHE_TIMEOUT = getattr(settings, 'RECIPES_CACHE_TIMEOUT', 300)
+
+# Поколения: при изменении данных поколение получает новое значение,
+# и все ключи ответов, построенные на старом значении, перестают
+# использоваться. Поколение `all` входит во все ключи.
+ALL = 'all'
+LIST = 'list'
+
+# Версии: время последнего изменения справочников (теги и ингредиенты)
+# и данных пользователя (избранное, список покупок, подписки).
+# Используются в ETag и Last-Modified.
+CATALOG = 'catalog'
+
+# Заголовки, которые сохраняются вместе с данными ответа.
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+LIST_PARAMS = ('author', 'cursor', 'limit', 'ordering', 'page', 'tags')
+IGNORED_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def author_generation(author_id) -> str:
+    return f'author:{author_id}'
+
+
+def tag_generation(slug: str) -> str:
+    return f'tag:{slug}'
+
+
+def recipe_generation(recipe_id) -> str:
+    return f'recipe:{recipe_id}'
+
+
+def user_version(user_id) -> str:
+    return f'user:{user_id}'
+
+
+def get_generations(names: Iterable[str]) -> Dict[str, str]:
+    """
+    Возвращает текущие значения поколений. Отсутствующие в кэше
+    (в том числе вытесненные) поколения создаются заново.
+    """
+    keys = {f'recipes:gen:{name}': name for name in names}
+    generations = cache.get_many(keys)
+    for key in keys.keys() - generations.keys():
+        cache.add(key, uuid4().hex, None)
+        generations[key] = cache.get(key)
+    return {keys[key]: value for key, value in generations.items()}
+
+
+def bump(names: Iterable[str]) -> None:
+    """
+    Меняет поколения сразу и повторно после фиксации транзакции,
+    чтобы в кэш не попал ответ, собранный до фиксации.
+    """
+    names = set(names)
+    if not names:
+        return
+
+    def update():
+        cache.set_many(
+            {f'recipes:gen:{name}': uuid4().hex for name in names}, None
+        )
+
+    update()
+    transaction.on_commit(update)
+
+
+def recipes_generations(recipes) -> set:
+    """
+    Поколения, зависящие от рецептов: сами рецепты, их авторы, теги
+    и общий список (если рецепты есть).
+    """
+    recipes = recipes.values_list('id', 'author_id', 'tags__slug')
+    names = set()
+    for recipe_id, author_id, slug in recipes:
+        names.add(recipe_generation(recipe_id))
+        names.add(author_generation(author_id))
+        if slug:
+            names.add(tag_generation(slug))
+    if names:
+        names.add(LIST)
+    return names
+
+
+def touch(recipes) -> None:
+    """
+    Обновляет `updated_at` рецептов при изменении связанных данных.
+    """
+    recipes.update(updated_at=timezone.now())
+
+
+def recipes_changed(recipes) -> None:
+    """
+    Обновляет `updated_at` рецептов и поколения, зависящие от них,
+    после изменения данных в обход сигналов сохранения
+    (update, bulk_update).
+    """
+    touch(recipes)
+    bump(recipes_generations(recipes))
+
+
+def save_recipes(recipes: List[Recipe], fields: Iterable[str]) -> None:
+    """
+    Записывает поля `fields` рецептов одним bulk_update вместе
+    с `updated_at` и меняет поколения, зависящие от рецептов.
+    Для фоновых обновлений (копии и заглушки картинок), которые
+    не вызывают сигналов сохранения.
+    """
+    if not recipes:
+        return
+    now = timezone.now()
+    for recipe in recipes:
+        recipe.updated_at = now
+    Recipe.objects.bulk_update(recipes, (*fields, 'updated_at'))
+    bump(recipes_generations(
+        Recipe.objects.filter(pk__in=[recipe.pk for recipe in recipes])
+    ))
+
+
+def get_versions(names: Iterable[str]) -> Dict[str, float]:
+    """
+    Возвращает время последнего изменения по версиям. Для отсутствующих
+    в кэше версий считается, что изменение произошло сейчас.
+    """
+    keys = {f'recipes:version:{name}': name for name in names}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        cache.add(key, time(), None)
+        versions[key] = cache.get(key) or time()
+    return {keys[key]: value for key, value in versions.items()}
+
+
+def bump_versions(names: Iterable[str]) -> None:
+    """
+    Обновляет версии сразу и повторно после фиксации транзакции.
+    """
+    names = set(names)
+    if not names:
+        return
+
+    def update():
+        cache.set_many(
+            {f'recipes:version:{name}': time() for name in names}, None
+        )
+
+    update()
+    transaction.on_commit(update)
+
+
+def make_key(prefix: str, request: Request, params, names) -> str:
+    generations = get_generations((ALL, *names))
+    raw = repr((
+        request.build_absolute_uri(request.path),
+        request.accepted_media_type,
+        params,
+        sorted(generations.items()),
+    ))
+    return f'recipes:{prefix}:{md5(raw.encode()).hexdigest()}'
+
+
+def list_cache_key(request: Request, **kwargs) -> Optional[str]:
+    """
+    Ключ списка рецептов по нормализованным параметрам запроса.
+    Для неизвестных параметров кэш не используется.
+    """
+    query = request.query_params
+    if set(query) - set(LIST_PARAMS) - set(IGNORED_PARAMS):
+        return None
+    tags = sorted(set(query.getlist('tags')))
+    author = query.get('author', '').strip()
+    params = (
+        ('author', author),
+        ('cursor', query.get('cursor')),
+        ('limit', query.get('limit', '')),
+        ('ordering', query.get('ordering', '')),
+        ('page', query.get('page', '1')),
+        ('tags', tags),
+    )
+    names = [tag_generation(slug) for slug in tags]
+    if author:
+        names.append(author_generation(author))
+    if not names:
+        names.append(LIST)
+    return make_key('list', request, params, names)
+
+
+def detail_cache_key(request: Request, pk: str = None,
+                     **kwargs) -> Optional[str]:
+    """
+    Ключ рецепта. При изменении автора меняются поколения всех
+    его рецептов (см. signals).
+    """
+    if request.query_params:
+        return None
+    return make_key('detail', request, (), (recipe_generation(pk),))
+
+
+def representation_keys(recipe_ids: Iterable[int],
+                        request: Request) -> Dict[int, str]:
+    """
+    Ключи кэша общего (не зависящего от пользователя) представления
+    рецептов. В представлении абсолютные ссылки на картинки, поэтому
+    в ключ входят схема и хост запроса.
+    """
+    generations = get_generations(
+        (ALL, *(recipe_generation(pk) for pk in recipe_ids))
+    )
+    origin = md5(request.build_absolute_uri('/').encode()).hexdigest()
+    return {
+        pk: (f'recipes:repr:{origin}:{pk}'
+             f':{generations[recipe_generation(pk)]}:{generations[ALL]}')
+        for pk in recipe_ids
+    }
+
+
+def cache_anonymous_response(key_func: Callable[..., Optional[str]]):
+    """
+    Кэширует данные успешных ответов для анонимных пользователей
+    вместе с ETag и Last-Modified; на условный запрос по кэшированным
+    заголовкам отвечает 304.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request: Request, *args, **kwargs):
+            if not request.user.is_anonymous:
+                return method(self, request, *args, **kwargs)
+            key = key_func(request, *args, **kwargs)
+            if key is None:
+                return method(self, request, *args, **kwargs)
+            cached = cache.get(key)
+            if cached is not None:
+                data, headers = cached
+                not_modified = get_conditional_response(
+                    request,
+                    etag=headers.get('ETag'),
+                    last_modified=parse_http_date_safe(
+                        headers.get('Last-Modified')
+                    ),
+                )
+                return not_modified or Response(data, headers=headers)
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                headers = {
+                    name: response[name]
+                    for name in CACHED_HEADERS if response.has_header(name)
+                }
+                cache.set(key, (response.data, headers), CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def catalog_key(request: Request, name: str, version: float) -> str:
+    """
+    Ключ готового ответа со всем справочником `name` для версии
+    справочников `version`.
+    """
+    raw = repr((name, version, request.accepted_media_type))
+    return f'recipes:catalog:{md5(raw.encode()).hexdigest()}'
@@ -0,0 +1,93 @@
+from typing import Dict, List, NamedTuple, Type
+
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from users.models import AuthorSubscription
+
+from .models import FavoritesList, Recipe, ShoppingList
+
+User = get_user_model()
+
+
+class Counter(NamedTuple):
+    """
+    Денормализованный счётчик: поле `field` модели `model` хранит
+    количество объектов `source`, ссылающихся на неё полем `source_field`.
+    """
+    model: Type[models.Model]
+    field: str
+    source: Type[models.Model]
+    source_field: str
+
+    @property
+    def name(self) -> str:
+        return f'{self.model._meta.label}.{self.field}'
+
+    def real_count(self) -> Coalesce:
+        """Выражение настоящего количества для запроса к `model`."""
+        return Coalesce(
+            Subquery(
+                self.source.objects
+                .filter(**{self.source_field: OuterRef('pk')})
+                .order_by()
+                .values(self.source_field)
+                .annotate(count=Count('pk'))
+                .values('count')
+            ),
+            0,
+        )
+
+    def change(self, pk, delta: int) -> None:
+        """
+        Изменяет счётчик одним UPDATE с F(), без чтения значения.
+        Счётчик не опускается ниже нуля. `updated_at` рецептов
+        не меняется: счётчики меняются часто и в ответы подставляются
+        из строк рецептов (см. CachedRecipeSerializer).
+        """
+        if pk is None:
+            return
+        queryset = self.model.objects.filter(pk=pk)
+        if delta < 0:
+            queryset = queryset.filter(**{f'{self.field}__gte': -delta})
+        queryset.update(**{self.field: F(self.field) + delta})
+
+    def mismatches(self) -> models.QuerySet:
+        """Объекты, у которых счётчик не совпадает с настоящим."""
+        return (
+            self.model.objects
+            .annotate(real_count=self.real_count())
+            .exclude(**{self.field: F('real_count')})
+        )
+
+    def rebuild(self) -> int:
+        """Пересчитывает счётчик у всех объектов."""
+        return self.model.objects.update(**{self.field: self.real_count()})
+
+
+RECIPES_COUNT = Counter(User, 'recipes_count', Recipe, 'author')
+SUBSCRIBERS_COUNT = Counter(
+    User, 'subscribers_count', AuthorSubscription, 'author'
+)
+FAVORITES_COUNT = Counter(Recipe, 'favorites_count', FavoritesList, 'recipe')
+SHOPPING_CART_COUNT = Counter(
+    Recipe, 'shopping_cart_count', ShoppingList, 'recipe'
+)
+COUNTERS = (
+    RECIPES_COUNT, SUBSCRIBERS_COUNT, FAVORITES_COUNT, SHOPPING_CART_COUNT
+)
+
+SOURCES: Dict[Type[models.Model], List[Counter]] = {}
+for counter in COUNTERS:
+    SOURCES.setdefault(counter.source, []).append(counter)
+
+
+def update_counters(instance: models.Model, delta: int) -> None:
+    """
+    Изменяет на delta счётчики объектов, на которые ссылается instance.
+    """
+    for counter in SOURCES.get(type(instance), ()):
+        counter.change(
+            getattr(instance, f'{counter.source_field}_id'), delta
+        )
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django_filters.rest_framework import FilterSet, filters
 from recipes.models import Ingredient, Recipe, Tag
 
@@ -38,13 +39,15 @@ class RecipeFilter(FilterSet):
 
 class IngredientFilter(FilterSet):
     """
-    Поиск по полю name для IngredientViewSet.
+    Поиск по полю name для IngredientViewSet: первые
+    INGREDIENTS_SEARCH_LIMIT ингредиентов, сначала начинающиеся
+    с запроса, затем содержащие его.
     """
-    name = filters.CharFilter(
-        field_name='name',
-        lookup_expr='icontains'
-    )
+    name = filters.CharFilter(method='search_filter')
 
     class Meta:
         model = Ingredient
         fields = ('name',)
+
+    def search_filter(self, queryset, name, value):
+        return queryset.search(value, settings.INGREDIENTS_SEARCH_LIMIT)
@@ -0,0 +1,110 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image, UnidentifiedImageError
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.fields import ImageField
+from rest_framework.serializers import ValidationError
+
+IMAGE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+# Во сколько раз уменьшается JPEG при проверке декодированием (draft).
+DRAFT_SCALE = 8
+
+
+def too_large_message() -> str:
+    return f'Размер изображения больше {settings.RECIPES_IMAGE_MAX_SIZE} байт.'
+
+
+class ImageTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_code = 'image_too_large'
+
+    def __init__(self):
+        super().__init__(too_large_message())
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Обработчик загрузки: файл пишется во временный файл на диске
+    по частям, без накопления в памяти, и загрузка прерывается с 413,
+    как только файл превысил RECIPES_IMAGE_MAX_SIZE.
+    """
+
+    def handle_raw_input(self, input_data, meta, content_length, boundary,
+                         encoding=None):
+        # Для тела без multipart (boundary is None) длина тела - это
+        # размер файла, и слишком большой файл отклоняется до чтения.
+        if boundary is None and (
+            content_length or 0
+        ) > settings.RECIPES_IMAGE_MAX_SIZE:
+            raise ImageTooLarge
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.RECIPES_IMAGE_MAX_SIZE:
+            raise ImageTooLarge
+        return super().receive_data_chunk(raw_data, start)
+
+
+def check_image(file) -> str:
+    """
+    Проверяет изображение до полного декодирования и возвращает
+    расширение файла по его формату.
+
+    Pillow при открытии читает только заголовок, поэтому формат
+    и размеры в пикселях проверяются без декодирования. Затем JPEG
+    декодируется в режиме draft (в DRAFT_SCALE раз меньше), остальные
+    форматы проверяются verify(), так что битый файл отклоняется,
+    а память не зависит от размеров изображения.
+    """
+    if file.size > settings.RECIPES_IMAGE_MAX_SIZE:
+        raise ValidationError(too_large_message())
+    file.seek(0)
+    too_many_pixels = (
+        f'Изображение больше {settings.RECIPES_IMAGE_MAX_PIXELS} пикселей.'
+    )
+    try:
+        with Image.open(file) as image:
+            if image.format not in IMAGE_FORMATS:
+                raise ValidationError('Неподдерживаемый формат изображения.')
+            width, height = image.size
+            if width * height > settings.RECIPES_IMAGE_MAX_PIXELS:
+                raise ValidationError(too_many_pixels)
+            draft = image.draft(
+                'RGB',
+                (width // DRAFT_SCALE or 1, height // DRAFT_SCALE or 1)
+            )
+            if draft:
+                image.load()
+            else:
+                image.verify()
+            extension = IMAGE_FORMATS[image.format]
+    except Image.DecompressionBombError:
+        # Pillow сам отклоняет очень большие изображения при открытии.
+        raise ValidationError(too_many_pixels)
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise ValidationError('Загрузите корректное изображение.')
+    finally:
+        file.seek(0)
+    return extension
+
+
+class RecipeImageField(Base64ImageField):
+    """
+    Изображение рецепта: строка Base64 (как раньше) или загруженный
+    файл (multipart или тело запроса, см. LimitedUploadHandler).
+    Загруженный файл проверяется check_image до передачи в ImageField
+    и получает случайное имя, как и файл из Base64.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            data.name = f'{uuid4()}.{check_image(data)}'
+            return ImageField.to_internal_value(self, data)
+        file = super().to_internal_value(data)
+        if file is not None:
+            check_image(file)
+        return file
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.13 on 2026-10-18 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_ingredient_\nrecipes_ingredient_name is empty\n'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['creation_date', 'id'], name='recipe_creation_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.1.13 on 2026-10-18 02:36
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FavoritesList = apps.get_model('recipes', 'FavoritesList')
+    ShoppingList = apps.get_model('recipes', 'ShoppingList')
+    AuthorSubscription = apps.get_model('users', 'AuthorSubscription')
+
+    def count(model, field):
+        return Coalesce(
+            models.Subquery(
+                model.objects
+                .filter(**{field: models.OuterRef('pk')})
+                .order_by()
+                .values(field)
+                .annotate(count=models.Count('pk'))
+                .values('count')
+            ),
+            0,
+        )
+
+    User.objects.update(
+        recipes_count=count(Recipe, 'author'),
+        subscribers_count=count(AuthorSubscription, 'author'),
+    )
+    Recipe.objects.update(
+        favorites_count=count(FavoritesList, 'recipe'),
+        shopping_cart_count=count(ShoppingList, 'recipe'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_counters'),
+        ('recipes', '0014_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в список покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.1.13 on 2026-10-18 02:49
+
+import logging
+
+from django.db import DatabaseError, migrations, models, transaction
+
+logger = logging.getLogger(__name__)
+
+TRIGRAM_INDEX = 'recipes_ingredient_search_name_trgm'
+
+
+def fill_search_name(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    ingredients = []
+    for ingredient in Ingredient.objects.only('name').iterator(2000):
+        ingredient.search_name = (
+            ingredient.name.casefold().replace('ё', 'е')
+        )
+        ingredients.append(ingredient)
+    Ingredient.objects.bulk_update(ingredients, ('search_name',), 2000)
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    Индекс для поиска подстроки, только в PostgreSQL. Если расширение
+    pg_trgm не установлено на сервере или его нельзя создать без прав
+    суперпользователя, индекс не создаётся: подстрока ищется тем же
+    запросом, но без индекса.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        available = cursor.fetchone()
+    if not available:
+        logger.warning(
+            'Расширение pg_trgm недоступно, триграммный индекс %s '
+            'не создан.', TRIGRAM_INDEX
+        )
+        return
+    try:
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            schema_editor.execute(
+                f'CREATE INDEX {TRIGRAM_INDEX} ON recipes_ingredient '
+                'USING gin (search_name gin_trgm_ops)'
+            )
+    except DatabaseError as error:
+        logger.warning(
+            'Триграммный индекс %s не создан: %s', TRIGRAM_INDEX, error
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200, verbose_name='Название для поиска'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_search_name, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
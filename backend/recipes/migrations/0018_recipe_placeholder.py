@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_recipe_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='placeholder',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Заглушка картинки'),
+        ),
+    ]
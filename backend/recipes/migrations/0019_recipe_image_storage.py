@@ -0,0 +1,20 @@
+# Generated by Django 4.1.13 on 2026-10-18 03:27
+
+from django.db import migrations
+import recipes.storage
+import sorl.thumbnail.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_recipe_placeholder'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=sorl.thumbnail.fields.ImageField(storage=recipes.storage.ContentAddressedStorage(directories=('recipe_images',)), upload_to='recipe_images/', verbose_name='Картинка'),
+        ),
+    ]
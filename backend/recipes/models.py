@@ -1,11 +1,13 @@
-from core.models import CommonFieldsModel, CreationDate
+from core.models import CommonFieldsModel, CountersMixin, CreationDate
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connection, models
 from django.db.models.functions import Length
 from django.utils.translation import gettext_lazy as _
 from pytils.translit import slugify
 from sorl.thumbnail import ImageField
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 models.CharField.register_lookup(Length)
@@ -44,12 +46,70 @@ class Tag(models.Model):
         super().save(*args, **kwargs)
 
 
+MAX_CHAR = chr(0x10FFFF)
+
+
+def fold_name(name: str) -> str:
+    """Приводит название к виду для поиска: без регистра, ё как е."""
+    return name.casefold().replace('ё', 'е')
+
+
+class IngredientQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.search_name = fold_name(obj.name)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def search(self, query: str, limit: int) -> models.QuerySet:
+        """
+        Первые `limit` ингредиентов, в названии которых есть `query`:
+        сначала начинающиеся с него, затем остальные, внутри групп
+        по названию.
+
+        Начало названия ищется по индексу search_name: в PostgreSQL
+        через LIKE (индекс varchar_pattern_ops), в SQLite диапазоном.
+        Если таких ингредиентов хватает, подстрока не ищется вовсе;
+        иначе поиск подстроки в PostgreSQL идёт по триграммному индексу,
+        а без расширения pg_trgm (см. миграцию 0016) - перебором.
+        """
+        query = fold_name(query)
+        if connection.vendor == 'postgresql':
+            prefix = models.Q(search_name__startswith=query)
+        else:
+            prefix = models.Q(
+                search_name__gte=query, search_name__lt=query + MAX_CHAR
+            )
+        ordering = ('search_name', 'id')
+        found = self.filter(prefix).order_by(*ordering)
+        if found[limit - 1:limit].exists():
+            return found[:limit]
+        return (
+            self
+            .filter(search_name__contains=query)
+            .annotate(rank=models.Case(
+                models.When(prefix, then=0),
+                default=1,
+            ))
+            .order_by('rank', *ordering)[:limit]
+        )
+
+
 class Ingredient(CommonFieldsModel):
 
     measurement_unit = models.CharField(
         verbose_name=_('Единицы измерения'),
         max_length=16,
     )
+    search_name = models.CharField(
+        verbose_name=_('Название для поиска'),
+        max_length=200,
+        editable=False,
+        db_index=True,
+    )
+
+    objects = IngredientQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Ингридиент'
@@ -72,8 +132,12 @@ class Ingredient(CommonFieldsModel):
     def __str__(self) -> str:
         return f'{self.name} {self.measurement_unit}'
 
+    def save(self, *args, **kwargs):
+        self.search_name = fold_name(self.name)
+        super().save(*args, **kwargs)
 
-class Recipe(CommonFieldsModel):
+
+class Recipe(CountersMixin, CommonFieldsModel):
 
     author = models.ForeignKey(
         verbose_name=_('Автор публикации'),
@@ -85,6 +149,19 @@ class Recipe(CommonFieldsModel):
     image = ImageField(
         verbose_name=_('Картинка'),
         upload_to='recipe_images/',
+        storage=ContentAddressedStorage(directories=('recipe_images',)),
+    )
+    renditions = models.JSONField(
+        verbose_name=_('Уменьшенные копии картинки'),
+        default=dict,
+        blank=True,
+        editable=False,
+    )
+    placeholder = models.JSONField(
+        verbose_name=_('Заглушка картинки'),
+        default=dict,
+        blank=True,
+        editable=False,
     )
     text = models.TextField(
         verbose_name=_('Текстовое описание'),
@@ -103,10 +180,33 @@ class Recipe(CommonFieldsModel):
         verbose_name=_('Время приготовления'),
         default=0,
     )
+    updated_at = models.DateTimeField(
+        verbose_name=_('Дата изменения'),
+        auto_now=True,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name=_('Добавлений в избранное'),
+        default=0,
+        editable=False,
+        db_index=True,
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name=_('Добавлений в список покупок'),
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('favorites_count', 'shopping_cart_count')
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(
+                fields=('creation_date', 'id'),
+                name='recipe_creation_date_id_idx',
+            ),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=('name', 'author'),
@@ -0,0 +1,194 @@
+import base64
+import logging
+import math
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from django.core.files.storage import Storage
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+
+from .cache import save_recipes
+from .models import Recipe
+from .renditions import to_rgb
+
+logger = logging.getLogger(__name__)
+
+# Поля заглушки в ответах API, в этом порядке.
+FIELDS = ('width', 'height', 'color', 'blurhash', 'thumbnail')
+# Наибольшая сторона миниатюры для data URI и картинки для blurhash.
+THUMBNAIL_SIZE = 16
+BLURHASH_SIZE = 32
+# Число компонент blurhash по горизонтали и вертикали.
+COMPONENTS = (4, 3)
+# Значения тега EXIF Orientation, при которых картинка поворачивается
+# на 90° и ширина меняется местами с высотой.
+TRANSPOSED = {5, 6, 7, 8}
+
+BASE83 = (
+    '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    'abcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+)
+SRGB_TO_LINEAR = [
+    value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4
+    for value in (channel / 255 for channel in range(256))
+]
+
+
+def encode_base83(value: int, length: int) -> str:
+    return ''.join(
+        BASE83[value // 83 ** (length - position - 1) % 83]
+        for position in range(length)
+    )
+
+
+def linear_to_srgb(value: float) -> int:
+    value = min(max(value, 0), 1)
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def sign_pow(value: float, exponent: float) -> float:
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def get_blurhash(image: Image.Image) -> str:
+    """
+    Blurhash (https://blurha.sh) картинки в режиме RGB. Картинка
+    должна быть уже уменьшена: сложность - пиксели на число компонент.
+    """
+    width, height = image.size
+    x_components, y_components = COMPONENTS
+    pixels = [
+        [SRGB_TO_LINEAR[channel] for channel in pixel]
+        for pixel in image.getdata()
+    ]
+    factors: List[List[float]] = []
+    for j in range(y_components):
+        cos_y = [math.cos(math.pi * j * y / height) for y in range(height)]
+        for i in range(x_components):
+            cos_x = [math.cos(math.pi * i * x / width) for x in range(width)]
+            factor = [0.0, 0.0, 0.0]
+            for y in range(height):
+                row = pixels[y * width:(y + 1) * width]
+                for x, (red, green, blue) in enumerate(row):
+                    basis = cos_x[x] * cos_y[y]
+                    factor[0] += basis * red
+                    factor[1] += basis * green
+                    factor[2] += basis * blue
+            scale = (1 if i == j == 0 else 2) / (width * height)
+            factors.append([channel * scale for channel in factor])
+
+    dc, ac = factors[0], factors[1:]
+    result = encode_base83((x_components - 1) + (y_components - 1) * 9, 1)
+    maximum = 1.0
+    if ac:
+        quantised = max(0, min(82, math.floor(
+            max(abs(channel) for factor in ac for channel in factor) * 166
+            - 0.5
+        )))
+        maximum = (quantised + 1) / 166
+        result += encode_base83(quantised, 1)
+    else:
+        result += encode_base83(0, 1)
+    red, green, blue = (linear_to_srgb(channel) for channel in dc)
+    result += encode_base83((red << 16) + (green << 8) + blue, 4)
+    for factor in ac:
+        red, green, blue = (
+            max(0, min(18, math.floor(
+                sign_pow(channel / maximum, 0.5) * 9 + 9.5
+            )))
+            for channel in factor
+        )
+        result += encode_base83(red * 19 * 19 + green * 19 + blue, 2)
+    return result
+
+
+def get_color(image: Image.Image) -> str:
+    """Преобладающий цвет картинки в виде `#rrggbb`."""
+    palette_image = image.quantize(colors=8)
+    palette = palette_image.getpalette()
+    _, index = max(palette_image.getcolors())
+    red, green, blue = palette[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def get_thumbnail(image: Image.Image) -> str:
+    """Миниатюра в WebP как data URI."""
+    thumbnail = image.copy()
+    thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    buffer = BytesIO()
+    thumbnail.save(buffer, 'WEBP', quality=50)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/webp;base64,{encoded}'
+
+
+def make_placeholder(storage: Storage, image_name: str) -> Dict:
+    """
+    Заглушка картинки `image_name` для Recipe.placeholder: размеры
+    с учётом поворота из EXIF, преобладающий цвет, blurhash
+    и миниатюра. JPEG декодируется в режиме draft сразу в уменьшенном
+    виде, остальное считается по картинке не больше BLURHASH_SIZE.
+    """
+    with storage.open(image_name) as file, Image.open(file) as original:
+        width, height = original.size
+        orientation = original.getexif().get(ExifTags.Base.Orientation)
+        if orientation in TRANSPOSED:
+            width, height = height, width
+        original.draft('RGB', (BLURHASH_SIZE, BLURHASH_SIZE))
+        image = to_rgb(ImageOps.exif_transpose(original))
+    image.thumbnail((BLURHASH_SIZE, BLURHASH_SIZE))
+    return {
+        'image': image_name,
+        'width': width,
+        'height': height,
+        'color': get_color(image),
+        'blurhash': get_blurhash(image),
+        'thumbnail': get_thumbnail(image),
+    }
+
+
+def refresh_placeholder(storage: Storage, image_name: str,
+                        placeholder: Dict,
+                        force: bool = False) -> Optional[Dict]:
+    """
+    Считает заглушку картинки `image_name`, если `placeholder` описывает
+    другую картинку (или `force`). Возвращает новую заглушку или None,
+    если она не изменилась. Работает только с хранилищем, без БД.
+    """
+    if not force and placeholder.get('image') == image_name:
+        return None
+    new = {}
+    if image_name:
+        try:
+            new = make_placeholder(storage, image_name)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+            logger.warning(
+                'Не удалось сделать заглушку картинки %s', image_name,
+                exc_info=True
+            )
+    return None if new == placeholder else new
+
+
+def update_placeholder(recipe: Recipe, force: bool = False) -> bool:
+    """
+    Обновляет заглушку картинки рецепта в БД (вместе с `updated_at`
+    и поколениями кэша рецепта).
+    """
+    placeholder = refresh_placeholder(
+        recipe.image.storage, recipe.image.name, recipe.placeholder or {},
+        force
+    )
+    if placeholder is None:
+        return False
+    recipe.placeholder = placeholder
+    save_recipes([recipe], ('placeholder',))
+    return True
+
+
+def get_placeholder(image_name: str,
+                    placeholder: Optional[Dict]) -> Optional[Dict]:
+    """Заглушка для ответа API или None, если её нет для этой картинки."""
+    if not placeholder or placeholder.get('image') != image_name:
+        return None
+    return {field: placeholder[field] for field in FIELDS}
@@ -0,0 +1,182 @@
+import logging
+import posixpath
+from io import BytesIO
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .cache import save_recipes
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+# Формат Pillow, расширение файла и параметры сохранения копий.
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True,
+                             'progressive': True}),
+}
+
+
+def rendition_name(image_name: str, width: int, image_format: str) -> str:
+    """
+    Имя копии рядом с оригиналом:
+    `recipe_images/abc.png` -> `recipe_images/renditions/abc/320.webp`.
+    """
+    directory, filename = posixpath.split(image_name)
+    stem = posixpath.splitext(filename)[0]
+    extension = FORMATS[image_format][1]
+    return posixpath.join(
+        directory, 'renditions', stem, f'{width}.{extension}'
+    )
+
+
+def get_widths(width: int) -> list:
+    """
+    Ширины копий для картинки шириной `width`: настроенные ширины
+    не больше неё (без увеличения), или сама ширина, если картинка
+    уже самой маленькой.
+    """
+    return [
+        target for target in sorted(settings.RECIPES_IMAGE_WIDTHS)
+        if target <= width
+    ] or [width]
+
+
+def to_rgb(image: Image.Image) -> Image.Image:
+    """Картинка без прозрачности на белом фоне."""
+    if image.mode == 'RGB':
+        return image
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def make_renditions(storage: Storage, image_name: str) -> Dict:
+    """
+    Сохраняет копии картинки `image_name` всех ширин и форматов
+    и возвращает их описание для Recipe.renditions.
+    Поворот из EXIF применяется к пикселям, сами метаданные
+    в копии не попадают. JPEG декодируется в режиме draft сразу
+    в уменьшенном виде.
+    """
+    largest = max(settings.RECIPES_IMAGE_WIDTHS)
+    with storage.open(image_name) as file, Image.open(file) as original:
+        original.draft('RGB', (largest, largest))
+        image = to_rgb(ImageOps.exif_transpose(original))
+    widths = get_widths(image.width)
+    for width in widths:
+        height = max(round(image.height * width / image.width), 1)
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for image_format, (pillow_format, _, options) in FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, pillow_format, **options)
+            name = rendition_name(image_name, width, image_format)
+            storage.delete(name)
+            storage.save(name, ContentFile(buffer.getvalue()))
+    return {'image': image_name, 'widths': widths}
+
+
+def delete_renditions(storage: Storage, renditions: Dict) -> None:
+    for width in renditions.get('widths', ()):
+        for image_format in FORMATS:
+            storage.delete(
+                rendition_name(renditions['image'], width, image_format)
+            )
+
+
+def find_renditions(storage: Storage, image_name: str) -> Dict:
+    """
+    Описание уже сохранённых копий картинки `image_name` (ширины,
+    для которых есть копии всех форматов) или пустой словарь.
+    """
+    directory = posixpath.dirname(rendition_name(image_name, 0, 'webp'))
+    try:
+        files = set(storage.listdir(directory)[1])
+    except FileNotFoundError:
+        return {}
+    stems = {posixpath.splitext(filename)[0] for filename in files}
+    widths = sorted(
+        int(stem) for stem in stems
+        if stem.isdigit() and all(
+            f'{stem}.{extension}' in files
+            for _, extension, _ in FORMATS.values()
+        )
+    )
+    return {'image': image_name, 'widths': widths} if widths else {}
+
+
+def refresh_renditions(storage: Storage, image_name: str,
+                       renditions: Dict,
+                       force: bool = False) -> Optional[Dict]:
+    """
+    Создаёт копии картинки `image_name`, если `renditions` описывает
+    копии другой картинки (или `force`), и удаляет копии прежней.
+    Возвращает новое описание копий или None, если оно не изменилось.
+    Работает только с хранилищем, без БД.
+
+    В общем хранилище (`storage.shared`, см. recipes.storage) картинка
+    может принадлежать нескольким рецептам: готовые копии используются
+    повторно, а копии прежней картинки не удаляются.
+    """
+    if not force and renditions.get('image') == image_name:
+        return None
+    shared = getattr(storage, 'shared', False)
+    new = {}
+    if image_name and shared and not force:
+        new = find_renditions(storage, image_name)
+    if image_name and not new:
+        try:
+            new = make_renditions(storage, image_name)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+            logger.warning(
+                'Не удалось сделать копии картинки %s', image_name,
+                exc_info=True
+            )
+    if not shared and renditions.get('image') and (
+        renditions['image'] != image_name
+    ):
+        delete_renditions(storage, renditions)
+    return None if new == renditions else new
+
+
+def update_renditions(recipe: Recipe, force: bool = False) -> bool:
+    """
+    Обновляет копии картинки рецепта и их описание в БД
+    (вместе с `updated_at` и поколениями кэша рецепта).
+    """
+    renditions = refresh_renditions(
+        recipe.image.storage, recipe.image.name, recipe.renditions or {},
+        force
+    )
+    if renditions is None:
+        return False
+    recipe.renditions = renditions
+    save_recipes([recipe], ('renditions',))
+    return True
+
+
+def get_srcset(image_name: str, renditions: Optional[Dict],
+               request=None) -> Dict[str, str]:
+    """
+    Значения `srcset` по форматам:
+    `{'webp': '<url> 320w, <url> 640w', 'jpeg': ...}`; пустой словарь,
+    если копий текущей картинки нет.
+    """
+    if not renditions or renditions.get('image') != image_name:
+        return {}
+    storage = Recipe._meta.get_field('image').storage
+    srcset = {}
+    for image_format in FORMATS:
+        sources = []
+        for width in renditions['widths']:
+            url = storage.url(rendition_name(image_name, width, image_format))
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            sources.append(f'{url} {width}w')
+        srcset[image_format] = ', '.join(sources)
+    return srcset
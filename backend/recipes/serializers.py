@@ -1,18 +1,69 @@
-from typing import OrderedDict
+from operator import attrgetter
+from typing import (Dict, Iterable, List, Optional, OrderedDict, Set, Tuple,
+                    Type)
 
+from core.compiled import CompiledSerializer, FileURL, Method, Nested
 from core.validators import field_validator, ingredients_validator
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db import transaction
-from django.db.models.query import QuerySet
-from drf_extra_fields.fields import Base64ImageField
-from recipes.models import Ingredient, IngredientsInRecipe, Recipe, Tag
-from rest_framework.serializers import (IntegerField, ModelSerializer,
-                                        PrimaryKeyRelatedField, ReadOnlyField,
-                                        SerializerMethodField)
-from users.serializers import UserSerializer
+from django.db.models import Manager, Model, Prefetch, Value
+from recipes.cache import (CACHE_TIMEOUT, bump, representation_keys,
+                           tag_generation)
+from recipes.database_json import get_recipes_json
+from recipes.images import RecipeImageField
+from recipes.models import (FavoritesList, Ingredient, IngredientsInRecipe,
+                            Recipe, ShoppingList, Tag)
+from recipes.placeholders import get_placeholder
+from recipes.renditions import get_srcset
+from rest_framework.exceptions import NotFound
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.request import Request
+from rest_framework.serializers import (BaseSerializer, IntegerField,
+                                        ListSerializer, ModelSerializer,
+                                        ReadOnlyField, SerializerMethodField,
+                                        ValidationError)
+from users.serializers import (CompiledUserSerializer, UserSerializer,
+                               get_subscribed_authors,
+                               remember_subscribed_authors)
 
 User = get_user_model()
 
+FAVORITE, SHOPPING_CART, SUBSCRIPTION = range(3)
+
+
+def get_recipe_flags(request: Request,
+                     recipe_ids: Iterable[int]) -> Tuple[Set[int], Set[int]]:
+    """
+    Возвращает id рецептов из recipe_ids, которые текущий пользователь
+    добавил в избранное и в список покупок. Тем же запросом загружает
+    его подписки для get_subscribed_authors.
+    """
+    user = request.user
+    if user.is_anonymous:
+        return set(), set()
+    queryset = (
+        FavoritesList.objects
+        .filter(user=user, recipe__in=recipe_ids)
+        .order_by()
+        .values_list('recipe_id', Value(FAVORITE))
+        .union(
+            ShoppingList.objects
+            .filter(user=user, recipe__in=recipe_ids)
+            .order_by()
+            .values_list('recipe_id', Value(SHOPPING_CART)),
+            user.subscriptions
+            .order_by()
+            .values_list('author_id', Value(SUBSCRIPTION)),
+            all=True,
+        )
+    )
+    flags = {FAVORITE: set(), SHOPPING_CART: set(), SUBSCRIPTION: set()}
+    for pk, kind in queryset:
+        flags[kind].add(pk)
+    remember_subscribed_authors(request, flags[SUBSCRIPTION])
+    return flags[FAVORITE], flags[SHOPPING_CART]
+
 
 class TagSerializer(ModelSerializer):
     """
@@ -64,7 +115,22 @@ class RecipeSerializer(ModelSerializer):
     ingredients = SerializerMethodField(read_only=True)
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
-    image = Base64ImageField()
+    image = RecipeImageField()
+    srcset = SerializerMethodField()
+    placeholder = SerializerMethodField()
+
+    select_related_fields = ('author',)
+    # Порядок тегов и ингредиентов тот же, что в RECIPES_JSON_SQL
+    # (recipes.database_json).
+    prefetch_related_fields = (
+        Prefetch('tags', queryset=Tag.objects.order_by('id')),
+        Prefetch(
+            'qt_ingredients',
+            queryset=IngredientsInRecipe.objects
+            .select_related('ingredient')
+            .order_by('id')
+        ),
+    )
 
     class Meta:
         model = Recipe
@@ -77,12 +143,18 @@ class RecipeSerializer(ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'srcset',
+            'placeholder',
             'text',
-            'cooking_time'
+            'cooking_time',
+            'favorites_count',
+            'shopping_cart_count',
         )
         read_only_fields = (
             'is_favorite',
             'is_shopping_cart',
+            'favorites_count',
+            'shopping_cart_count',
         )
 
     def get_ingredients(self, obj: Recipe) -> OrderedDict:
@@ -90,10 +162,23 @@ class RecipeSerializer(ModelSerializer):
         queryset = obj.qt_ingredients.all()
         return IngredientsInRecipeSerializer(queryset, many=True).data
 
+    def get_srcset(self, obj: Recipe) -> Dict[str, str]:
+        """Уменьшенные копии картинки по форматам."""
+        return get_srcset(
+            obj.image.name, obj.renditions, self.context.get('request')
+        )
+
+    def get_placeholder(self, obj: Recipe) -> Optional[Dict]:
+        """Заглушка картинки, пока она не загрузилась."""
+        return get_placeholder(obj.image.name, obj.placeholder)
+
     def get_is_favorited(self, obj: Recipe) -> bool:
         """
         Возвращает :obj:`bool` наличия рецепта в избранном.
+        Использует аннотацию `favorited` из RecipeViewSet, если она есть.
         """
+        if hasattr(obj, 'favorited'):
+            return obj.favorited
         user = self.context.get('view').request.user
         if user.is_anonymous:
             return False
@@ -102,13 +187,304 @@ class RecipeSerializer(ModelSerializer):
     def get_is_in_shopping_cart(self, obj: Recipe) -> bool:
         """
         Возвращает :obj:`bool` наличие рецепта в списке покупок.
+        Использует аннотацию `in_shopping_cart` из RecipeViewSet,
+        если она есть.
         """
+        if hasattr(obj, 'in_shopping_cart'):
+            return obj.in_shopping_cart
         user = self.context.get('view').request.user
         if user.is_anonymous:
             return False
         return user.customer.filter(recipe=obj).exists()
 
 
+class CompiledTagSerializer(CompiledSerializer):
+    """Скомпилированный TagSerializer."""
+    compiled_fields = {
+        'id': 'id',
+        'name': 'name',
+        'color': 'color',
+        'slug': 'slug',
+    }
+
+
+class CompiledIngredientSerializer(CompiledSerializer):
+    """Скомпилированный IngredientSerializer."""
+    compiled_fields = {
+        'id': 'id',
+        'name': 'name',
+        'measurement_unit': 'measurement_unit',
+    }
+
+
+class CompiledIngredientsInRecipeSerializer(CompiledSerializer):
+    """Скомпилированный IngredientsInRecipeSerializer."""
+    compiled_fields = {
+        'id': 'ingredient.id',
+        'name': 'ingredient.name',
+        'measurement_unit': 'ingredient.measurement_unit',
+        'amount': 'amount',
+    }
+
+
+class CompiledRecipeSerializer(CompiledSerializer):
+    """
+    Скомпилированный RecipeSerializer для чтения, вывод совпадает.
+    Ожидает загруженных автора, теги и ингредиенты
+    (RecipeSerializer.select_related_fields и prefetch_related_fields).
+    """
+    compiled_fields = {
+        'id': 'id',
+        'tags': Nested(CompiledTagSerializer, many=True),
+        'author': Nested(CompiledUserSerializer),
+        'ingredients': Nested(
+            CompiledIngredientsInRecipeSerializer, 'qt_ingredients', many=True
+        ),
+        'is_favorited': Method(),
+        'is_in_shopping_cart': Method(),
+        'name': 'name',
+        'image': FileURL(),
+        'srcset': Method(),
+        'placeholder': Method(),
+        'text': 'text',
+        'cooking_time': 'cooking_time',
+        'favorites_count': 'favorites_count',
+        'shopping_cart_count': 'shopping_cart_count',
+    }
+
+    @staticmethod
+    def get_srcset(obj: Recipe, context: Dict) -> Dict[str, str]:
+        return get_srcset(
+            obj.image.name, obj.renditions, context.get('request')
+        )
+
+    @staticmethod
+    def get_placeholder(obj: Recipe, context: Dict) -> Optional[Dict]:
+        return get_placeholder(obj.image.name, obj.placeholder)
+
+    @staticmethod
+    def get_is_favorited(obj: Recipe, context: Dict) -> bool:
+        if hasattr(obj, 'favorited'):
+            return obj.favorited
+        user = context['request'].user
+        if user.is_anonymous:
+            return False
+        return user.signed.filter(recipe=obj).exists()
+
+    @staticmethod
+    def get_is_in_shopping_cart(obj: Recipe, context: Dict) -> bool:
+        if hasattr(obj, 'in_shopping_cart'):
+            return obj.in_shopping_cart
+        user = context['request'].user
+        if user.is_anonymous:
+            return False
+        return user.customer.filter(recipe=obj).exists()
+
+
+class CachedRecipeListSerializer(ListSerializer):
+    """
+    Список рецептов для CachedRecipeSerializer: флаги пользователя
+    загружаются одним запросом на всю страницу.
+    """
+
+    def to_representation(self, data) -> List[Dict]:
+        recipes = data.all() if isinstance(data, Manager) else data
+        return self.child.represent(list(recipes))
+
+
+class CachedRecipeSerializer(RecipeSerializer):
+    """
+    Сериализатор рецептов только для чтения. Общее для всех
+    пользователей представление рецепта кэшируется, а is_favorited,
+    is_in_shopping_cart и author.is_subscribed подставляются
+    для текущего пользователя. Часто меняющиеся счётчики
+    (Recipe.counter_fields) берутся из переданных рецептов, а не из кэша.
+    Рецепты, удалённые после выборки, пропускаются.
+    Вывод совпадает с RecipeSerializer.
+    Общее представление строит CompiledRecipeSerializer, если
+    у представления включено compiled_serializers.
+    """
+
+    class Meta(RecipeSerializer.Meta):
+        list_serializer_class = CachedRecipeListSerializer
+
+    def to_representation(self, instance: Recipe) -> Dict:
+        result = self.represent([instance])
+        if not result:
+            raise NotFound
+        return result[0]
+
+    def represent(self, recipes: List[Recipe]) -> List[Dict]:
+        ids = [recipe.pk for recipe in recipes]
+        request = self.context['request']
+        favorites, shopping_cart = get_recipe_flags(request, ids)
+        subscribed = get_subscribed_authors(request)
+        shared = self.get_shared_representations(ids)
+        result = []
+        for recipe in recipes:
+            pk = recipe.pk
+            if pk not in shared:
+                # Рецепт удалён после выборки страницы.
+                continue
+            data = dict(shared[pk])
+            for field in Recipe.counter_fields:
+                data[field] = getattr(recipe, field)
+            data['is_favorited'] = pk in favorites
+            data['is_in_shopping_cart'] = pk in shopping_cart
+            author = data['author']
+            if author:
+                data['author'] = dict(
+                    author,
+                    is_subscribed=(author['id'] != request.user.pk
+                                   and author['id'] in subscribed)
+                )
+            result.append(data)
+        return result
+
+    def get_shared_representations(self, ids: List[int]) -> Dict[int, Dict]:
+        """
+        Берёт представления рецептов из кэша, недостающие сериализует
+        одним набором запросов и кладёт в кэш.
+        """
+        keys = representation_keys(ids, self.context['request'])
+        cached = cache.get_many(keys.values())
+        shared = {pk: cached[key] for pk, key in keys.items() if key in cached}
+        missing = [pk for pk in ids if pk not in shared]
+        if not missing:
+            return shared
+        recipes = (
+            Recipe.objects
+            .filter(pk__in=missing)
+            .select_related(*self.select_related_fields)
+            .prefetch_related(*self.prefetch_related_fields)
+        )
+        for recipe in recipes:
+            recipe.favorited = recipe.in_shopping_cart = False
+        serializer_class = RecipeSerializer
+        if getattr(self.context.get('view'), 'compiled_serializers', False):
+            serializer_class = CompiledRecipeSerializer
+        fresh = {
+            item['id']: item
+            for item in serializer_class(
+                recipes, many=True, context=self.context
+            ).data
+        }
+        cache.set_many(
+            {keys[pk]: item for pk, item in fresh.items()}, CACHE_TIMEOUT
+        )
+        shared.update(fresh)
+        return shared
+
+
+class DatabaseJSONRecipeListSerializer(ListSerializer):
+    """
+    Список рецептов для DatabaseJSONRecipeSerializer: вся страница
+    строится одним запросом.
+    """
+
+    def to_representation(self, data) -> List[Dict]:
+        recipes = data.all() if isinstance(data, Manager) else data
+        return self.child.represent(list(recipes))
+
+
+class DatabaseJSONRecipeSerializer(BaseSerializer):
+    """
+    Сериализатор рецептов только для чтения для PostgreSQL: JSON
+    рецептов вместе с флагами пользователя собирается в БД
+    (recipes.database_json), от объектов нужны только ключи.
+    Рецепты, удалённые после выборки, пропускаются.
+    Вывод совпадает с RecipeSerializer.
+    """
+
+    class Meta:
+        list_serializer_class = DatabaseJSONRecipeListSerializer
+
+    def to_representation(self, instance: Recipe) -> Dict:
+        result = self.represent([instance])
+        if not result:
+            raise NotFound
+        return result[0]
+
+    def represent(self, recipes: List[Recipe]) -> List[Dict]:
+        ids = [recipe.pk for recipe in recipes]
+        request = self.context['request']
+        data = get_recipes_json(ids, request.user.pk)
+        storage = Recipe._meta.get_field('image').storage
+        for item in data.values():
+            item['srcset'] = get_srcset(item['image'], item['srcset'], request)
+            item['placeholder'] = get_placeholder(
+                item['image'], item['placeholder']
+            )
+            if item['image']:
+                item['image'] = request.build_absolute_uri(
+                    storage.url(item['image'])
+                )
+            else:
+                item['image'] = None
+        return [data[pk] for pk in ids if pk in data]
+
+
+def find_objects(model: Type[Model], ids: Iterable[int],
+                 preloaded: Dict[Type[Model], Dict[int, Model]] = None
+                 ) -> Dict[int, Model]:
+    """
+    Словарь объектов `model` по id: из `preloaded`, если там есть
+    словарь для `model`, иначе одним запросом.
+    """
+    if preloaded and model in preloaded:
+        return preloaded[model]
+    return model.objects.in_bulk(ids)
+
+
+def get_objects(model: Type[Model], ids: Iterable[int], field: str,
+                preloaded: Dict[Type[Model], Dict[int, Model]] = None
+                ) -> List[Model]:
+    """
+    Объекты `model` по id одним запросом, в порядке `ids` и без повторов.
+    Если каких-то объектов нет, ValidationError для поля `field`
+    перечисляет их id. Объекты берутся из `preloaded`, если там
+    есть словарь для `model`.
+    """
+    ids = list(dict.fromkeys(ids))
+    found = find_objects(model, ids, preloaded)
+    missing = [pk for pk in ids if pk not in found]
+    if missing:
+        raise ValidationError({field: [
+            'Не найдены объекты с id: '
+            f'{", ".join(map(str, missing))}.'
+        ]})
+    return [found[pk] for pk in ids]
+
+
+class PrimaryKeysField(ManyRelatedField):
+    """
+    Список первичных ключей, как PrimaryKeyRelatedField с many=True
+    (та же схема и те же ошибки), но объекты находятся одним запросом
+    или берутся из `preloaded` контекста. Повторы убираются.
+    """
+
+    def to_internal_value(self, data) -> List[Model]:
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        ids = []
+        for pk in data:
+            try:
+                ids.append(int(pk))
+            except (TypeError, ValueError):
+                child.fail('incorrect_type', data_type=type(pk).__name__)
+        ids = list(dict.fromkeys(ids))
+        found = find_objects(
+            child.get_queryset().model, ids, self.context.get('preloaded')
+        )
+        for pk in ids:
+            if pk not in found:
+                child.fail('does_not_exist', pk_value=pk)
+        return [found[pk] for pk in ids]
+
+
 class IngredientsInRecipeCreateSerializer(ModelSerializer):
     """Дополнительный сериализатор рецептов для поля ingredients."""
     id = IntegerField()
@@ -119,12 +495,20 @@ class IngredientsInRecipeCreateSerializer(ModelSerializer):
 
 
 class RecipeCreateSerializer(ModelSerializer):
-    """Сериализатор для создания и изменения рецептов."""
+    """
+    Сериализатор для создания и изменения рецептов.
+    Теги и ингредиенты находятся одним запросом каждые (или берутся
+    из `preloaded` контекста, см. recipes.bulk), при изменении
+    рецепта записываются только отличия. Ответ собирается
+    из записанных объектов, без повторного чтения рецепта.
+    """
     id = ReadOnlyField()
-    tags = PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+    tags = PrimaryKeysField(
+        child_relation=PrimaryKeyRelatedField(queryset=Tag.objects.all())
+    )
     author = UserSerializer(read_only=True)
     ingredients = IngredientsInRecipeCreateSerializer(many=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
@@ -146,28 +530,80 @@ class RecipeCreateSerializer(ModelSerializer):
         field_list = ['name', 'text', 'ingredients', 'tags', 'cooking_time']
         field_validator(obj, field_list)
         ingredients_validator(self)
+        ingredients = get_objects(
+            Ingredient, (item['id'] for item in obj['ingredients']),
+            'ingredients', self.context.get('preloaded')
+        )
+        obj['ingredients'] = [
+            (ingredient, item['amount'])
+            for ingredient, item in zip(ingredients, obj['ingredients'])
+        ]
         obj.update({'author': self.context.get('request').user})
         return obj
 
-    @transaction.atomic
-    def __create_update_recipe(self,
-                               recipe: QuerySet(Recipe),
-                               ingredients: dict,
-                               tags: list) -> None:
+    def __update_relations(self,
+                           recipe: Recipe,
+                           ingredients: List[Tuple[Ingredient, int]],
+                           tags: List[Tag],
+                           created: bool) -> None:
         """
-        Создаёт экземпляры класса IngredientsInRecipe
-        связанных моделей Recipe и Ingredients и связывает
-        Recipe с Tags.
+        Приводит теги и ингредиенты рецепта к переданным: удаляет
+        лишние строки, добавляет новые и одним bulk_update меняет
+        количество у изменившихся. Записанные объекты запоминаются
+        для ответа в том же порядке, что при чтении рецепта
+        (RecipeSerializer.prefetch_related_fields).
+        Массовые операции не вызывают сигналов, поэтому поколения
+        добавленных и удалённых тегов сбрасываются здесь, а поколение
+        рецепта - сигналом сохранения рецепта.
         """
-        recipe.tags.set(tags)
-        objs = tuple(
+        old_tags = [] if created else list(recipe.tags.all())
+        new_ids = {tag.pk for tag in tags}
+        old_ids = {tag.pk for tag in old_tags}
+        removed_tags = [tag for tag in old_tags if tag.pk not in new_ids]
+        added_tags = [tag for tag in tags if tag.pk not in old_ids]
+        tags_in_recipe = Recipe.tags.through
+        if removed_tags:
+            tags_in_recipe.objects.filter(
+                recipe=recipe, tag__in=removed_tags
+            ).delete()
+        tags_in_recipe.objects.bulk_create(
+            tags_in_recipe(recipe=recipe, tag=tag) for tag in added_tags
+        )
+        bump(tag_generation(tag.slug) for tag in removed_tags + added_tags)
+
+        items = {
+            ingredient.pk: (ingredient, amount)
+            for ingredient, amount in ingredients
+        }
+        rows = {} if created else {
+            row.ingredient_id: row for row in recipe.qt_ingredients.all()
+        }
+        removed = [row.pk for pk, row in rows.items() if pk not in items]
+        if removed:
+            IngredientsInRecipe.objects.filter(pk__in=removed).delete()
+            rows = {pk: row for pk, row in rows.items() if pk in items}
+        changed = []
+        for row in rows.values():
+            row.ingredient, amount = items[row.ingredient_id]
+            if row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        IngredientsInRecipe.objects.bulk_update(changed, ('amount',))
+        added = IngredientsInRecipe.objects.bulk_create(
             IngredientsInRecipe(
-                recipe=recipe,
-                ingredient=Ingredient.objects.get(pk=ingredient['id']),
-                amount=ingredient['amount'])
-            for ingredient in ingredients
+                recipe=recipe, ingredient=ingredient, amount=amount
+            )
+            for pk, (ingredient, amount) in items.items() if pk not in rows
         )
-        IngredientsInRecipe.objects.bulk_create(objs)
+        self.written_relations = {
+            'tags': sorted(
+                [tag for tag in old_tags if tag.pk in new_ids] + added_tags,
+                key=attrgetter('pk')
+            ),
+            'qt_ingredients': sorted(
+                [*rows.values(), *added], key=attrgetter('pk')
+            ),
+        }
 
     @transaction.atomic
     def create(self, validated_data):
@@ -177,7 +613,8 @@ class RecipeCreateSerializer(ModelSerializer):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
-        self.__create_update_recipe(recipe, ingredients, tags)
+        self.__update_relations(recipe, ingredients, tags, created=True)
+        recipe.favorited = recipe.in_shopping_cart = False
         return recipe
 
     @transaction.atomic
@@ -187,16 +624,31 @@ class RecipeCreateSerializer(ModelSerializer):
         """
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        instance = super().update(instance, validated_data)
-
-        IngredientsInRecipe.objects.filter(
-            recipe=instance,
-            ingredient__in=instance.ingredients.all()
-        ).delete()
-
-        self.__create_update_recipe(instance, ingredients, tags)
-        instance.save()
-        return instance
+        self.__update_relations(instance, ingredients, tags, created=False)
+        return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        """
+        Представление RecipeSerializer. Теги и ингредиенты берутся
+        из записанных объектов (UpdateModelMixin очищает prefetch-кэш
+        после сохранения, поэтому он заполняется здесь).
+        """
+        written = getattr(self, 'written_relations', None)
+        if written:
+            instance._prefetched_objects_cache = dict(written)
+        if not hasattr(instance, 'favorited'):
+            favorites, shopping_cart = get_recipe_flags(
+                self.context['request'], (instance.pk,)
+            )
+            instance.favorited = instance.pk in favorites
+            instance.in_shopping_cart = instance.pk in shopping_cart
         return RecipeSerializer(instance, context=self.context).data
+
+
+class RecipeImageSerializer(ModelSerializer):
+    """Сериализатор для замены изображения рецепта."""
+    image = RecipeImageField()
+
+    class Meta:
+        model = Recipe
+        fields = ('image',)
@@ -0,0 +1,192 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from users.models import AuthorSubscription
+
+from .cache import (ALL, CATALOG, author_generation, bump, bump_versions,
+                    recipe_generation, recipes_changed, recipes_generations,
+                    tag_generation, touch, user_version)
+from .counters import RECIPES_COUNT, SOURCES, update_counters
+from .models import (FavoritesList, Ingredient, IngredientsInRecipe, Recipe,
+                     ShoppingList, Tag)
+from .placeholders import update_placeholder
+from .renditions import update_renditions
+
+User = get_user_model()
+
+AUTHOR_FIELDS = {'username', 'first_name', 'last_name', 'email'}
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(pre_delete, sender=Recipe)
+def recipe_changed(sender, instance: Recipe, **kwargs):
+    bump(recipes_generations(Recipe.objects.filter(pk=instance.pk)))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance: Recipe, update_fields=None,
+                       **kwargs):
+    """
+    Уменьшенные копии и заглушка новой картинки делаются после
+    фиксации транзакции, чтобы не задерживать её.
+    """
+    if update_fields and 'image' not in update_fields:
+        return
+    image_name = instance.image.name
+    if settings.RECIPES_IMAGE_RENDITIONS and (
+        (instance.renditions or {}).get('image') != image_name
+    ):
+        transaction.on_commit(lambda: update_renditions(instance))
+    if settings.RECIPES_IMAGE_PLACEHOLDERS and (
+        (instance.placeholder or {}).get('image') != image_name
+    ):
+        transaction.on_commit(lambda: update_placeholder(instance))
+
+
+@receiver(post_save, sender=IngredientsInRecipe)
+@receiver(post_delete, sender=IngredientsInRecipe)
+def recipe_ingredients_changed(sender, instance: IngredientsInRecipe,
+                               **kwargs):
+    recipes_changed(Recipe.objects.filter(pk=instance.recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action: str, reverse: bool,
+                        pk_set: set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        recipes = Recipe.objects.filter(tags=instance)
+        if pk_set:
+            recipes = Recipe.objects.filter(pk__in=pk_set)
+        recipes_changed(recipes)
+        return
+    recipes = Recipe.objects.filter(pk=instance.pk)
+    touch(recipes)
+    names = recipes_generations(recipes)
+    if pk_set:
+        names.update(
+            tag_generation(slug)
+            for slug in Tag.objects
+            .filter(pk__in=pk_set)
+            .values_list('slug', flat=True)
+        )
+    bump(names)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def catalog_changed(sender, **kwargs):
+    bump((ALL,))
+    bump_versions((CATALOG,))
+
+
+@receiver(post_save, sender=FavoritesList)
+@receiver(post_delete, sender=FavoritesList)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_save, sender=AuthorSubscription)
+@receiver(post_delete, sender=AuthorSubscription)
+def user_lists_changed(sender, instance, **kwargs):
+    """
+    Меняется только поколение самого рецепта (его счётчики): списки
+    и теги не сбрасываются, счётчики в них подставляются из строк
+    рецептов страницы.
+    """
+    bump_versions((user_version(instance.user_id),))
+    if sender is not AuthorSubscription:
+        bump((recipe_generation(instance.recipe_id),))
+
+
+def counted_created(sender, instance, created: bool, **kwargs):
+    if created:
+        update_counters(instance, 1)
+
+
+def counted_deleted(sender, instance, **kwargs):
+    update_counters(instance, -1)
+
+
+for source in SOURCES:
+    post_save.connect(counted_created, sender=source)
+    post_delete.connect(counted_deleted, sender=source)
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_saving(sender, instance: Recipe, update_fields=None, **kwargs):
+    """
+    Запоминает прежнего автора, чтобы при смене автора
+    пересчитать счётчики рецептов.
+    """
+    if instance._state.adding:
+        return
+    if update_fields and 'author' not in update_fields:
+        return
+    instance._saved_author_id = (
+        Recipe.objects
+        .filter(pk=instance.pk)
+        .values_list('author_id', flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_author_changed(sender, instance: Recipe, created: bool, **kwargs):
+    saved_author_id = instance.__dict__.pop(
+        '_saved_author_id', instance.author_id
+    )
+    if created or saved_author_id == instance.author_id:
+        return
+    RECIPES_COUNT.change(saved_author_id, -1)
+    RECIPES_COUNT.change(instance.author_id, 1)
+
+
+@receiver(pre_save, sender=User)
+def author_saving(sender, instance: User, update_fields=None, **kwargs):
+    """
+    Запоминает прежние поля автора, входящие в представление рецептов:
+    save() без update_fields (CountersMixin подставляет все поля)
+    не должен сбрасывать кэш рецептов, если они не изменились.
+    """
+    if instance._state.adding:
+        return
+    if update_fields and not AUTHOR_FIELDS.intersection(update_fields):
+        return
+    instance._saved_author_fields = (
+        User.objects
+        .filter(pk=instance.pk)
+        .values(*AUTHOR_FIELDS)
+        .first()
+    )
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance: User, created: bool,
+                   update_fields=None, **kwargs):
+    if update_fields and not AUTHOR_FIELDS.intersection(update_fields):
+        return
+    saved = instance.__dict__.pop('_saved_author_fields', None)
+    if saved and all(
+        getattr(instance, field) == value for field, value in saved.items()
+    ):
+        return
+    names = {author_generation(instance.pk)}
+    if not created:
+        touch(instance.recipes.all())
+        names.update(recipes_generations(instance.recipes.all()))
+    bump(names)
+
+
+@receiver(pre_delete, sender=User)
+def author_deleting(sender, instance: User, **kwargs):
+    touch(instance.recipes.all())
+
+
+@receiver(post_delete, sender=User)
+def author_deleted(sender, **kwargs):
+    bump((ALL,))
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import posixpath
+import re
+from typing import Iterable
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+# Имя по содержимому: `<папка>/ab/cd/<sha256>.<расширение>`.
+HASHED_NAME = re.compile(
+    r'^(?P<directory>.+)/(?P<shard>[0-9a-f]{2}/[0-9a-f]{2})/'
+    r'(?P<digest>[0-9a-f]{64})(?P<extension>\.\w+)?$'
+)
+
+
+def get_digest(content: File) -> str:
+    """SHA-256 содержимого файла, читаемого по частям."""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище с именами по содержимому для загрузок
+    в папки `directories`: файл `recipe_images/photo.jpg` сохраняется
+    как `recipe_images/ab/cd/<sha256>.jpg` (первые байты хеша - папки,
+    чтобы в одной папке не было слишком много файлов). Если такой файл
+    уже есть, он не записывается повторно, и одинаковые картинки
+    разных рецептов хранятся один раз.
+
+    Остальные файлы, например уменьшенные копии во вложенных папках,
+    сохраняются как обычно. Файлы лежат в MEDIA_ROOT и отдаются
+    по MEDIA_URL, как у FileSystemStorage, поэтому прежние имена в БД
+    продолжают работать (см. команду rehash_images). Файлы, на которые
+    больше не ссылаются рецепты, удаляет команда prune_images.
+    """
+
+    # Один файл может принадлежать нескольким рецептам, поэтому
+    # файлы, производные от него, не удаляются при смене картинки.
+    shared = True
+
+    def __init__(self, *args, directories: Iterable[str] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.directories = {
+            directory.strip('/') for directory in directories
+        }
+
+    def is_hashed(self, name: str) -> bool:
+        return HASHED_NAME.match(name) is not None
+
+    def hashed_name(self, name: str, content: File) -> str:
+        directory, filename = posixpath.split(name)
+        digest = get_digest(content)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(
+            directory, digest[:2], digest[2:4], f'{digest}{extension}'
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if posixpath.dirname(name) not in self.directories:
+            return super().save(name, content, max_length)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            if self.size(name) == content.size:
+                # Время изменения обновляется, чтобы команда prune_images
+                # не удалила файл до записи рецепта, который на него
+                # сошлётся.
+                os.utime(self.path(name))
+                return name
+            # Файл с таким именем не дописан (например, запись
+            # прервалась): он перезаписывается.
+            self.delete(name)
+        saved = super().save(name, content, max_length)
+        if saved != name:
+            # Тот же файл одновременно записал другой запрос, и копия
+            # получила суффикс: остаётся файл под именем по хешу.
+            self.delete(saved)
+        return name
@@ -0,0 +1,111 @@
+from time import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from ..autocomplete import IngredientIndex, ingredient_index
+from ..models import Ingredient, IngredientsInRecipe, Recipe
+
+User = get_user_model()
+
+
+class IngredientAutocompleteTestCase(APITestCase):
+    """Поиск ингредиентов по индексу в памяти процесса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredients = {
+            ingredient.name: ingredient
+            for ingredient in Ingredient.objects.bulk_create(
+                Ingredient(name=name, measurement_unit='г')
+                for name in ('Молоко', 'Молоко топлёное', 'Сухое молоко',
+                             'Ёжевика', 'Мёд', 'Масло сливочное')
+            )
+        }
+        recipe = Recipe.objects.create(
+            name='рецепт', author=User.objects.create(username='author'),
+            text='текст', cooking_time=1, image='recipe.png'
+        )
+        IngredientsInRecipe.objects.create(
+            recipe=recipe,
+            ingredient=cls.ingredients['Молоко топлёное'],
+            amount=1
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query: str, limit: int = 10):
+        return [
+            item['name']
+            for item in IngredientIndex.build().search(query, limit)
+        ]
+
+    def test_ranking(self):
+        """
+        Сначала начинающиеся с запроса (чаще используемые выше),
+        затем содержащие его.
+        """
+        self.assertEqual(
+            self.search('молоко'),
+            ['Молоко топлёное', 'Молоко', 'Сухое молоко']
+        )
+        self.assertEqual(self.search('молоко', 2),
+                         ['Молоко топлёное', 'Молоко'])
+
+    def test_folding(self):
+        """Регистр и ё/е не различаются."""
+        self.assertEqual(self.search('ЕЖЕ'), ['Ёжевика'])
+        self.assertEqual(self.search('топлен'), ['Молоко топлёное'])
+        self.assertEqual(self.search('мЁ'), ['Мёд'])
+
+    def test_typos(self):
+        """Если точных совпадений нет, ищутся похожие названия."""
+        self.assertEqual(self.search('малоко')[:2],
+                         ['Молоко топлёное', 'Молоко'])
+        self.assertEqual(self.search('ъъъъ'), [])
+
+    def test_view(self):
+        """
+        Ответ без запросов к БД, пока не изменились справочники;
+        после изменения индекс перестраивается.
+        """
+        url = reverse('recipes:ingredients-list')
+        ingredient_index.get()
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'name': 'мол'})
+        milk = self.ingredients['Молоко топлёное']
+        self.assertEqual(response.data[0], {
+            'id': milk.pk, 'name': milk.name, 'measurement_unit': 'г'
+        })
+        self.assertEqual(
+            [item['name'] for item in response.data],
+            ['Молоко топлёное', 'Молоко', 'Сухое молоко']
+        )
+        Ingredient.objects.create(name='Молочай', measurement_unit='г')
+        response = self.client.get(url, {'name': 'мол'})
+        self.assertIn('Молочай', [item['name'] for item in response.data])
+
+    def test_view_validators_follow_index(self):
+        """
+        ETag и Last-Modified меняются при перестроении индекса, даже если
+        версия справочников прежняя: изменилась частота ингредиентов.
+        """
+        url = reverse('recipes:ingredients-list')
+        ingredient_index.get()
+        response = self.client.get(url, {'name': 'мол'})
+        etag = response['ETag']
+        response = self.client.get(
+            url, {'name': 'мол'}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+        with patch.object(ingredient_index, 'is_outdated', return_value=True):
+            with patch('recipes.autocomplete.time', return_value=time() + 60):
+                response = self.client.get(
+                    url, {'name': 'мол'}, HTTP_IF_NONE_MATCH=etag
+                )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
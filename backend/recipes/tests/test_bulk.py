@@ -0,0 +1,163 @@
+import json
+from unittest.mock import patch
+
+import orjson
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..bulk import RecipeBulkCreator
+from ..models import Ingredient, Recipe, Tag
+from .test_recipes import IMAGE
+
+User = get_user_model()
+
+
+class RecipeBulkTestCase(APITestCase):
+    """Массовое создание рецептов: POST /api/recipes/bulk/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='bulkauthor', email='bulkauthor@test.com',
+            password='testpassword'
+        )
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=f'tag{i}', color=f'#E26C2{i}', slug=f'tag{i}')
+            for i in range(2)
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ingredient{i}', measurement_unit='г')
+            for i in range(3)
+        )
+        cls.url = reverse('recipes:recipes-bulk')
+
+    def setUp(self):
+        self.client.force_authenticate(self.author)
+
+    def recipe(self, name: str, **kwargs):
+        return {
+            'name': name,
+            'image': IMAGE,
+            'text': 'текст',
+            'cooking_time': 10,
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 5}
+                for ingredient in self.ingredients
+            ],
+            **kwargs,
+        }
+
+    def test_bulk_create(self):
+        """
+        Запросы к БД не зависят от числа рецептов, ошибочные рецепты
+        не мешают созданию остальных.
+        """
+        Recipe.objects.create(
+            name='занято', author=self.author, text='текст',
+            cooking_time=1, image='recipe.png'
+        )
+        items = [self.recipe(f'рецепт {i}') for i in range(5)]
+        items += [
+            self.recipe('без тега', tags=[999]),
+            self.recipe('занято'),
+            self.recipe('рецепт 0'),
+            'не рецепт',
+        ]
+        with self.assertNumQueries(9):
+            response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['created'], 5)
+        self.assertEqual(response.data['failed'], 4)
+        results = response.data['results']
+        self.assertEqual(
+            [result['status'] for result in results], [201] * 5 + [400] * 4
+        )
+        self.assertEqual(
+            results[5]['errors']['tags'],
+            ['Invalid pk "999" - object does not exist.']
+        )
+        self.assertIn('name', results[6]['errors'])
+        self.assertIn('name', results[7]['errors'])
+        recipe = Recipe.objects.get(pk=results[2]['id'])
+        self.assertEqual(recipe.name, 'рецепт 2')
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(recipe.ingredients.count(), 3)
+        # Копии и заглушки делают команды, а не запрос.
+        self.assertEqual(recipe.renditions, {})
+        self.assertEqual(recipe.placeholder, {})
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 6)
+        list_response = self.client.get(reverse('recipes:recipes-list'))
+        self.assertEqual(list_response.data['count'], 6)
+
+    def test_ndjson(self):
+        body = '\n'.join(
+            [json.dumps(self.recipe(f'рецепт {i}')) for i in range(3)]
+            + ['{неверный json']
+        )
+        response = self.client.post(
+            self.url, body, content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            [201, 201, 201, 400]
+        )
+
+    def test_ndjson_limit(self):
+        """Разбор NDJSON прекращается, как только рецептов больше лимита."""
+        body = '\n'.join(
+            json.dumps(self.recipe(f'рецепт {i}')) for i in range(5)
+        )
+        with self.settings(RECIPES_BULK_MAX_ITEMS=2):
+            with patch('core.parsers.orjson.loads',
+                       wraps=orjson.loads) as loads:
+                response = self.client.post(
+                    self.url, body, content_type='application/x-ndjson'
+                )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data['non_field_errors'],
+            ['Не больше 2 рецептов за запрос.']
+        )
+        self.assertEqual(loads.call_count, 3)
+        self.assertFalse(Recipe.objects.filter(name='рецепт 0').exists())
+
+    def test_failed_chunk(self):
+        """Если пачка не записалась, рецепты сохраняются по одному."""
+        write = RecipeBulkCreator.write
+
+        def failing_write(chunk):
+            if any(data['name'] == 'сломанный' for _, data in chunk):
+                raise DatabaseError
+            return write(chunk)
+
+        items = [self.recipe(name) for name in ('1', 'сломанный', '2')]
+        with patch.object(RecipeBulkCreator, 'write',
+                          staticmethod(failing_write)):
+            response = self.client.post(self.url, items, format='json')
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            [201, 400, 201]
+        )
+        self.assertEqual(
+            set(Recipe.objects.values_list('name', flat=True)), {'1', '2'}
+        )
+
+    def test_limits(self):
+        response = self.client.post(self.url, [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(RECIPES_BULK_MAX_ITEMS=1):
+            response = self.client.post(
+                self.url, [self.recipe('1'), self.recipe('2')], format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(None)
+        response = self.client.post(
+            self.url, [self.recipe('1')], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,229 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from core.mixins import CompiledSerializerMixin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from django.urls import reverse
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+from users.models import AuthorSubscription
+from users.serializers import CompiledUserSerializer, UserSerializer
+
+from ..models import (FavoritesList, Ingredient, IngredientsInRecipe, Recipe,
+                      ShoppingList, Tag)
+from ..serializers import (CachedRecipeSerializer,
+                           CompiledIngredientSerializer,
+                           CompiledRecipeSerializer, CompiledTagSerializer,
+                           IngredientSerializer, RecipeSerializer,
+                           TagSerializer)
+from ..views import RecipeViewSet
+
+User = get_user_model()
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMA'
+    'AABieywaAAAACVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxA'
+    'GVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAABJRU5ErkJggg=='
+)
+
+
+class CompiledSerializersTestCase(APITestCase):
+    """
+    Скомпилированные сериализаторы дают тот же JSON до байта,
+    что и сериализаторы DRF.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='compiledauthor',
+            email='compiledauthor@test.com',
+            first_name='Автор',
+            last_name='Рецептов',
+            password='testpassword'
+        )
+        cls.user = User.objects.create_user(
+            username='compileduser',
+            email='compileduser@test.com',
+            password='testpassword'
+        )
+        cls.token_user = Token.objects.create(user=cls.user)
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=f'тег {i}', color=f'#E26C2{i}', slug=f'tag{i}')
+            for i in range(2)
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент "{i}"', measurement_unit='г')
+            for i in range(3)
+        )
+        for i, author in enumerate((cls.author, cls.user, None)):
+            recipe = Recipe.objects.create(
+                name=f'рецепт {i}',
+                author=author,
+                image=Base64ImageField().to_internal_value(IMAGE),
+                text='Текст\nс переводом строки',
+                cooking_time=10 + i,
+            )
+            # Теги связываются в обратном порядке, чтобы порядок строк
+            # связи не совпадал с порядком тегов в ответе.
+            for tag in reversed(cls.tags[:i + 1]):
+                recipe.tags.add(tag)
+            IngredientsInRecipe.objects.bulk_create(
+                IngredientsInRecipe(
+                    recipe=recipe, ingredient=ingredient, amount=i + 1
+                )
+                for ingredient in cls.ingredients[i:]
+            )
+        cls.recipe = recipe
+        FavoritesList.objects.create(user=cls.user, recipe=recipe)
+        ShoppingList.objects.create(user=cls.author, recipe=recipe)
+        AuthorSubscription.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_context(self, user) -> dict:
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        return {'request': request, 'view': SimpleNamespace(request=request)}
+
+    def render(self, serializer_class, instance, context, many=True) -> bytes:
+        return JSONRenderer().render(
+            serializer_class(instance, many=many, context=context).data
+        )
+
+    def assert_same_output(self, serializer_class, compiled_class, instance,
+                           context, many=True):
+        self.assertEqual(
+            self.render(compiled_class, instance, context, many),
+            self.render(serializer_class, instance, context, many),
+        )
+
+    def get_recipes(self, user=None):
+        recipes = (
+            Recipe.objects
+            .order_by('id')
+            .select_related(*RecipeSerializer.select_related_fields)
+            .prefetch_related(*RecipeSerializer.prefetch_related_fields)
+        )
+        if user is None:
+            return recipes
+        return recipes.annotate(
+            favorited=Exists(
+                FavoritesList.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            in_shopping_cart=Exists(
+                ShoppingList.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+        )
+
+    def assert_skips_deleted(self, serializer_class):
+        """Рецепт, удалённый после выборки страницы, пропускается."""
+        recipes = list(Recipe.objects.order_by('id'))
+        deleted = recipes[0]
+        Recipe.objects.filter(pk=deleted.pk).delete()
+        context = self.get_context(self.user)
+        data = serializer_class(recipes, many=True, context=context).data
+        self.assertEqual(
+            [item['id'] for item in data],
+            [recipe.pk for recipe in recipes[1:]]
+        )
+        with self.assertRaises(NotFound):
+            serializer_class(deleted, context=context).data
+
+    def test_cached_deleted_recipe(self):
+        self.assert_skips_deleted(CachedRecipeSerializer)
+
+    def test_recipes(self):
+        for user in (AnonymousUser(), self.user, self.author):
+            with self.subTest(user=user):
+                context = self.get_context(user)
+                self.assert_same_output(
+                    RecipeSerializer, CompiledRecipeSerializer,
+                    list(self.get_recipes()), context
+                )
+                if user.is_authenticated:
+                    self.assert_same_output(
+                        RecipeSerializer, CompiledRecipeSerializer,
+                        list(self.get_recipes(user)), context
+                    )
+                self.assert_same_output(
+                    RecipeSerializer, CompiledRecipeSerializer,
+                    self.get_recipes().get(pk=self.recipe.pk), context,
+                    many=False
+                )
+
+    def test_relations_order(self):
+        """
+        Теги упорядочены по id тега, ингредиенты - по id строки
+        ингредиента в рецепте, как в RECIPES_JSON_SQL.
+        """
+        data = RecipeSerializer(
+            self.get_recipes().get(pk=self.recipe.pk),
+            context=self.get_context(self.user)
+        ).data
+        self.assertEqual(
+            [tag['id'] for tag in data['tags']],
+            sorted(tag.pk for tag in self.tags)
+        )
+        self.assertEqual(
+            [ingredient['id'] for ingredient in data['ingredients']],
+            list(
+                IngredientsInRecipe.objects
+                .filter(recipe=self.recipe)
+                .order_by('id')
+                .values_list('ingredient_id', flat=True)
+            )
+        )
+
+    def test_catalog_and_users(self):
+        context = self.get_context(self.user)
+        for serializer_class, compiled_class, queryset in (
+            (TagSerializer, CompiledTagSerializer, Tag.objects.all()),
+            (IngredientSerializer, CompiledIngredientSerializer,
+             Ingredient.objects.all()),
+            (UserSerializer, CompiledUserSerializer, User.objects.all()),
+        ):
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assert_same_output(
+                    serializer_class, compiled_class, queryset, context
+                )
+
+    def test_views(self):
+        """Ответы API совпадают при включенных и выключенных сериализаторах."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + self.token_user.key)
+        urls = (
+            reverse('recipes:recipes-list'),
+            reverse('recipes:recipes-detail', args=(self.recipe.pk,)),
+            reverse('recipes:tags-list'),
+            reverse('recipes:ingredients-list'),
+            '/api/users/',
+            f'/api/users/{self.author.pk}/',
+            '/api/users/me/',
+        )
+        for cache_representation in (False, True):
+            with patch.object(
+                RecipeViewSet, 'cache_representation', cache_representation
+            ):
+                for url in urls:
+                    with self.subTest(url=url, cache=cache_representation):
+                        cache.clear()
+                        with patch.object(
+                            CompiledSerializerMixin,
+                            'compiled_serializers', False
+                        ):
+                            expected = client.get(url).content
+                        cache.clear()
+                        with patch.object(
+                            CompiledSerializerMixin,
+                            'compiled_serializers', True
+                        ):
+                            self.assertEqual(client.get(url).content, expected)
@@ -0,0 +1,72 @@
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..serializers import DatabaseJSONRecipeSerializer, RecipeSerializer
+from ..views import RecipeViewSet
+from .test_compiled import CompiledSerializersTestCase
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Только для PostgreSQL')
+class DatabaseJSONTestCase(CompiledSerializersTestCase):
+    """
+    JSON рецептов, построенный в PostgreSQL, совпадает до байта
+    с выводом RecipeSerializer.
+    """
+
+    def test_recipes(self):
+        for user in (AnonymousUser(), self.user, self.author):
+            with self.subTest(user=user):
+                context = self.get_context(user)
+                recipes = self.get_recipes(
+                    user if user.is_authenticated else None
+                )
+                self.assert_same_output(
+                    DatabaseJSONRecipeSerializer, RecipeSerializer,
+                    list(recipes), context
+                )
+                self.assert_same_output(
+                    DatabaseJSONRecipeSerializer, RecipeSerializer,
+                    recipes.get(pk=self.recipe.pk),
+                    context, many=False
+                )
+
+    def test_views(self):
+        """Ответы API совпадают при построении JSON в БД и в Python."""
+        urls = (
+            reverse('recipes:recipes-list'),
+            reverse('recipes:recipes-list') + '?ordering=-favorites_count',
+            reverse('recipes:recipes-detail', args=(self.recipe.pk,)),
+        )
+        for token in (None, self.token_user):
+            client = APIClient()
+            if token:
+                client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+            for url in urls:
+                with self.subTest(url=url, user=token and token.user):
+                    cache.clear()
+                    with patch.object(RecipeViewSet, 'database_json', False):
+                        expected = client.get(url).content
+                    cache.clear()
+                    with patch.object(RecipeViewSet, 'database_json', True):
+                        self.assertEqual(client.get(url).content, expected)
+
+    def test_list_queries(self):
+        """
+        Кроме авторизации и подсчёта количества (на PostgreSQL -
+        приблизительного): ключи страницы и один запрос JSON.
+        """
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + self.token_user.key)
+        cache.clear()
+        with patch.object(RecipeViewSet, 'database_json', True):
+            with self.assertNumQueries(6):
+                client.get(reverse('recipes:recipes-list'))
+
+    def test_deleted_recipe(self):
+        self.assert_skips_deleted(DatabaseJSONRecipeSerializer)
@@ -0,0 +1,105 @@
+import struct
+import zlib
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import Recipe
+
+User = get_user_model()
+
+
+def make_image(image_format: str = 'JPEG', size=(64, 48)) -> bytes:
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 80, 40)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def png_header(width: int, height: int) -> bytes:
+    """PNG только с заголовком: размеры без данных изображения."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data))
+        )
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        + chunk(b'IEND', b'')
+    )
+
+
+class RecipeImageUploadTestCase(APITestCase):
+    """Замена изображения рецепта: PUT /api/recipes/{id}/image/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='imageauthor', email='imageauthor@test.com',
+            password='testpassword'
+        )
+        cls.recipe = Recipe.objects.create(
+            name='рецепт', author=cls.author, text='текст',
+            cooking_time=1, image='recipe.png'
+        )
+        cls.url = reverse('recipes:recipes-image', args=(cls.recipe.pk,))
+
+    def setUp(self):
+        self.client.force_authenticate(self.author)
+
+    def put_raw(self, content: bytes, content_type: str = 'image/jpeg'):
+        return self.client.put(self.url, content, content_type=content_type)
+
+    def test_raw_upload(self):
+        response = self.put_raw(make_image())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.jpg'))
+        self.assertTrue(response.data['image'].endswith(
+            self.recipe.image.name
+        ))
+        with Image.open(self.recipe.image.path) as image:
+            self.assertEqual(image.size, (64, 48))
+
+    def test_multipart_upload(self):
+        image = SimpleUploadedFile('photo.png', make_image('PNG'))
+        response = self.client.put(
+            self.url, {'image': image}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.png'))
+
+    def test_limits(self):
+        content = make_image()
+        with self.settings(RECIPES_IMAGE_MAX_SIZE=len(content) - 1):
+            response = self.put_raw(content)
+        self.assertEqual(
+            response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        with self.settings(RECIPES_IMAGE_MAX_PIXELS=64 * 48 - 1):
+            response = self.put_raw(content)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.put_raw(content[:len(content) // 2])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.put_raw(b'not an image')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # Больше предела Pillow: DecompressionBombError при открытии.
+        response = self.put_raw(png_header(20000, 20000), 'image/png')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, 'recipe.png')
+
+    def test_not_author(self):
+        self.client.force_authenticate(
+            User.objects.create_user(
+                username='other', email='other@test.com', password='pass'
+            )
+        )
+        response = self.put_raw(make_image())
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -31,10 +31,37 @@ class IngredientViewSetTestCase(APITestCase):
         url = reverse('recipes:ingredients-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.json()), 2)
 
     def test_retrieve_ingredient(self):
         url = reverse('recipes:ingredients-detail', args=[self.ingredient1.pk])
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['name'], self.ingredient1.name)
+
+    def test_search_ingredients(self):
+        """
+        Поиск без учёта регистра и ё: сначала ингредиенты, название
+        которых начинается с запроса, затем содержащие его.
+        """
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г')
+            for name in ('Сок лимона', 'Лимон', 'Цедра лимона', 'Лимонад',
+                         'Мёд', 'Медовик')
+        )
+        url = reverse('recipes:ingredients-list')
+        for query, expected in (
+            ('лимон', ['Лимон', 'Лимонад', 'Сок лимона', 'Цедра лимона']),
+            ('МЕД', ['Мёд', 'Медовик']),
+            ('мёдо', ['Медовик']),
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(url, {'name': query})
+                self.assertEqual(
+                    [item['name'] for item in response.data], expected
+                )
+        with self.settings(INGREDIENTS_SEARCH_LIMIT=2):
+            response = self.client.get(url, {'name': 'лимон'})
+        self.assertEqual(
+            [item['name'] for item in response.data], ['Лимон', 'Лимонад']
+        )
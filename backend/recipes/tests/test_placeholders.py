@@ -0,0 +1,115 @@
+from io import StringIO
+
+from core.serializers import CroppedRecipeSerializer
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import Recipe
+from ..placeholders import BASE83, get_blurhash, update_placeholder
+from .test_renditions import make_photo
+
+User = get_user_model()
+
+
+def decode_base83(value: str) -> int:
+    result = 0
+    for character in value:
+        result = result * 83 + BASE83.index(character)
+    return result
+
+
+class RecipePlaceholderTestCase(APITestCase):
+    """Заглушка картинки рецепта: blurhash, миниатюра, цвет и размеры."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='placeholderauthor', email='placeholderauthor@test.com',
+            password='testpassword'
+        )
+
+    def create_recipe(self) -> Recipe:
+        recipe = Recipe(
+            name='рецепт', author=self.author, text='текст', cooking_time=1
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.image.save('photo.jpg', ContentFile(make_photo()))
+        recipe.refresh_from_db()
+        return recipe
+
+    def test_blurhash(self):
+        blurhash = get_blurhash(Image.new('RGB', (32, 24), (200, 80, 40)))
+        # 4x3 компоненты, средний цвет - цвет картинки.
+        self.assertEqual(len(blurhash), 28)
+        self.assertEqual(blurhash[0], 'L')
+        color = decode_base83(blurhash[2:6])
+        self.assertEqual(
+            (color >> 16, color >> 8 & 255, color & 255), (200, 80, 40)
+        )
+
+    def test_placeholder(self):
+        recipe = self.create_recipe()
+        response = self.client.get(
+            reverse('recipes:recipes-detail', args=(recipe.pk,))
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        placeholder = response.data['placeholder']
+        self.assertEqual(
+            list(placeholder),
+            ['width', 'height', 'color', 'blurhash', 'thumbnail']
+        )
+        # Размеры с учётом поворота из EXIF.
+        self.assertEqual(
+            (placeholder['width'], placeholder['height']), (600, 800)
+        )
+        self.assertRegex(placeholder['color'], r'^#[0-9a-f]{6}$')
+        self.assertEqual(len(placeholder['blurhash']), 28)
+        self.assertTrue(
+            placeholder['thumbnail'].startswith('data:image/webp;base64,')
+        )
+        self.assertEqual(
+            CroppedRecipeSerializer(recipe).data['placeholder'], placeholder
+        )
+
+    def test_no_placeholder(self):
+        recipe = Recipe.objects.create(
+            name='без картинки', author=self.author, text='текст',
+            cooking_time=1, image='missing.png'
+        )
+        response = self.client.get(
+            reverse('recipes:recipes-detail', args=(recipe.pk,))
+        )
+        self.assertIsNone(response.data['placeholder'])
+
+    def test_update_placeholder(self):
+        """Заглушка меняет `updated_at` и сбрасывает кэш ответа рецепта."""
+        with self.settings(RECIPES_IMAGE_PLACEHOLDERS=0):
+            recipe = self.create_recipe()
+        url = reverse('recipes:recipes-detail', args=(recipe.pk,))
+        self.assertIsNone(self.client.get(url).data['placeholder'])
+        updated_at = recipe.updated_at
+        self.assertTrue(update_placeholder(recipe))
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, updated_at)
+        self.assertIsNotNone(self.client.get(url).data['placeholder'])
+
+    def test_backfill_command(self):
+        with self.settings(RECIPES_IMAGE_PLACEHOLDERS=0):
+            recipe = self.create_recipe()
+        self.assertEqual(recipe.placeholder, {})
+        url = reverse('recipes:recipes-detail', args=(recipe.pk,))
+        self.assertIsNone(self.client.get(url).data['placeholder'])
+        updated_at = recipe.updated_at
+        call_command(
+            'backfill_placeholders', '--workers', '2', stdout=StringIO()
+        )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.placeholder['image'], recipe.image.name)
+        self.assertEqual(recipe.placeholder['height'], 800)
+        self.assertGreater(recipe.updated_at, updated_at)
+        self.assertIsNotNone(self.client.get(url).data['placeholder'])
@@ -0,0 +1,239 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from ..models import Ingredient, IngredientsInRecipe, Recipe, Tag
+from ..views import RecipeViewSet
+
+User = get_user_model()
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMA'
+    'AABieywaAAAACVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxA'
+    'GVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAABJRU5ErkJggg=='
+)
+
+RECIPES_COUNT = 6
+PAGE_SIZES = (1, 3, RECIPES_COUNT)
+
+
+class RecipeQueriesTestCase(APITestCase):
+    """
+    Фиксирует количество запросов к БД для RecipeViewSet,
+    чтобы N+1 регрессии ломали тесты.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='queryauthor',
+            email='queryauthor@test.com',
+            password='testpassword'
+        )
+        cls.user = User.objects.create_user(
+            username='queryuser',
+            email='queryuser@test.com',
+            password='testpassword'
+        )
+        cls.token_author = Token.objects.create(user=cls.author)
+        cls.token_user = Token.objects.create(user=cls.user)
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=f'tag{i}', color=f'#E26C2{i}', slug=f'tag{i}')
+            for i in range(3)
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ingredient{i}', measurement_unit='г')
+            for i in range(3)
+        )
+        for i in range(RECIPES_COUNT):
+            recipe = Recipe.objects.create(
+                name=f'recipe{i}',
+                author=cls.author,
+                image=IMAGE,
+                text='Некий текст',
+                cooking_time=10,
+            )
+            recipe.tags.set(cls.tags)
+            IngredientsInRecipe.objects.bulk_create(
+                IngredientsInRecipe(
+                    recipe=recipe, ingredient=ingredient, amount=5
+                )
+                for ingredient in cls.ingredients
+            )
+        cls.recipe = recipe
+        cls.recipe_data = {
+            'name': 'new recipe',
+            'image': IMAGE,
+            'text': 'New recipe text',
+            'cooking_time': 15,
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 5}
+                for ingredient in cls.ingredients
+            ],
+            'tags': [tag.id for tag in cls.tags],
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.not_auth_client = APIClient()
+        self.user_client = APIClient()
+        self.user_client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.token_user.key
+        )
+        self.author_client = APIClient()
+        self.author_client.credentials(
+            HTTP_AUTHORIZATION='Token ' + self.token_author.key
+        )
+
+    def test_list_not_auth(self):
+        """
+        Список рецептов анонимно: count, ключи рецептов, рецепты
+        с авторами, теги, ингредиенты; повторный запрос из кэша ответов.
+        """
+        url = reverse('recipes:recipes-list')
+        for limit in PAGE_SIZES:
+            cache.clear()
+            with self.subTest(limit=limit), self.assertNumQueries(5):
+                response = self.not_auth_client.get(url, {'limit': limit})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.data['results']), limit)
+            with self.subTest(limit=limit), self.assertNumQueries(0):
+                response = self.not_auth_client.get(url, {'limit': limit})
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_auth(self):
+        """
+        Список рецептов авторизованным пользователем: дополнительно токен
+        и флаги пользователя одним запросом; при повторном запросе
+        представления рецептов берутся из кэша.
+        """
+        url = reverse('recipes:recipes-list')
+        for limit in PAGE_SIZES:
+            cache.clear()
+            with self.subTest(limit=limit), self.assertNumQueries(7):
+                response = self.user_client.get(url, {'limit': limit})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.data['results']), limit)
+            with self.subTest(limit=limit), self.assertNumQueries(4):
+                response = self.user_client.get(url, {'limit': limit})
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_retrieve(self):
+        """
+        Получение рецепта: рецепт с автором, затем его представление
+        (рецепт, теги, ингредиенты) или представление из кэша.
+        """
+        url = reverse('recipes:recipes-detail', args=(self.recipe.pk,))
+        with self.assertNumQueries(4):
+            response = self.not_auth_client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(3):
+            response = self.user_client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_representation_cache_per_host(self):
+        """
+        Кэш представлений общий для пользователей, но не для хостов:
+        ссылки на картинки строятся от хоста запроса.
+        """
+        url = reverse('recipes:recipes-detail', args=(self.recipe.pk,))
+        response = self.user_client.get(url)
+        self.assertTrue(
+            response.data['image'].startswith('http://testserver/')
+        )
+        response = self.author_client.get(
+            url, HTTP_HOST='localhost', secure=True
+        )
+        self.assertTrue(
+            response.data['image'].startswith('https://localhost/')
+        )
+
+    @patch.object(RecipeViewSet, 'cache_representation', False)
+    def test_list_without_representation_cache(self):
+        """
+        Список рецептов без кэша представлений: count, рецепты с авторами,
+        теги, ингредиенты; для авторизованного - токен и подписки.
+        """
+        url = reverse('recipes:recipes-list')
+        for limit in PAGE_SIZES:
+            cache.clear()
+            with self.subTest(limit=limit), self.assertNumQueries(4):
+                response = self.not_auth_client.get(url, {'limit': limit})
+                self.assertEqual(len(response.data['results']), limit)
+            with self.subTest(limit=limit), self.assertNumQueries(6):
+                response = self.user_client.get(url, {'limit': limit})
+                self.assertEqual(len(response.data['results']), limit)
+
+    @patch.object(RecipeViewSet, 'cache_representation', False)
+    def test_retrieve_without_representation_cache(self):
+        """
+        Получение рецепта без кэша представлений.
+        """
+        url = reverse('recipes:recipes-detail', args=(self.recipe.pk,))
+        with self.assertNumQueries(3):
+            response = self.not_auth_client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(5):
+            response = self.user_client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_not_modified(self):
+        """
+        Условный запрос без изменений: 304 без сериализации, для анонима
+        из кэша ответов без запросов к БД.
+        """
+        list_url = reverse('recipes:recipes-list')
+        detail_url = reverse('recipes:recipes-detail', args=(self.recipe.pk,))
+        for client, list_queries, detail_queries in (
+            (self.not_auth_client, 0, 0),
+            (self.user_client, 3, 2),
+        ):
+            etag = client.get(list_url)['ETag']
+            with self.assertNumQueries(list_queries):
+                response = client.get(list_url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(
+                    response.status_code, status.HTTP_304_NOT_MODIFIED
+                )
+            etag = client.get(detail_url)['ETag']
+            with self.assertNumQueries(detail_queries):
+                response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(
+                    response.status_code, status.HTTP_304_NOT_MODIFIED
+                )
+
+    def test_create(self):
+        """
+        Создание рецепта (с запросами сброса кэша, обновления
+        updated_at и счётчиков в сигналах).
+        """
+        url = reverse('recipes:recipes-list')
+        with self.assertNumQueries(10):
+            response = self.author_client.post(
+                url, self.recipe_data, format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['tags']), len(self.tags))
+        self.assertEqual(
+            len(response.data['ingredients']), len(self.ingredients)
+        )
+
+    def test_update(self):
+        """
+        Изменение рецепта (с запросами сброса кэша, обновления
+        updated_at и проверки смены автора в сигналах).
+        """
+        url = reverse('recipes:recipes-detail', args=(self.recipe.pk,))
+        with self.assertNumQueries(12):
+            response = self.author_client.patch(
+                url, self.recipe_data, format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['tags']), len(self.tags))
+        self.assertEqual(
+            len(response.data['ingredients']), len(self.ingredients)
+        )
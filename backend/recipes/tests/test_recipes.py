@@ -1,13 +1,21 @@
 import json
+from io import StringIO
+from unittest.mock import patch
 
+from core.pagination import ApproximateCountDjangoPaginator, CustomPaginator
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import IntegrityError
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.routers import DefaultRouter
 from rest_framework.test import APIClient, APITestCase
+from users.models import AuthorSubscription
 
+from ..cache import LIST, get_generations, tag_generation
 from ..models import (FavoritesList, Ingredient, IngredientsInRecipe, Recipe,
                       ShoppingList, Tag)
 from ..views import RecipeViewSet
@@ -243,6 +251,98 @@ class TagsTestCase(APITestCase):
         self.assertEqual(recipe.tags.first(), self.tag1)
         self.assertEqual(recipe.tags.last(), self.tag2)
 
+    def test_create_recipe_with_missing_ingredients(self):
+        """
+        Тест на создание рецепта с несуществующими ингредиентами
+        (ошибка перечисляет их id) и тегами (стандартная ошибка поля).
+        """
+        url = reverse('recipes:recipes-list')
+        wrong_data = self.new_recipe_data
+        wrong_data['ingredients'] = [
+            {'id': self.ingredient1.id, 'amount': 5},
+            {'id': 998, 'amount': 2},
+            {'id': 999, 'amount': 2},
+        ]
+        response = self.author_client.post(url, wrong_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data['ingredients'],
+            ['Не найдены объекты с id: 998, 999.']
+        )
+        wrong_data['tags'] = [self.tag1.id, 100]
+        response = self.author_client.post(url, wrong_data, format='json')
+        self.assertEqual(
+            response.data['tags'],
+            ['Invalid pk "100" - object does not exist.']
+        )
+        wrong_data['tags'] = [self.tag1.id, 'тег']
+        response = self.author_client.post(url, wrong_data, format='json')
+        self.assertEqual(
+            response.data['tags'],
+            ['Incorrect type. Expected pk value, received str.']
+        )
+
+    def test_create_recipe_response_order(self):
+        """
+        Теги и ингредиенты в ответе на создание рецепта в том же
+        порядке, что при чтении, независимо от порядка в запросе.
+        """
+        self.new_recipe_data['tags'] = [self.tag2.id, self.tag1.id]
+        self.new_recipe_data['ingredients'].reverse()
+        response = self.author_client.post(
+            reverse('recipes:recipes-list'), self.new_recipe_data,
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [tag['id'] for tag in response.data['tags']],
+            sorted((self.tag1.id, self.tag2.id))
+        )
+        cache.clear()
+        self.assertEqual(
+            response.data,
+            self.author_client.get(
+                f'/api/recipes/{response.data["id"]}/'
+            ).data
+        )
+
+    def test_update_recipe_diff(self):
+        """
+        Тест на изменение рецепта: неизменённые строки ингредиентов
+        сохраняются, ответ совпадает с чтением рецепта.
+        """
+        ingredient3 = Ingredient.objects.create(
+            name='ingredient3', measurement_unit='г'
+        )
+        IngredientsInRecipe.objects.create(
+            recipe=self.recipe, ingredient=self.ingredient2, amount=1
+        )
+        kept = IngredientsInRecipe.objects.get(
+            recipe=self.recipe, ingredient=self.ingredient1
+        )
+        url = f'/api/recipes/{self.recipe.pk}/'
+        self.new_recipe_data['ingredients'] = [
+            {'id': ingredient3.id, 'amount': 3},
+            {'id': self.ingredient1.id, 'amount': 7},
+        ]
+        self.new_recipe_data['tags'] = [self.tag2.id]
+        response = self.author_client.patch(
+            url, self.new_recipe_data, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            dict(self.recipe.qt_ingredients.values_list('id', 'amount')
+                 .filter(ingredient=self.ingredient1)),
+            {kept.id: 7}
+        )
+        self.assertEqual(
+            set(self.recipe.ingredients.all()),
+            {self.ingredient1, ingredient3}
+        )
+        self.assertEqual(list(self.recipe.tags.all()), [self.tag2])
+        cache.clear()
+        self.assertEqual(response.data, self.author_client.get(url).data)
+
     def test_delete_recipe(self):
         """
         Тест на удаление рецепта.
@@ -267,7 +367,214 @@ class TagsTestCase(APITestCase):
         self.assertEqual(response.data.get('count'), 1)
         result = response.data.get('results')
         self.assertEqual(result[0].get('name'), self.recipe.name)
-        self.assertEqual(len(response.data), 4)
+        self.assertEqual(len(response.data), 5)
+        self.assertTrue(response.data.get('count_exact'))
+
+    def test_list_recipe_approximate_count(self):
+        """
+        Тест кэшированного приблизительного количества рецептов.
+        """
+        cache.clear()
+        url = reverse('recipes:recipes-list')
+        with patch.object(
+            ApproximateCountDjangoPaginator, 'exact_count_limit', 0
+        ):
+            response = self.user_client.get(url)
+            self.assertEqual(response.data.get('count'), 1)
+            self.assertTrue(response.data.get('count_exact'))
+            Recipe.objects.create(**{**self.recipe_data, 'name': 'рецепт'})
+            response = self.user_client.get(url)
+            # Количество из кэша, точное на момент подсчёта.
+            self.assertEqual(response.data.get('count'), 1)
+            self.assertTrue(response.data.get('count_exact'))
+            response = self.user_client.get(url, {'tags': 'tag1'})
+            self.assertTrue(response.data.get('count_exact'))
+        cache.clear()
+
+    def test_list_recipe_count_underestimated(self):
+        """
+        Тест страниц за пределами устаревшего количества рецептов:
+        последние рецепты доступны, следующая страница определяется
+        по самим строкам.
+        """
+        cache.clear()
+        url = reverse('recipes:recipes-list')
+        with patch.object(
+            ApproximateCountDjangoPaginator, 'exact_count_limit', 0
+        ):
+            self.user_client.get(url, {'limit': 1})
+            for i in range(2):
+                Recipe.objects.create(
+                    **{**self.recipe_data, 'name': f'рецепт {i}'}
+                )
+            response = self.user_client.get(url, {'limit': 1})
+            self.assertEqual(response.data['count'], 1)
+            self.assertIsNotNone(response.data['next'])
+            response = self.user_client.get(url, {'limit': 1, 'page': 3})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data['results']), 1)
+            self.assertIsNone(response.data['next'])
+            response = self.user_client.get(url, {'limit': 1, 'page': 4})
+            self.assertEqual(
+                response.status_code, status.HTTP_404_NOT_FOUND
+            )
+        cache.clear()
+
+    def test_list_recipe_cursor(self):
+        """
+        Тест keyset пагинации списка рецептов.
+        """
+        for i in range(4):
+            Recipe.objects.create(
+                **{**self.recipe_data, 'name': f'рецепт {i}'}
+            )
+        expected = list(
+            Recipe.objects
+            .order_by('-creation_date', '-id')
+            .values_list('id', flat=True)
+        )
+        url = reverse('recipes:recipes-list')
+        response = self.user_client.get(url, {'cursor': '', 'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        received = [item['id'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.user_client.get(response.data['next'])
+            received += [item['id'] for item in response.data['results']]
+        self.assertEqual(received, expected)
+        response = self.user_client.get(response.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in response.data['results']],
+            expected[2:4]
+        )
+        response = self.user_client.get(url, {'cursor': 'wrong'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_recipe_max_page_size(self):
+        """
+        Тест ограничения размера страницы.
+        """
+        url = reverse('recipes:recipes-list')
+        with patch.object(CustomPaginator, 'max_page_size', 1):
+            Recipe.objects.create(**{**self.recipe_data, 'name': 'рецепт'})
+            response = self.user_client.get(url, {'limit': 1000})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_cached_representation(self):
+        """
+        Тест совпадения кэшированного представления рецептов
+        с RecipeSerializer.
+        """
+        cache.clear()
+        FavoritesList.objects.create(user=self.user, recipe=self.recipe)
+        AuthorSubscription.objects.create(user=self.user, author=self.author)
+        list_url = reverse('recipes:recipes-list')
+        detail_url = reverse('recipes:recipes-detail', args=[self.recipe.pk])
+        for client in (
+            self.user_client, self.author_client, self.not_auth_client
+        ):
+            with patch.object(RecipeViewSet, 'cache_representation', False):
+                expected_list = client.get(list_url).content
+                expected_detail = client.get(detail_url).content
+            for _ in range(2):
+                self.assertEqual(client.get(list_url).content, expected_list)
+                self.assertEqual(
+                    client.get(detail_url).content, expected_detail
+                )
+            cache.clear()
+        data = json.loads(expected_detail)
+        self.assertFalse(data['is_favorited'])
+        data = json.loads(self.user_client.get(detail_url).content)
+        self.assertTrue(data['is_favorited'])
+        self.assertTrue(data['author']['is_subscribed'])
+        cache.clear()
+
+    def test_anonymous_cache_invalidation(self):
+        """
+        Тест сброса кэша списка и рецепта для анонимных пользователей.
+        """
+        cache.clear()
+        list_url = reverse('recipes:recipes-list')
+        detail_url = reverse('recipes:recipes-detail', args=[self.recipe.pk])
+        response = self.not_auth_client.get(list_url, {'tags': 'tag1'})
+        self.assertEqual(response.data['count'], 1)
+        self.not_auth_client.get(detail_url)
+
+        self.author_client.patch(
+            detail_url, self.new_recipe_data, format='json'
+        )
+        response = self.not_auth_client.get(list_url, {'tags': 'tag1'})
+        self.assertEqual(response.data['results'][0]['name'], 'new recipe')
+        response = self.not_auth_client.get(detail_url)
+        self.assertEqual(response.data['name'], 'new recipe')
+
+        self.recipe.tags.remove(self.tag1)
+        response = self.not_auth_client.get(list_url, {'tags': 'tag1'})
+        self.assertEqual(response.data['count'], 0)
+
+        self.tag2.name = 'renamed'
+        self.tag2.save()
+        response = self.not_auth_client.get(detail_url)
+        self.assertEqual(response.data['tags'][0]['name'], 'renamed')
+
+        self.author.first_name = 'renamed'
+        self.author.save()
+        response = self.not_auth_client.get(
+            list_url, {'author': self.author.pk}
+        )
+        self.assertEqual(
+            response.data['results'][0]['author']['first_name'], 'renamed'
+        )
+        response = self.not_auth_client.get(detail_url)
+        self.assertEqual(response.data['author']['first_name'], 'renamed')
+
+        self.recipe.delete()
+        response = self.not_auth_client.get(list_url)
+        self.assertEqual(response.data['count'], 0)
+        response = self.not_auth_client.get(detail_url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        cache.clear()
+
+    def test_conditional_get(self):
+        """
+        Тест ETag и Last-Modified рецепта: 304 без изменений и новый ETag
+        после изменения тегов, ингредиентов, справочника и флагов
+        пользователя.
+        """
+        url = reverse('recipes:recipes-detail', args=[self.recipe.pk])
+        response = self.user_client.get(url)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        self.assertTrue(response.has_header('Last-Modified'))
+        response = self.user_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        changes = (
+            lambda: self.recipe.tags.remove(self.tag1),
+            lambda: IngredientsInRecipe.objects.filter(
+                recipe=self.recipe
+            ).first().delete(),
+            lambda: Tag.objects.filter(pk=self.tag2.pk).first().save(),
+            lambda: FavoritesList.objects.create(
+                user=self.user, recipe=self.recipe
+            ),
+        )
+        for change in changes:
+            change()
+            response = self.user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+            response = self.user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(
+                response.status_code, status.HTTP_304_NOT_MODIFIED
+            )
+        response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        cache.clear()
 
     def test_retrieve_recipe(self):
         """
@@ -277,7 +584,27 @@ class TagsTestCase(APITestCase):
         response = self.user_client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['name'], self.recipe.name)
-        self.assertEqual(len(response.data), 10)
+        self.assertEqual(len(response.data), 14)
+
+    def test_list_recipe_user_flags(self):
+        """
+        Тест флагов is_favorited и is_in_shopping_cart в списке рецептов.
+        """
+        FavoritesList.objects.create(user=self.user, recipe=self.recipe)
+        ShoppingList.objects.create(user=self.user, recipe=self.recipe)
+        url = reverse('recipes:recipes-list')
+        response = self.user_client.get(url)
+        result = response.data.get('results')[0]
+        self.assertTrue(result.get('is_favorited'))
+        self.assertTrue(result.get('is_in_shopping_cart'))
+        response = self.author_client.get(url)
+        result = response.data.get('results')[0]
+        self.assertFalse(result.get('is_favorited'))
+        self.assertFalse(result.get('is_in_shopping_cart'))
+        response = self.not_auth_client.get(url)
+        result = response.data.get('results')[0]
+        self.assertFalse(result.get('is_favorited'))
+        self.assertFalse(result.get('is_in_shopping_cart'))
 
     def test_favorite_create_destroy(self):
         """
@@ -333,6 +660,109 @@ class TagsTestCase(APITestCase):
         response = self.user_client.delete(url)
         self.assertEqual(ShoppingList.objects.count(), start_count)
 
+    def test_counters(self):
+        """
+        Тест счётчиков рецептов и пользователей и их пересчёта командой.
+        """
+        cache.clear()
+        url = reverse('recipes:recipes-detail', args=[self.recipe.pk])
+        self.user_client.post(f'{url}favorite/')
+        self.user_client.post(f'{url}shopping_cart/')
+        self.author_client.post(f'{url}favorite/')
+        self.user_client.post(f'/api/users/{self.author.pk}/subscribe/')
+        response = self.not_auth_client.get(url)
+        self.assertEqual(response.data['favorites_count'], 2)
+        self.assertEqual(response.data['shopping_cart_count'], 1)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 1)
+        self.assertEqual(self.author.subscribers_count, 1)
+
+        self.recipe.author = self.user
+        self.recipe.save()
+        self.user.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 1)
+        self.assertEqual(self.author.recipes_count, 0)
+
+        self.user_client.delete(f'{url}favorite/')
+        response = self.not_auth_client.get(url)
+        self.assertEqual(response.data['favorites_count'], 1)
+        call_command('rebuild_counters', verify=True, stdout=StringIO())
+
+        Recipe.objects.update(favorites_count=5)
+        cache.clear()
+        response = self.not_auth_client.get(url)
+        self.assertEqual(response.data['favorites_count'], 5)
+        updated_at = Recipe.objects.get(pk=self.recipe.pk).updated_at
+        with self.assertRaises(CommandError):
+            call_command('rebuild_counters', verify=True, stdout=StringIO())
+        call_command('rebuild_counters', stdout=StringIO())
+        call_command('rebuild_counters', verify=True, stdout=StringIO())
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.assertGreater(self.recipe.updated_at, updated_at)
+        # Закэшированный ответ с прежним счётчиком больше не отдаётся.
+        response = self.not_auth_client.get(url)
+        self.assertEqual(response.data['favorites_count'], 1)
+        cache.clear()
+
+    def test_counters_keep_lists_cached(self):
+        """
+        Добавление в избранное не меняет `updated_at` рецепта и поколения
+        списков и тегов; счётчик в ответах и ETag всё равно новые.
+        """
+        cache.clear()
+        url = reverse('recipes:recipes-list')
+        etag = self.author_client.get(url)['ETag']
+        generations = get_generations((LIST, *(
+            tag_generation(tag.slug) for tag in self.recipe.tags.all()
+        )))
+        self.recipe.refresh_from_db()
+        updated_at = self.recipe.updated_at
+        self.user_client.post(
+            reverse('recipes:recipes-detail', args=[self.recipe.pk])
+            + 'favorite/'
+        )
+        self.assertEqual(
+            get_generations(generations.keys()), generations
+        )
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.updated_at, updated_at)
+        response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['favorites_count'], 1)
+
+    def test_author_save_keeps_recipes(self):
+        """
+        save() автора без изменения полей из представления (например,
+        смена пароля) не меняет `updated_at` его рецептов.
+        """
+        self.recipe.refresh_from_db()
+        updated_at = self.recipe.updated_at
+        author = User.objects.get(pk=self.recipe.author_id)
+        author.set_password('newpassword')
+        author.save()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.updated_at, updated_at)
+        author.first_name = 'Новое имя'
+        author.save()
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, updated_at)
+
+    def test_list_recipe_ordering(self):
+        """
+        Тест сортировки списка рецептов по счётчику избранного.
+        """
+        popular = Recipe.objects.create(
+            **dict(self.recipe_data, name='popular')
+        )
+        FavoritesList.objects.create(user=self.user, recipe=popular)
+        url = reverse('recipes:recipes-list')
+        response = self.user_client.get(url, {'ordering': '-favorites_count'})
+        self.assertEqual(response.data['results'][0]['id'], popular.pk)
+        response = self.user_client.get(url, {'ordering': 'favorites_count'})
+        self.assertEqual(response.data['results'][-1]['id'], popular.pk)
+
     def test_shopping_cart_get_file(self):
         """
         Тест на получение списка покупок.
@@ -0,0 +1,130 @@
+from io import BytesIO, StringIO
+
+from core.serializers import CroppedRecipeSerializer
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import Recipe
+from ..renditions import FORMATS, rendition_name, update_renditions
+
+User = get_user_model()
+
+# Тег EXIF Orientation: картинку нужно повернуть на 90° по часовой.
+ORIENTATION = 0x0112
+
+
+def make_photo(size=(800, 600)) -> bytes:
+    """JPEG с EXIF: поворот и модель камеры."""
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    exif[0x0110] = 'camera'
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 80, 40)).save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class RecipeRenditionsTestCase(APITestCase):
+    """Уменьшенные копии картинки рецепта и srcset в ответах API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='renditionsauthor', email='renditionsauthor@test.com',
+            password='testpassword'
+        )
+
+    def create_recipe(self, size=(800, 600)) -> Recipe:
+        recipe = Recipe(
+            name='рецепт', author=self.author, text='текст', cooking_time=1
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.image.save('photo.jpg', ContentFile(make_photo(size)))
+        recipe.refresh_from_db()
+        return recipe
+
+    def test_renditions(self):
+        with self.settings(RECIPES_IMAGE_WIDTHS=[320, 640, 1280]):
+            recipe = self.create_recipe()
+        image_name = recipe.image.name
+        # После поворота ширина картинки - 600, копий шире неё нет.
+        self.assertEqual(
+            recipe.renditions, {'image': image_name, 'widths': [320]}
+        )
+        storage = recipe.image.storage
+        for image_format in FORMATS:
+            name = rendition_name(image_name, 320, image_format)
+            with storage.open(name) as file, Image.open(file) as image:
+                self.assertEqual(image.size, (320, 427))
+                self.assertFalse(image.getexif())
+
+        response = self.client.get(
+            reverse('recipes:recipes-detail', args=(recipe.pk,))
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        srcset = response.data['srcset']
+        self.assertEqual(set(srcset), set(FORMATS))
+        self.assertRegex(srcset['webp'], r'^http://testserver/media/.+ 320w$')
+        self.assertEqual(
+            CroppedRecipeSerializer(
+                recipe, context={'request': response.wsgi_request}
+            ).data['srcset'],
+            srcset
+        )
+
+        # Новая картинка. Копии прежней остаются: в хранилище
+        # по содержимому её файл может принадлежать другим рецептам.
+        old_name = rendition_name(image_name, 320, 'webp')
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.image.save('photo.jpg', ContentFile(make_photo((900, 600))))
+        recipe.refresh_from_db()
+        self.assertNotEqual(recipe.image.name, image_name)
+        self.assertEqual(recipe.renditions['image'], recipe.image.name)
+        self.assertTrue(storage.exists(old_name))
+
+    def test_no_renditions(self):
+        recipe = Recipe.objects.create(
+            name='без картинки', author=self.author, text='текст',
+            cooking_time=1, image='missing.png'
+        )
+        response = self.client.get(
+            reverse('recipes:recipes-detail', args=(recipe.pk,))
+        )
+        self.assertEqual(response.data['srcset'], {})
+
+    def test_update_renditions(self):
+        """Копии меняют `updated_at` и сбрасывают кэш ответа рецепта."""
+        with self.settings(RECIPES_IMAGE_RENDITIONS=0):
+            recipe = self.create_recipe((500, 400))
+        url = reverse('recipes:recipes-detail', args=(recipe.pk,))
+        self.assertEqual(self.client.get(url).data['srcset'], {})
+        updated_at = recipe.updated_at
+        self.assertTrue(update_renditions(recipe))
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, updated_at)
+        srcset = self.client.get(url).data['srcset']
+        self.assertEqual(set(srcset), set(FORMATS))
+
+    def test_regenerate_command(self):
+        with self.settings(RECIPES_IMAGE_RENDITIONS=0):
+            recipe = self.create_recipe((700, 500))
+        self.assertEqual(recipe.renditions, {})
+        url = reverse('recipes:recipes-detail', args=(recipe.pk,))
+        self.assertEqual(self.client.get(url).data['srcset'], {})
+        updated_at = recipe.updated_at
+        with self.settings(RECIPES_IMAGE_WIDTHS=[100, 200]):
+            call_command(
+                'regenerate_renditions', '--workers', '1', stdout=StringIO()
+            )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.renditions['widths'], [100, 200])
+        self.assertGreater(recipe.updated_at, updated_at)
+        srcset = self.client.get(url).data['srcset']
+        self.assertEqual(set(srcset), set(FORMATS))
+        self.assertTrue(recipe.image.storage.exists(
+            rendition_name(recipe.image.name, 200, 'jpeg')
+        ))
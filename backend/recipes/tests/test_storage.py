@@ -0,0 +1,205 @@
+import os
+from io import BytesIO, StringIO
+from time import time
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import Recipe
+from ..renditions import rendition_name
+
+User = get_user_model()
+
+
+def make_image(color) -> bytes:
+    buffer = BytesIO()
+    Image.new('RGB', (40, 30), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class ContentAddressedStorageTestCase(APITestCase):
+    """Картинки рецептов хранятся под именами по содержимому."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='storageauthor', email='storageauthor@test.com',
+            password='testpassword'
+        )
+        cls.storage = Recipe._meta.get_field('image').storage
+
+    def create_recipe(self, name: str, image: str = '') -> Recipe:
+        return Recipe.objects.create(
+            name=name, author=self.author, text='текст', cooking_time=1,
+            image=image
+        )
+
+    def write_file(self, name: str, content: bytes) -> None:
+        """Файл под заданным именем, как до хранилища по содержимому."""
+        path = self.storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+
+    def test_deduplication(self):
+        content = make_image((10, 20, 30))
+        first = self.create_recipe('первый')
+        first.image.save('a.png', ContentFile(content))
+        second = self.create_recipe('второй')
+        second.image.save('b.png', ContentFile(content))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(self.storage.is_hashed(first.image.name))
+        self.assertRegex(
+            first.image.name,
+            r'^recipe_images/(\w{2})/(\w{2})/\1\2[0-9a-f]{60}\.png$'
+        )
+        self.assertEqual(
+            self.storage.listdir(os.path.dirname(first.image.name))[1],
+            [os.path.basename(first.image.name)]
+        )
+
+        self.client.force_authenticate(self.author)
+        response = self.client.put(
+            reverse('recipes:recipes-image', args=(second.pk,)),
+            make_image((30, 20, 10)), content_type='image/png'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        second.refresh_from_db()
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertTrue(response.data['image'].endswith(
+            f'/media/{second.image.name}'
+        ))
+        self.assertTrue(self.storage.exists(first.image.name))
+
+    def test_rehash_command(self):
+        content = make_image((40, 50, 60))
+        self.write_file('recipe_images/old1.png', content)
+        self.write_file('recipe_images/old2.png', content)
+        self.write_file(rendition_name('recipe_images/old1.png', 40, 'webp'),
+                        b'webp')
+        self.write_file(rendition_name('recipe_images/old1.png', 40, 'jpeg'),
+                        b'jpeg')
+        first = self.create_recipe('первый', 'recipe_images/old1.png')
+        Recipe.objects.filter(pk=first.pk).update(
+            renditions={'image': 'recipe_images/old1.png', 'widths': [40]},
+            placeholder={
+                'image': 'recipe_images/old1.png', 'width': 40, 'height': 30,
+                'color': '#28323c', 'blurhash': '', 'thumbnail': '',
+            },
+        )
+        second = self.create_recipe('второй', 'recipe_images/old2.png')
+        missing = self.create_recipe('третий', 'recipe_images/missing.png')
+        other = self.create_recipe('четвёртый', 'other.png')
+
+        url = reverse('recipes:recipes-detail', args=(first.pk,))
+        self.assertTrue(self.client.get(url).data['image'].endswith(
+            '/media/recipe_images/old1.png'
+        ))
+        tags_url = reverse('recipes:tags-list')
+        tags_etag = self.client.get(tags_url)['ETag']
+        call_command('rehash_images', stdout=StringIO())
+        for recipe in (first, second, missing, other):
+            recipe.refresh_from_db()
+        # Сбрасывается кэш переименованных рецептов, но не справочников.
+        self.assertTrue(self.client.get(url).data['image'].endswith(
+            f'/media/{first.image.name}'
+        ))
+        self.assertEqual(self.client.get(tags_url)['ETag'], tags_etag)
+        self.assertTrue(self.storage.is_hashed(first.image.name))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(
+            first.renditions, {'image': first.image.name, 'widths': [40]}
+        )
+        self.assertEqual(first.placeholder['image'], first.image.name)
+        self.assertTrue(self.storage.exists(
+            rendition_name(first.image.name, 40, 'webp')
+        ))
+        with self.storage.open(first.image.name) as file:
+            self.assertEqual(file.read(), content)
+        for name in ('recipe_images/old1.png', 'recipe_images/old2.png',
+                     rendition_name('recipe_images/old1.png', 40, 'webp')):
+            self.assertFalse(self.storage.exists(name))
+        self.assertEqual(missing.image.name, 'recipe_images/missing.png')
+        self.assertEqual(other.image.name, 'other.png')
+
+    def test_prune_command(self):
+        used = self.create_recipe('первый')
+        used.image.save('a.png', ContentFile(make_image((1, 2, 3))))
+        unused = self.storage.save(
+            'recipe_images/b.png', ContentFile(make_image((3, 2, 1)))
+        )
+        for name in (used.image.name, unused):
+            self.write_file(rendition_name(name, 40, 'webp'), b'webp')
+        fresh = self.storage.save(
+            'recipe_images/c.png', ContentFile(make_image((2, 2, 2)))
+        )
+
+        call_command('prune_images', '--min-age', '60', stdout=StringIO())
+        self.assertTrue(self.storage.exists(unused))
+        old = time() - 120
+        for name in (
+            used.image.name, unused,
+            os.path.dirname(rendition_name(unused, 40, 'webp')),
+        ):
+            os.utime(self.storage.path(name), (old, old))
+        call_command('prune_images', '--min-age', '60', '--dry-run',
+                     stdout=StringIO())
+        self.assertTrue(self.storage.exists(unused))
+
+        call_command('prune_images', '--min-age', '60', stdout=StringIO())
+        self.assertTrue(self.storage.exists(used.image.name))
+        self.assertTrue(self.storage.exists(
+            rendition_name(used.image.name, 40, 'webp')
+        ))
+        self.assertTrue(self.storage.exists(fresh))
+        self.assertFalse(self.storage.exists(unused))
+        self.assertFalse(self.storage.exists(
+            os.path.dirname(rendition_name(unused, 40, 'webp'))
+        ))
+
+    def test_prune_after_force_regenerate(self):
+        """
+        regenerate_renditions --force не удаляет копии прежней картинки
+        в общем хранилище, их удаляет prune_images.
+        """
+        recipe = self.create_recipe('рецепт')
+        recipe.image.save('a.png', ContentFile(make_image((1, 2, 3))))
+        call_command(
+            'regenerate_renditions', '--workers', '1', stdout=StringIO()
+        )
+        old_name = recipe.image.name
+        old_renditions = os.path.dirname(rendition_name(old_name, 40, 'webp'))
+        self.assertTrue(self.storage.exists(old_renditions))
+        new_name = self.storage.save(
+            'recipe_images/b.png', ContentFile(make_image((3, 2, 1)))
+        )
+        Recipe.objects.filter(pk=recipe.pk).update(image=new_name)
+        call_command(
+            'regenerate_renditions', '--force', '--workers', '1',
+            stdout=StringIO()
+        )
+        self.assertTrue(self.storage.exists(old_renditions))
+        old = time() - 120
+        for name in (old_name, old_renditions):
+            os.utime(self.storage.path(name), (old, old))
+
+        call_command('prune_images', '--min-age', '60', stdout=StringIO())
+        self.assertFalse(self.storage.exists(old_name))
+        self.assertFalse(self.storage.exists(old_renditions))
+        self.assertTrue(self.storage.exists(
+            rendition_name(new_name, 40, 'webp')
+        ))
+
+    def test_save_existing_refreshes_time(self):
+        """Повторное сохранение того же файла защищает его от удаления."""
+        content = make_image((5, 5, 5))
+        name = self.storage.save('recipe_images/a.png', ContentFile(content))
+        old = time() - 120
+        os.utime(self.storage.path(name), (old, old))
+        self.storage.save('recipe_images/b.png', ContentFile(content))
+        self.assertGreater(os.path.getmtime(self.storage.path(name)), old)
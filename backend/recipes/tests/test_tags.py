@@ -1,3 +1,5 @@
+import gzip
+
 from django.contrib.auth import get_user_model
 from django.db.utils import IntegrityError
 from django.urls import reverse
@@ -49,10 +51,46 @@ class TagsTestCase(APITestCase):
         url = reverse('recipes:tags-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        result = response.data
+        result = response.json()
         self.assertEqual(result[0].get('name'), self.tag1.name)
         self.assertEqual(result[1].get('name'), self.tag2.name)
 
+    def test_list_tags_not_modified(self):
+        """
+        Тест условного запроса списка тегов по версии справочника.
+        """
+        url = reverse('recipes:tags-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.tag1.name = 'renamed'
+        self.tag1.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_tags_precomputed(self):
+        """
+        Тест готового ответа со всеми тегами: сериализуется один раз
+        на версию справочников, отдаётся и сжатым.
+        """
+        url = reverse('recipes:tags-list')
+        expected = self.client.get(url).content
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.content, expected)
+        self.assertIn('max-age=', response['Cache-Control'])
+        compressed = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), expected)
+        self.assertNotEqual(compressed['ETag'], response['ETag'])
+        self.tag2.delete()
+        response = self.client.get(url)
+        self.assertEqual(
+            [tag['slug'] for tag in response.json()], [self.tag1.slug]
+        )
+
     def test_retrieve_tag(self):
         """
         Тест получения тега по id.
@@ -1,26 +1,137 @@
+import gzip
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
 import weasyprint
-from core.pagination import CustomPaginator
+from core.mixins import CompiledSerializerMixin, ConditionalGetMixin, Version
+from core.pagination import ApproximateCountPaginator
+from core.parsers import ImageUploadParser, NDJSONParser
 from core.permissions import IsAdmin, IsOwner, ReadOnly
 from core.serializers import CroppedRecipeSerializer
 from django.conf import settings
-from django.db.models import Prefetch, Sum
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Sum
 from django.db.models.query import QuerySet
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.template.loader import get_template
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from .autocomplete import ingredient_index
+from .bulk import RecipeBulkCreator
+from .cache import (CATALOG, cache_anonymous_response, catalog_key,
+                    detail_cache_key, get_versions, list_cache_key,
+                    user_version)
+from .database_json import database_json_supported
 from .filters import IngredientFilter, RecipeFilter
+from .images import LimitedUploadHandler
 from .models import FavoritesList, Ingredient, Recipe, ShoppingList, Tag
-from .serializers import (IngredientSerializer, RecipeCreateSerializer,
+from .serializers import (CachedRecipeSerializer, CompiledIngredientSerializer,
+                          CompiledRecipeSerializer, CompiledTagSerializer,
+                          DatabaseJSONRecipeSerializer, IngredientSerializer,
+                          RecipeCreateSerializer, RecipeImageSerializer,
                           RecipeSerializer, TagSerializer)
 
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+def as_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
 
-class TagViewSet(ReadOnlyModelViewSet):
+class CatalogViewSet(CompiledSerializerMixin,
+                     ConditionalGetMixin,
+                     ReadOnlyModelViewSet):
+    """
+    Базовый класс справочников: ETag и Last-Modified ответов
+    определяются версией справочников, поэтому на условный запрос
+    списка 304 возвращается без запросов к БД.
+
+    Если включено CATALOG_PRECOMPUTED, список без параметров
+    сериализуется один раз на версию справочников: готовые байты
+    (и их gzip при CATALOG_GZIP) хранятся в кэше и отдаются
+    с Cache-Control: public, max-age=CATALOG_MAX_AGE.
+    """
+    precomputed_list = settings.CATALOG_PRECOMPUTED
+
+    def get_catalog_version(self, *args) -> Version:
+        version = get_versions((CATALOG,))[CATALOG]
+        return version, as_datetime(version)
+
+    get_list_version = get_object_version = get_catalog_version
+
+    def use_precomputed_list(self, request: Request) -> bool:
+        return bool(
+            self.precomputed_list
+            and not request.query_params
+            and request.accepted_renderer.format != 'api'
+        )
+
+    def get_precomputed_list(self,
+                             request: Request,
+                             version: float) -> Tuple[bytes, Optional[bytes]]:
+        """Готовый ответ со всем справочником и его gzip (или None)."""
+        key = catalog_key(request, self.basename, version)
+        content = cache.get(key)
+        if content is None:
+            serializer = self.get_serializer(self.get_queryset(), many=True)
+            raw = request.accepted_renderer.render(
+                serializer.data,
+                request.accepted_media_type,
+                self.get_renderer_context()
+            )
+            compressed = None
+            if settings.CATALOG_GZIP:
+                compressed = gzip.compress(raw, mtime=0)
+            content = raw, compressed
+            cache.set(key, content, settings.CATALOG_MAX_AGE)
+        return content
+
+    def list(self, request: Request, *args, **kwargs):
+        if not self.use_precomputed_list(request):
+            return super().list(request, *args, **kwargs)
+        version, last_modified = self.get_list_version(None)
+        compress = bool(
+            settings.CATALOG_GZIP
+            and ACCEPTS_GZIP.search(
+                request.META.get('HTTP_ACCEPT_ENCODING', '')
+            )
+        )
+        etag = self.make_etag(request, version, compress)
+        not_modified = self.get_not_modified(request, etag, last_modified)
+        if not_modified is None:
+            raw, compressed = self.get_precomputed_list(request, version)
+            renderer = request.accepted_renderer
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type = f'{content_type}; charset={renderer.charset}'
+            response = HttpResponse(
+                compressed if compress else raw, content_type=content_type
+            )
+            if compress:
+                response['Content-Encoding'] = 'gzip'
+        else:
+            response = not_modified
+        patch_vary_headers(response, ('Accept-Encoding',))
+        patch_cache_control(
+            response, public=True, max_age=settings.CATALOG_MAX_AGE
+        )
+        return self.set_validators(response, etag, last_modified)
+
+
+class TagViewSet(CatalogViewSet):
     """
     Теги:
     - `GET` список тегов
@@ -30,24 +141,49 @@ class TagViewSet(ReadOnlyModelViewSet):
     """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    compiled_serializer_class = CompiledTagSerializer
     permission_classes = (IsAdmin | ReadOnly,)
     pagination_class = None
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogViewSet):
     """
     Ингредиенты:
     - `GET` cписок ингредиентов с возможностью поиска по имени
     - `GET` получение ингредиента
+
+    Если включено INGREDIENTS_AUTOCOMPLETE, поиск по имени идёт
+    по индексу в памяти процесса (recipes.autocomplete) без запросов
+    к БД, с учётом опечаток и частоты использования ингредиентов.
     """
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    compiled_serializer_class = CompiledIngredientSerializer
     permission_classes = (IsAdmin | ReadOnly,)
     filterset_class = IngredientFilter
     pagination_class = None
+    autocomplete = settings.INGREDIENTS_AUTOCOMPLETE
 
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get('name')
+        if not (query and self.autocomplete):
+            return super().list(request, *args, **kwargs)
+        # Порядок результатов зависит от частоты использования
+        # ингредиентов, поэтому валидаторы учитывают и время построения
+        # индекса, а не только версию справочников.
+        index = ingredient_index.get()
+        version, last_modified = self.get_list_version(None)
+        etag = self.make_etag(request, version, index.built_at)
+        last_modified = max(last_modified, as_datetime(index.built_at))
+        not_modified = self.get_not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        data = index.search(query, settings.INGREDIENTS_SEARCH_LIMIT)
+        return self.set_validators(Response(data), etag, last_modified)
 
-class RecipeViewSet(ModelViewSet):
+
+class RecipeViewSet(CompiledSerializerMixin, ConditionalGetMixin,
+                    ModelViewSet):
     """
     Рецепты:
     - `GET` cписок рецептов (страница доступна всем пользователям.
@@ -56,18 +192,216 @@ class RecipeViewSet(ModelViewSet):
     - `GET` получение рецепта
     - `PATCH` oбновление рецепта (доступно только автору данного рецепта)
     - `DELETE` удаление рецепта (доступно только автору данного рецепта)
+    - `POST` `bulk/` массовое создание рецептов
+    - `PUT` `{id}/image/` замена изображения файлом (multipart или тело
+    запроса), без Base64
+
+    Список и рецепт для анонимных пользователей кэшируются.
+    Если включено RECIPES_CACHE_REPRESENTATION, кэшируется общее
+    представление каждого рецепта, а флаги пользователя подставляются
+    при ответе.
+    Список постраничный (`page`, `limit`), `count_exact` показывает,
+    точное ли количество `count`; с параметром `cursor` - keyset пагинация
+    по (`creation_date`, `id`).
+    Сортировка параметром `ordering` по дате создания и счётчикам
+    добавлений в избранное и в список покупок (кроме keyset пагинации).
+    Список и рецепт отдаются с ETag и Last-Modified, на условный
+    запрос без изменений отвечает 304.
+    Для чтения используется CompiledRecipeSerializer, если включено
+    COMPILED_SERIALIZERS.
+    На PostgreSQL при включенном RECIPES_DATABASE_JSON JSON рецептов
+    вместе с флагами пользователя строит БД (DatabaseJSONRecipeSerializer),
+    это имеет приоритет над кэшем представлений.
     """
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
+    compiled_serializer_class = CompiledRecipeSerializer
     permission_classes = (IsOwner | IsAdmin | ReadOnly,)
     filterset_class = RecipeFilter
-    pagination_class = CustomPaginator
+    filter_backends = (DjangoFilterBackend, OrderingFilter)
+    ordering_fields = (
+        'creation_date', 'favorites_count', 'shopping_cart_count'
+    )
+    pagination_class = ApproximateCountPaginator
+    cursor_ordering = ('-creation_date', '-id')
+    cache_representation = settings.RECIPES_CACHE_REPRESENTATION
+    database_json = settings.RECIPES_DATABASE_JSON
+
+    def initialize_request(self, request: HttpRequest, *args, **kwargs):
+        """
+        Загружаемые файлы пишутся во временный файл по частям
+        с ограничением размера (LimitedUploadHandler).
+        """
+        request.upload_handlers = [LimitedUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def get_queryset(self) -> QuerySet:
+        """
+        При кэшировании представлений или построении JSON в БД
+        для просмотра загружает только ключи и счётчики рецептов,
+        остальное берёт CachedRecipeSerializer
+        или DatabaseJSONRecipeSerializer.
+        Иначе для просмотра подгружает автора, теги и ингредиенты
+        с количеством.
+        Для авторизованного пользователя аннотирует рецепты флагами
+        наличия в избранном и в списке покупок коррелированными
+        подзапросами, чтобы сериализатор не делал запросов на каждый рецепт.
+        """
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve') and (
+            self.cache_representation or self.use_database_json()
+        ):
+            return (
+                queryset
+                .select_related('author')
+                .only(
+                    'id', 'author', 'creation_date', 'updated_at',
+                    *Recipe.counter_fields
+                )
+            )
+        if self.action in ('list', 'retrieve'):
+            queryset = (
+                queryset
+                .select_related(*RecipeSerializer.select_related_fields)
+                .prefetch_related(*RecipeSerializer.prefetch_related_fields)
+            )
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset
+        return queryset.annotate(
+            favorited=Exists(
+                FavoritesList.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            in_shopping_cart=Exists(
+                ShoppingList.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+        )
+
+    def use_database_json(self) -> bool:
+        return bool(self.database_json and database_json_supported())
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
+            if self.use_database_json():
+                return DatabaseJSONRecipeSerializer
+            if self.cache_representation:
+                return CachedRecipeSerializer
+            if self.use_compiled_serializer():
+                return self.compiled_serializer_class
             return RecipeSerializer
         return RecipeCreateSerializer
 
+    def get_recipes_version(self, recipes: List[Recipe]) -> Version:
+        """
+        Ответ зависит от рецептов (`updated_at` меняется и при изменении
+        их тегов, ингредиентов и автора, счётчики - без него),
+        от справочников и, для авторизованного пользователя,
+        от его избранного, списка покупок и подписок.
+        """
+        names = [CATALOG]
+        user = self.request.user
+        if user.is_authenticated:
+            names.append(user_version(user.pk))
+        versions = get_versions(names)
+        stamps = [
+            (recipe.pk, recipe.updated_at,
+             *(getattr(recipe, field) for field in Recipe.counter_fields))
+            for recipe in recipes
+        ]
+        last_modified = max(
+            *map(as_datetime, versions.values()),
+            *(recipe.updated_at for recipe in recipes),
+            as_datetime(0),
+        )
+        return (user.pk, sorted(versions.items()), stamps), last_modified
+
+    def get_list_version(self, objects) -> Version:
+        return self.get_recipes_version(list(objects))
+
+    def get_object_version(self, obj: Recipe) -> Version:
+        return self.get_recipes_version([obj])
+
+    @cache_anonymous_response(list_cache_key)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_anonymous_response(detail_cache_key)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=True, methods=('put',),
+            parser_classes=(ImageUploadParser, MultiPartParser))
+    def image(self, request: Request, pk: str = None):
+        """
+        Замена изображения рецепта без Base64: файл в теле запроса
+        (`Content-Type: image/*`) или поле `image` формы multipart.
+        """
+        recipe = self.get_object()
+        # ImageUploadParser кладёт файл в `file`, форма - в `image`.
+        image = request.data.get('file', request.data.get('image'))
+        serializer = RecipeImageSerializer(
+            recipe, data={'image': image},
+            context=self.get_serializer_context()
+        )
+        try:
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        finally:
+            # Файл из тела запроса Django сам не закрывает
+            # (он не попадает в request.FILES), временный файл
+            # удаляется при закрытии.
+            if hasattr(image, 'close'):
+                image.close()
+        return Response(serializer.data)
+
+    def check_items_count(self, count: int) -> None:
+        """
+        Не больше RECIPES_BULK_MAX_ITEMS рецептов за запрос. NDJSONParser
+        проверяет это по мере чтения тела.
+        """
+        limit = settings.RECIPES_BULK_MAX_ITEMS
+        if count > limit:
+            raise ValidationError({'non_field_errors': [
+                f'Не больше {limit} рецептов за запрос.'
+            ]})
+
+    @action(detail=False, methods=('post',),
+            parser_classes=(JSONParser, NDJSONParser))
+    def bulk(self, request: Request):
+        """
+        Массовое создание рецептов из JSON-массива или NDJSON
+        (`Content-Type: application/x-ndjson`), не больше
+        RECIPES_BULK_MAX_ITEMS за запрос. Ошибка в одном рецепте
+        не отменяет создание остальных: в ответе результат для каждого
+        рецепта, статус 201, если созданы все, иначе 207.
+        Уменьшенные копии и заглушки картинок созданных рецептов делают
+        команды regenerate_renditions и backfill_placeholders.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError(
+                {'non_field_errors': ['Ожидается непустой список рецептов.']}
+            )
+        self.check_items_count(len(items))
+        results = RecipeBulkCreator(
+            items, self.get_serializer_context(),
+            settings.RECIPES_BULK_CHUNK_SIZE
+        ).run()
+        created = sum(
+            result['status'] == status.HTTP_201_CREATED for result in results
+        )
+        return Response(
+            {
+                'created': created,
+                'failed': len(results) - created,
+                'results': results,
+            },
+            status=(
+                status.HTTP_201_CREATED if created == len(results)
+                else status.HTTP_207_MULTI_STATUS
+            )
+        )
+
     @action(detail=True, methods=('post', 'delete'),
             permission_classes=(IsAuthenticated,))
     def favorite(self, request: HttpRequest, pk: str = None):
@@ -80,6 +414,7 @@ class RecipeViewSet(ModelViewSet):
         method = 'shopping_cart'
         return self.__del_add(ShoppingList, request, pk, method)
 
+    @transaction.atomic
     def __del_add(self,
                   model: QuerySet,
                   request: HttpRequest,
@@ -87,7 +422,8 @@ class RecipeViewSet(ModelViewSet):
                   method: str):
         """
         Общий метод удаления и добавления записи в модели
-        FavoritesList и ShoppingList.
+        FavoritesList и ShoppingList. Счётчики рецепта обновляются
+        в той же транзакции.
         """
         answer_text = {
             'favorite': {
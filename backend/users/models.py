@@ -1,10 +1,10 @@
-from core.models import CreationDate
+from core.models import CountersMixin, CreationDate
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 
-class User(AbstractUser):
+class User(CountersMixin, AbstractUser):
     class Role(models.TextChoices):
         ADMIN = 'admin', _('Администратор')
         USER = 'user', _('Авторизованный пользователь')
@@ -24,6 +24,18 @@ class User(AbstractUser):
         verbose_name=_('False, если user блокирован'),
         default=True
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name=_('Количество рецептов'),
+        default=0,
+        editable=False,
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name=_('Количество подписчиков'),
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('recipes_count', 'subscribers_count')
 
     class Meta:
         verbose_name = 'Пользователь'
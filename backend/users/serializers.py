@@ -1,9 +1,11 @@
-from typing import Any, Dict, List, OrderedDict
+from typing import Any, Dict, Iterable, List, OrderedDict, Set
 
+from core.compiled import CompiledSerializer, Method
 from core.serializers import CroppedRecipeSerializer
 from core.validators import field_validator
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from rest_framework.request import Request
 from rest_framework.serializers import (CharField, ModelSerializer,
                                         ReadOnlyField, Serializer,
                                         SerializerMethodField, ValidationError)
@@ -11,6 +13,33 @@ from rest_framework.serializers import (CharField, ModelSerializer,
 User = get_user_model()
 
 
+def get_subscribed_authors(request: Request) -> Set[int]:
+    """
+    Возвращает множество id авторов, на которых подписан текущий
+    пользователь. Загружается одним запросом и запоминается на время
+    обработки запроса.
+    """
+    subscribed = getattr(request, '_subscribed_authors', None)
+    if subscribed is None:
+        user = request.user
+        subscribed = set()
+        if user.is_authenticated:
+            subscribed = set(
+                user.subscriptions.values_list('author_id', flat=True)
+            )
+        request._subscribed_authors = subscribed
+    return subscribed
+
+
+def remember_subscribed_authors(request: Request,
+                                author_ids: Iterable[int]) -> None:
+    """
+    Запоминает подписки текущего пользователя, загруженные вместе
+    с другими данными, чтобы get_subscribed_authors не делал запрос.
+    """
+    request._subscribed_authors = set(author_ids)
+
+
 class UserSerializer(ModelSerializer):
     """
     Сериализатор для работы с моделью User.
@@ -45,12 +74,36 @@ class UserSerializer(ModelSerializer):
         """
         Возвращает `bool` результат  подписки пользователя на автора.
         """
-        user = self.context.get('view').request.user
+        request = self.context.get('view').request
+        user = request.user
 
         if not user.is_authenticated or (user == obj):
             return False
 
-        return user.subscriptions.filter(author=obj).exists()
+        return obj.pk in get_subscribed_authors(request)
+
+
+class CompiledUserSerializer(CompiledSerializer):
+    """
+    Скомпилированный UserSerializer для чтения, вывод совпадает.
+    """
+    compiled_fields = {
+        'email': 'email',
+        'id': 'id',
+        'username': 'username',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'password': 'password',
+        'is_subscribed': Method(),
+    }
+
+    @staticmethod
+    def get_is_subscribed(obj: User, context: Dict) -> bool:
+        request = context['request']
+        user = request.user
+        if not user.is_authenticated or user.pk == obj.pk:
+            return False
+        return obj.pk in get_subscribed_authors(request)
 
 
 class SetPasswordSerializer(Serializer):
@@ -98,7 +151,8 @@ class SubscriptionsSerializer(Serializer):
     last_name = ReadOnlyField()
     is_subscribed = SerializerMethodField()
     recipes = SerializerMethodField()
-    recipes_count = SerializerMethodField()
+    recipes_count = ReadOnlyField()
+    subscribers_count = ReadOnlyField()
 
     class Meta:
         model = User
@@ -110,15 +164,15 @@ class SubscriptionsSerializer(Serializer):
             'last_name',
             'is_subscribed',
             'recipes',
-            'recipes_count'
+            'recipes_count',
+            'subscribers_count',
         )
 
     def get_is_subscribed(self, obj: User) -> bool:
         """
         Проверка подписки пользователей.
         """
-        user = self.context['request'].user
-        return user.subscriptions.filter(author=obj).exists()
+        return obj.pk in get_subscribed_authors(self.context['request'])
 
     def get_recipes(self, obj: User) -> List[Dict[str, Any]]:
         """
@@ -130,9 +184,3 @@ class SubscriptionsSerializer(Serializer):
         if limit:
             queryset = queryset[:int(limit)]
         return CroppedRecipeSerializer(queryset, many=True).data
-
-    def get_recipes_count(self, obj: User) -> int:
-        """
-        Возвращает количество рецептов у автора.
-        """
-        return obj.recipes.count()
@@ -158,7 +158,7 @@ class UserViewSetTestCase(TestCase):
         )
         self.assertEquals(AuthorSubscription.objects.count(), 1)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertEqual(len(response.data), 8)
+        self.assertEqual(len(response.data), 9)
         self.assertEqual(response.data['id'], id)
 
         response = self.client.delete(
@@ -200,3 +200,39 @@ class UserViewSetTestCase(TestCase):
             f'/api/users/{id}/subscribe/'
         )
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_is_subscribed(self):
+        """
+        Проверка is_subscribed в списке пользователей и в подписках.
+        """
+        authors = [
+            User.objects.create_user(
+                username=f'testauthor{i}',
+                email=f'testauthor{i}@test.com',
+                password='authorpassword'
+            )
+            for i in range(3)
+        ]
+        for author in authors[:2]:
+            AuthorSubscription.objects.create(user=self.user, author=author)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/users/', {'limit': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        subscribed = {
+            item['id']: item['is_subscribed']
+            for item in response.data['results']
+        }
+        self.assertEqual(
+            subscribed,
+            {
+                self.user.id: False,
+                authors[0].id: True,
+                authors[1].id: True,
+                authors[2].id: False,
+            }
+        )
+        response = self.client.get('/api/users/subscriptions/')
+        self.assertEqual(response.data['count'], 2)
+        self.assertTrue(
+            all(item['is_subscribed'] for item in response.data['results'])
+        )
@@ -1,21 +1,25 @@
-from core.pagination import CustomPaginator
+from core.mixins import CompiledSerializerMixin
+from core.pagination import CursorOrPageNumberPaginator
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import DjangoModelPermissions, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.serializers import Serializer
 
 from .models import AuthorSubscription
-from .serializers import SetPasswordSerializer, SubscriptionsSerializer
+from .serializers import (CompiledUserSerializer, SetPasswordSerializer,
+                          SubscriptionsSerializer, get_subscribed_authors)
 
 User = get_user_model()
 
 
-class UserViewSet(UserViewSet):
+class UserViewSet(CompiledSerializerMixin, UserViewSet):
     """
     Пользователи:
     - `GET`: cписок пользователей
@@ -26,9 +30,20 @@ class UserViewSet(UserViewSet):
     - `GET`/subscriptions/: мои подписки (в выдачу добавляются рецепты)
     - `POST`/subscribe/: подписаться на пользователя
     - `DELETE`/subscribe/: подписаться на пользователя
+
+    Списки постраничные (`page`, `limit`); с параметром `cursor`
+    - keyset пагинация по `id`. Без `cursor` списки сортируются
+    параметром `ordering` по `id`, количеству рецептов и подписчиков.
+    Для чтения используется CompiledUserSerializer, если включено
+    COMPILED_SERIALIZERS.
     """
     permission_classes = (DjangoModelPermissions,)
-    pagination_class = CustomPaginator
+    compiled_serializer_class = CompiledUserSerializer
+    compiled_actions = ('list', 'retrieve', 'me')
+    filter_backends = (OrderingFilter,)
+    ordering_fields = ('id', 'recipes_count', 'subscribers_count')
+    pagination_class = CursorOrPageNumberPaginator
+    cursor_ordering = ('-id',)
 
     def perform_create(self, serializer: Serializer) -> None:
         """
@@ -59,7 +74,9 @@ class UserViewSet(UserViewSet):
         Возвращает пользователей, на которых подписан текущий пользователь.
         В выдачу добавляются рецепты.
         """
-        queryset = User.objects.filter(subscribers__user=request.user)
+        queryset = self.filter_queryset(
+            User.objects.filter(subscribers__user=request.user)
+        )
         pages = self.paginate_queryset(queryset)
         serializer = SubscriptionsSerializer(
             pages,
@@ -70,6 +87,7 @@ class UserViewSet(UserViewSet):
 
     @action(methods=('POST', 'DELETE'), detail=True,
             permission_classes=(IsAuthenticated,))
+    @transaction.atomic
     def subscribe(self, request: HttpRequest, id: int) -> HttpResponse:
         """
         Подписаться/отписаться на пользователя:
@@ -108,4 +126,5 @@ class UserViewSet(UserViewSet):
             user=user,
             author=author
         )
+        get_subscribed_authors(request).add(author.id)
         return Response(serializer.data, status=status.HTTP_201_CREATED)